@@ -20,6 +20,11 @@
 #define Serial1_TX_PIN 0
 #define Serial1_RX_PIN 1
 
+// 1 sends every line to the ground station as a COBS frame with a CRC-16 instead of println,
+// the ground station must have framed telemetry checked (see Ground Station/Serial/Framing.py)
+#define FRAMED_TELEMETRY 0
+#define FRAME_MAX_PAYLOAD 250
+
 // BMP390
 Adafruit_BMP3XX bmp390;
 #define BMP390_ADDRESS 0x77
@@ -106,6 +111,8 @@ float roundToPrecision(float value, int decimalPlaces);
 String format_time(unsigned long mission_time_ms);
 void activate_BUZandLED();
 float get_reference_pressure();
+uint16_t crc16_ccitt(const uint8_t *data, size_t length);
+void send_line(const String &line);
 
 /*###################################################################*/
 
@@ -125,7 +132,7 @@ void setup() {
   Wire.begin();
 
   // Initialize SD card
-  Serial1.println(STATUS_IND + "Connecting to SD Card...");
+  send_line(STATUS_IND + "Connecting to SD Card...");
   Serial.println("Connecting to SD Card...");
   init_sd();
 
@@ -139,25 +146,25 @@ void setup() {
     data_file = SD.open(file, FILE_WRITE);
     if (data_file)
     {
-      Serial1.println(STATUS_IND + "File creation successful");
+      send_line(STATUS_IND + "File creation successful");
       // println csv header to file
       data_file.println("TEAM_ID, MISSION_TIME, PACKET_COUNT, SW_STATE, PL_STATE, ALTITUDE, PRESSURE, TEMPERATURE, VOLTAGE, GPS_LATITUDE, GPS_LONGITUDE");
       data_file.flush();
       data_file.close();
     }else
     {
-      Serial1.println(ERROR_IND + "CSV file failed to open");
+      send_line(ERROR_IND + "CSV file failed to open");
       Serial.println("Error with sd");
       SDERROR = true;
     }
   }
 
   // Init BMP390
-  Serial1.println(STATUS_IND + "Connecting to BMP390...");
+  send_line(STATUS_IND + "Connecting to BMP390...");
   init_bmp390();
 
   // Init ZOE-M8Q
-  Serial1.println(STATUS_IND + "Connecting to ZOE-M8Q...");
+  send_line(STATUS_IND + "Connecting to ZOE-M8Q...");
   init_zoem8q();
 
   pinMode(CAN_NMOS_PIN, OUTPUT);
@@ -248,7 +255,7 @@ void loop() {
         data_file.close();
       }
     }
-    Serial1.println(data);
+    send_line(data);
     
     if(state == "release" && !released)
     {
@@ -325,19 +332,19 @@ void init_sd()
   {
     if(SD.begin(SD_CS_PIN))  // If SD card initializes, break out of the loop
     {
-      Serial1.println(STATUS_IND + "SD card connection successful");
+      send_line(STATUS_IND + "SD card connection successful");
       Serial.println(STATUS_IND + "SD card connection successful");
       SDERROR = false;
       return;
     }else
     {
-      Serial1.println(ERROR_IND + "SD card failed to connect. Attempt" + String(i + 1));
+      send_line(ERROR_IND + "SD card failed to connect. Attempt" + String(i + 1));
       Serial.println(ERROR_IND + "SD card failed to connect. Attempt" + String(i + 1));
       delay(1000); // Wait before retrying
     }
   }
   
-  Serial1.println(ERROR_IND + "SD card error, continuing without writing to CSV");
+  send_line(ERROR_IND + "SD card error, continuing without writing to CSV");
   SDERROR = true;
 }
 
@@ -368,7 +375,7 @@ void init_bmp390()
       bmp390.setIIRFilterCoeff(BMP3_IIR_FILTER_COEFF_3);
       bmp390.setOutputDataRate(BMP3_ODR_50_HZ);
       reference_pressure = get_reference_pressure();
-      Serial1.println(STATUS_IND + "BMP390 connection successful");
+      send_line(STATUS_IND + "BMP390 connection successful");
       Serial.println(STATUS_IND + "BMP390 connection successful");
       return;
     }
@@ -382,7 +389,7 @@ void init_zoem8q()
     if(!zoem8q.begin())
     {
       Serial.println(ERROR_IND + "ZOE-M8Q failed to connect. Attempt" + String(i));
-      Serial1.println(ERROR_IND + "ZOE-M8Q failed to connect. Attempt" + String(i));
+      send_line(ERROR_IND + "ZOE-M8Q failed to connect. Attempt" + String(i));
       delay(1000);
     }
     if(i == 10)
@@ -390,15 +397,15 @@ void init_zoem8q()
       Serial.println(ERROR_IND + "ZOE-M8Q error, continuing without ZOE-M8Q data");
       Serial.println(STATUS_IND + "ZOE-M8Q failure");
 
-      Serial1.println(ERROR_IND + "ZOE-M8Q error, continuing without ZOE-M8Q data");
-      Serial1.println(STATUS_IND + "ZOE-M8Q failure");
+      send_line(ERROR_IND + "ZOE-M8Q error, continuing without ZOE-M8Q data");
+      send_line(STATUS_IND + "ZOE-M8Q failure");
       ZOEERROR = true;
     }
   } 
   if(zoem8q.begin())
   {
     zoem8q.setI2COutput(COM_TYPE_UBX);
-    Serial1.println(STATUS_IND + "ZOE-M8Q connection successful");
+    send_line(STATUS_IND + "ZOE-M8Q connection successful");
     Serial.println(STATUS_IND + "ZOE-M8Q connection successful");
   }
 }
@@ -435,6 +442,64 @@ float get_reference_pressure()
   return (ref1 + ref2 + ref3 + ref4 + ref5)/5;
 }
 
+// CRC-16/CCITT-FALSE: poly 0x1021, init 0xFFFF, no reflection, no final xor
+uint16_t crc16_ccitt(const uint8_t *data, size_t length)
+{
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < length; i++)
+  {
+    crc ^= (uint16_t)data[i] << 8;
+    for (int bit = 0; bit < 8; bit++)
+    {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// Sends one message to the ground station, as a plain line or as a frame: COBS(line + CRC big endian) then 0x00
+void send_line(const String &line)
+{
+#if FRAMED_TELEMETRY
+  uint8_t raw[FRAME_MAX_PAYLOAD + 2];
+  size_t length = min((size_t)line.length(), (size_t)FRAME_MAX_PAYLOAD);
+  memcpy(raw, line.c_str(), length);
+  uint16_t crc = crc16_ccitt(raw, length);
+  raw[length++] = crc >> 8;
+  raw[length++] = crc & 0xFF;
+
+  // COBS: every zero is replaced by the distance to the next one, so 0x00 only marks the end of a frame
+  uint8_t encoded[FRAME_MAX_PAYLOAD + 2 + (FRAME_MAX_PAYLOAD + 2) / 254 + 2];
+  size_t code_index = 0;
+  size_t out = 1;
+  uint8_t code = 1;
+  for (size_t i = 0; i < length; i++)
+  {
+    if (raw[i] == 0)
+    {
+      encoded[code_index] = code;
+      code_index = out++;
+      code = 1;
+    }else
+    {
+      encoded[out++] = raw[i];
+      code++;
+      if (code == 0xFF)
+      {
+        encoded[code_index] = code;
+        code_index = out++;
+        code = 1;
+      }
+    }
+  }
+  encoded[code_index] = code;
+  encoded[out++] = 0x00;
+  Serial1.write(encoded, out);
+#else
+  Serial1.println(line);
+#endif
+}
+
 String format_time(unsigned long mission_time_ms) {
     // Convert milliseconds to total seconds
     unsigned long total_seconds = mission_time_ms / 1000;
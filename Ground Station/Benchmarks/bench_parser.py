@@ -0,0 +1,56 @@
+"""Microbenchmark of data frame parsing: per-line SerialReader.parse_data against DataFrameParser.parse_batch.
+
+Run from the Ground Station directory:  python -m Benchmarks.bench_parser
+"""
+import argparse
+import time
+import Serial.Ground_serial as sr
+from Data.Telemetry_Store import TelemetryStore
+from Serial.Packet_Parser import DataFrameParser
+
+
+def make_frames(count):
+    """Data frames formatted like ValhallaEmbedded.ino prints them, as read_data hands them over (carriage return kept)."""
+    frames = []
+    for packet in range(1, count + 1):
+        ms = packet * 1000
+        mission_time = f"{ms // 3600000:02}:{ms // 60000 % 60:02}:{ms // 1000 % 60:02}.{ms % 1000:03}"
+        frames.append(f"01004,{mission_time},{packet},reading ascent data,n,{packet % 700 * 1.25:.2f},"
+                      f"1013.25,21.50,4.20,38.8951,-77.0364\r".encode())
+    return frames
+
+
+def per_line(frames):
+    """The original path: decode and strip each line, then parse_data it into the store."""
+    reader = sr.SerialReader(telemetry_depth=len(frames))
+    start = time.perf_counter()
+    for raw_line in frames:
+        line = raw_line.decode('utf-8').strip()
+        reader.telementary.append(*reader.parse_data(line[0], line[1:].strip()))
+    return time.perf_counter() - start
+
+
+def batched(frames, batch_size):
+    """The fast path: parse whole batches of raw bytes and extend the store column-wise."""
+    parser = DataFrameParser()
+    store = TelemetryStore(capacity=len(frames))
+    start = time.perf_counter()
+    for index in range(0, len(frames), batch_size):
+        store.extend_columns(parser.parse_batch(frames[index:index + batch_size]))
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=64, help="frames per parse_batch call")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    frames = make_frames(args.frames)
+    before = min(per_line(frames) for _ in range(args.repeat))
+    after = min(batched(frames, args.batch) for _ in range(args.repeat))
+
+    print(f"parse_data per line:   {args.frames / before:12,.0f} lines/s")
+    print(f"parse_batch ({args.batch:>4}):    {args.frames / after:12,.0f} lines/s")
+    print(f"speedup:               {before / after:12.1f}x")
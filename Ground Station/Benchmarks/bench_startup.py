@@ -0,0 +1,116 @@
+"""Cold start profile of the GUI: import time per module (python -X importtime) and time to first paint.
+
+Run from the Ground Station directory:
+    python -m Benchmarks.bench_startup                    (report of the slowest packages to import)
+    python -m Benchmarks.bench_startup --output startup.json
+Every measurement runs in a fresh interpreter. The window is drawn on the offscreen Qt platform.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+# Time from interpreter start to the main window's first paint, and to all graphs being built
+FIRST_PAINT = """
+import json
+import time
+start = time.perf_counter()
+import GUI.Ground_GUIv2 as g
+imported = time.perf_counter()
+from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QObject, QEvent
+
+app = QApplication([])
+window = g.MainWindow()
+times = {"import_s": imported - start}
+
+class FirstPaint(QObject):
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint and "first_paint_s" not in times:
+            times["first_paint_s"] = time.perf_counter() - start
+        return False
+
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+graphs = (window.graph1, window.graph2, window.graph3)
+while not all(graph.figure is not None for graph in graphs):
+    app.processEvents()
+times["graphs_ready_s"] = time.perf_counter() - start
+print(json.dumps(times))
+"""
+
+
+def run_child(arguments):
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    return subprocess.run([sys.executable] + arguments, capture_output=True, text=True, env=env)
+
+
+def import_profile(module):
+    """Self and cumulative import time of every module imported by `module`, in seconds, from -X importtime."""
+    result = run_child(["-X", "importtime", "-c", f"import {module}"])
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # Column header
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_s": int(self_us) / 1e6,
+            "cumulative_s": int(cumulative_us) / 1e6,
+        })
+    return modules
+
+
+def first_paint(repeat):
+    """Median of `repeat` cold starts of the GUI."""
+    runs = []
+    for _ in range(repeat):
+        result = run_child(["-c", FIRST_PAINT])
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def measure(repeat=3, top=15):
+    """Startup metrics for the benchmark suite: cold start times plus the packages that cost the most to import."""
+    modules = import_profile("GUI.Ground_GUIv2")
+    results = first_paint(repeat)
+    results["import_total_s"] = sum(module["cumulative_s"] for module in modules if module["depth"] == 0)
+
+    # Self time summed per top level package, so PySide6, matplotlib, numpy, ... each show up as one line
+    packages = {}
+    for module in modules:
+        package = module["module"].split(".")[0]
+        packages[package] = packages.get(package, 0.0) + module["self_s"]
+    results["slowest_packages"] = dict(sorted(packages.items(), key=lambda item: -item[1])[:top])
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="cold starts to take the median of")
+    parser.add_argument("--top", type=int, default=15, help="slowest packages to list")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = measure(args.repeat, args.top)
+    if args.output:
+        from Benchmarks.bench_suite import environment
+        with open(args.output, "w") as file:
+            json.dump({"environment": environment(), "results": {"startup": results}}, file, indent=2)
+            file.write("\n")
+
+    print(f"import GUI.Ground_GUIv2:  {results['import_s'] * 1000:8.0f} ms")
+    print(f"first paint:              {results['first_paint_s'] * 1000:8.0f} ms")
+    print(f"graphs ready:             {results['graphs_ready_s'] * 1000:8.0f} ms")
+    print(f"\nImport time by package ({results['import_total_s'] * 1000:.0f} ms in total, -X importtime):")
+    for package, seconds in results["slowest_packages"].items():
+        print(f"  {seconds * 1000:8.1f} ms  {package}")
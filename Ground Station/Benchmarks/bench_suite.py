@@ -0,0 +1,347 @@
+"""Benchmark suite for every stage of the ground station, alone and end to end, with JSON output.
+
+Run from the Ground Station directory:
+    python -m Benchmarks.bench_suite --output results.json
+    python -m Benchmarks.bench_suite --compare results.json       (flags regressions against an earlier run)
+    python -m Benchmarks.bench_suite --stages parse,store --quick
+
+Every metric name ends in its unit: *_per_s is better when higher, *_ms and *_s are better when lower.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+# LiveGraph is drawn without a screen, this has to be set before Qt is imported
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import Serial.Ground_serial as sr
+import Benchmarks.bench_startup as bench_startup
+from Benchmarks.bench_parser import make_frames, per_line, batched
+from Data.Data_Handler import CSV_Handler
+from Data.Binary_Log import csv_cache_path
+from Data.Telemetry_Store import TelemetryStore, CSV_HEADER, FIELD_NAMES
+from Data.Telemetry_Writer import TelemetryWriter
+
+
+def best_of(repeat, function, *args):
+    """Fastest of `repeat` runs of a function that returns its own elapsed seconds."""
+    return min(function(*args) for _ in range(repeat))
+
+
+def make_rows(count):
+    """Raw telemetry rows as parse_data produces them."""
+    return [(1004, packet * 1000, packet, "reading ascent data", "n", packet % 700 * 1.25,
+             1013.25, 21.5, 4.2, 38.8951, -77.0364) for packet in range(1, count + 1)]
+
+
+def write_csv(path, rows):
+    """A CSV recording in the format SerialReader writes."""
+    reader = sr.SerialReader()
+    with open(path, "w", newline="") as file:
+        file.write(",".join(CSV_HEADER) + "\n")
+        file.writelines(",".join(reader.format_row(row)) + "\n" for row in rows)
+
+
+##################################################################################################################################
+#   Stages
+##################################################################################################################################
+
+def bench_parse(count, repeat):
+    """Data frame parsing, per line through parse_data and batched through DataFrameParser."""
+    frames = make_frames(count)
+    line_time = best_of(repeat, per_line, frames)
+    batch_time = best_of(repeat, batched, frames, 64)
+    return {
+        "parse_data_lines_per_s": count / line_time,
+        "parse_batch_lines_per_s": count / batch_time,
+    }
+
+
+def bench_store(count, repeat):
+    """Telemetry store appends, one row at a time and column-wise."""
+    rows = make_rows(count)
+    columns = {name: list(values) for name, values in zip(FIELD_NAMES, zip(*rows))}
+
+    def append():
+        store = TelemetryStore(capacity=4096)
+        start = time.perf_counter()
+        for row in rows:
+            store.append(*row)
+        return time.perf_counter() - start
+
+    def extend():
+        store = TelemetryStore(capacity=4096)
+        start = time.perf_counter()
+        for index in range(0, count, 64):
+            store.extend_columns({name: values[index:index + 64] for name, values in columns.items()})
+        return time.perf_counter() - start
+
+    return {
+        "append_rows_per_s": count / best_of(repeat, append),
+        "extend_columns_rows_per_s": count / best_of(repeat, extend),
+    }
+
+
+def bench_csv_write(count, repeat):
+    """Recording rate of the writer thread behind read_data, from the first put to the last synced row."""
+    rows = make_rows(count)
+    format_row = sr.SerialReader().format_row
+    directory = tempfile.mkdtemp()
+
+    def record(binary):
+        csv_file = os.path.join(directory, "write.csv")
+        binary_file = os.path.join(directory, "write.vlb") if binary else None
+        for path in (csv_file, binary_file):
+            if path and os.path.exists(path):
+                os.remove(path)
+        writer = TelemetryWriter(csv_file, format_row, binary_file, max_queue=count + 1)
+        writer.start()
+        start = time.perf_counter()
+        for row in rows:
+            writer.put(row)
+        writer.stop()
+        return time.perf_counter() - start
+
+    return {
+        "csv_rows_per_s": count / best_of(repeat, record, False),
+        "csv_and_binary_rows_per_s": count / best_of(repeat, record, True),
+    }
+
+
+def bench_open_csv(sizes, repeat):
+    """open_csv time against file size, cold (sidecar rebuilt from the CSV) and warm (sidecar mapped)."""
+    directory = tempfile.mkdtemp()
+    results = {}
+    for size in sizes:
+        handler = CSV_Handler()
+        handler.file = os.path.join(directory, f"open_{size}.csv")
+        write_csv(handler.file, make_rows(size))
+
+        def cold():
+            sidecar = csv_cache_path(handler.file)
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
+            start = time.perf_counter()
+            handler.open_csv(TelemetryStore())
+            return time.perf_counter() - start
+
+        def warm():
+            start = time.perf_counter()
+            handler.open_csv(TelemetryStore())
+            return time.perf_counter() - start
+
+        results[f"cold_{size}_rows_ms"] = best_of(repeat, cold) * 1000
+        results[f"warm_{size}_rows_ms"] = best_of(repeat, warm) * 1000
+        results[f"file_{size}_rows_mb"] = os.path.getsize(handler.file) / 1e6
+    return results
+
+
+def bench_render(sizes, repeat):
+    """LiveGraph.update_graph redraw time on an offscreen Qt platform, live appends and full redraws."""
+    from PySide6.QtWidgets import QApplication
+    from LiveGraphing.Ground_livev2 import LiveGraph
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    graph = LiveGraph("Altitude", "Time (ms)", "Altitude (m)")
+    graph.resize(800, 500)
+    graph.show()
+    graph.create_figure()
+    app.processEvents()
+
+    results = {}
+    for size in sizes:
+        x_values, y_values = make_series(size)
+
+        # Live: one new packet per update, mostly blitting the line onto the cached background
+        graph.update_graph(x_values[:size - 100], y_values[:size - 100])
+        times = []
+        for end in range(size - 100, size):
+            start = time.perf_counter()
+            graph.update_graph(x_values[:end], y_values[:end])
+            times.append(time.perf_counter() - start)
+        results[f"live_{size}_points_ms"] = statistics.median(times) * 1000
+
+        # Full: forced re-layout and redraw of the whole figure
+        def full():
+            graph.ax.set_xlim(0, 1)
+            start = time.perf_counter()
+            graph.update_graph(x_values, y_values)
+            return time.perf_counter() - start
+        results[f"full_{size}_points_ms"] = best_of(repeat, full) * 1000
+
+    graph.close()
+    return results
+
+
+def bench_render_qpainter(sizes, repeat):
+    """PainterGraph.update_graph plus the repaint it schedules, the same cases as bench_render."""
+    from PySide6.QtWidgets import QApplication
+    from LiveGraphing.Painter_Graph import PainterGraph
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    graph = PainterGraph("Altitude", "Time (ms)", "Altitude (m)")
+    graph.resize(800, 500)
+    graph.show()
+    app.processEvents()
+
+    def draw(x_values, y_values):
+        start = time.perf_counter()
+        graph.update_graph(x_values, y_values)
+        graph.canvas.repaint()
+        return time.perf_counter() - start
+
+    results = {}
+    for size in sizes:
+        x_values, y_values = make_series(size)
+
+        # Live: one new packet per update
+        draw(x_values[:size - 100], y_values[:size - 100])
+        times = [draw(x_values[:end], y_values[:end]) for end in range(size - 100, size)]
+        results[f"live_{size}_points_ms"] = statistics.median(times) * 1000
+
+        # Full: axis limits worked out again as well
+        def full():
+            graph.canvas.x_limits = graph.canvas.y_limits = None
+            return draw(x_values, y_values)
+        results[f"full_{size}_points_ms"] = best_of(repeat, full) * 1000
+
+    graph.close()
+    return results
+
+
+def make_series(size):
+    x_values = np.arange(size, dtype=np.int64) * 100
+    y_values = 700 * np.sin(np.linspace(0, np.pi, size))
+    return x_values, y_values
+
+
+def bench_pipeline(duration):
+    """End to end: simulator into a pty, through SerialReader into the store and recording."""
+    if not hasattr(os, "openpty"):
+        return {"skipped": "needs a pty"}
+    from Serial.Telemetry_Simulator import TelemetrySimulator, open_pty
+
+    write, port = open_pty()
+    reader = sr.SerialReader()
+    reader.opened_port = port
+    reader.baud_rate = 115200
+    reader.set_csv(os.path.join(tempfile.mkdtemp(), "pipeline.csv"))
+    reader.start()
+
+    start = time.perf_counter()
+    sent = TelemetrySimulator().run(write, 0, duration=duration)
+    elapsed = time.perf_counter() - start
+    time.sleep(0.5)
+    metrics = reader.metrics_snapshot()
+    reader.stop()
+
+    received = reader.parser.parsed_frames
+    return {
+        "sent_packets": sent,
+        "received_packets": received,
+        "dropped_packets": sent - received,
+        "dropped_rows": metrics["dropped_rows"],
+        "write_latency_median_ms": metrics["write_latency_ms"][0] if metrics["write_latency_ms"] else None,
+        "ingest_packets_per_s": received / elapsed,
+    }
+
+
+##################################################################################################################################
+#   Results
+##################################################################################################################################
+
+def environment():
+    """What the numbers were measured on, so runs from different versions and machines can be told apart."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit or None,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def compare(previous, current, tolerance):
+    """Print every metric against an earlier run, returns the number of regressions beyond tolerance."""
+    regressions = 0
+    for stage, metrics in current["results"].items():
+        for name, value in metrics.items():
+            old = previous.get("results", {}).get(stage, {}).get(name)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or old == 0:
+                continue
+            if name.endswith("_per_s"):
+                change = value / old - 1
+            elif name.endswith(("_ms", "_s")):
+                change = old / value - 1 if value else 0.0
+            else:
+                continue
+
+            flag = ""
+            if change < -tolerance:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{stage + '.' + name:45} {old:14,.2f} -> {value:14,.2f}  {change:+7.1%}{flag}")
+    return regressions
+
+
+STAGES = ["parse", "store", "csv_write", "open_csv", "render", "render_qpainter", "pipeline", "startup"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma separated subset of " + ", ".join(STAGES))
+    parser.add_argument("--quick", action="store_true", help="smaller sizes for a fast check")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before a metric counts as a regression")
+    args = parser.parse_args()
+
+    count = 20000 if args.quick else 100000
+    file_sizes = [1000, 10000] if args.quick else [1000, 10000, 100000, 1000000]
+    plot_sizes = [1000, 10000] if args.quick else [1000, 10000, 100000]
+
+    stages = {
+        "parse": lambda: bench_parse(count, args.repeat),
+        "store": lambda: bench_store(count, args.repeat),
+        "csv_write": lambda: bench_csv_write(count, args.repeat),
+        "open_csv": lambda: bench_open_csv(file_sizes, args.repeat),
+        "render": lambda: bench_render(plot_sizes, args.repeat),
+        "render_qpainter": lambda: bench_render_qpainter(plot_sizes, args.repeat),
+        "pipeline": lambda: bench_pipeline(2 if args.quick else 5),
+        "startup": lambda: bench_startup.measure(args.repeat),
+    }
+
+    results = {}
+    for stage in args.stages.split(","):
+        if stage not in stages:
+            parser.error(f"unknown stage {stage}")
+        print(f"Running {stage}...", file=sys.stderr)
+        # The ground station's own prints go to stderr so stdout stays valid JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            results[stage] = stages[stage]()
+
+    report = {"environment": environment(), "results": results}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(json.load(file), report, args.tolerance)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,205 @@
+import argparse
+import csv
+import os
+import struct
+from Data.Telemetry_Store import CSV_HEADER, FIELD_NAMES, STATE_FIELDS
+
+
+# File extension used for binary mission recordings
+BINARY_EXTENSION = ".vlb"
+
+# Binary copies converted from a CSV recording
+CACHE_EXTENSION = ".cache" + BINARY_EXTENSION
+
+# Fixed header: magic, format version, record size, label slots, labels in use
+MAGIC = b"VLHB"
+VERSION = 1
+HEADER_STRUCT = struct.Struct("<4sHHHH")
+
+# String table for sw_state/pl_state, stored in fixed slots right after the fixed header
+MAX_LABELS = 64
+LABEL_SIZE = 32
+LABEL_TABLE_OFFSET = 16
+
+# Records start on a page boundary so the file can be read or mapped as one array
+HEADER_SIZE = 4096
+
+# One record per data packet, in TELEMETRY_FIELDS order, states stored as string table codes
+RECORD_STRUCT = struct.Struct("<qqqHH4x6d")
+RECORD_SIZE = RECORD_STRUCT.size
+
+# Code written when the string table is full
+UNKNOWN_LABEL = MAX_LABELS - 1
+
+
+def record_dtype():
+    """NumPy dtype matching RECORD_STRUCT, imported on demand so recording does not need NumPy."""
+    import numpy as np
+    return np.dtype({
+        "names": list(FIELD_NAMES),
+        "formats": ["<i8", "<i8", "<i8", "<u2", "<u2", "<f8", "<f8", "<f8", "<f8", "<f8", "<f8"],
+        "offsets": [0, 8, 16, 24, 26, 32, 40, 48, 56, 64, 72],
+        "itemsize": RECORD_SIZE,
+    })
+
+
+def binary_log_path(csv_file):
+    """Path of the binary recording kept alongside a CSV recording."""
+    return os.path.splitext(csv_file)[0] + BINARY_EXTENSION
+
+
+def csv_cache_path(csv_file):
+    """Path of the binary copy converted from a CSV recording that has no binary recording, never one a writer appends to."""
+    return os.path.splitext(csv_file)[0] + CACHE_EXTENSION
+
+
+##################################################################################################################################
+#   BinaryLogWriter Class
+##################################################################################################################################
+
+class BinaryLogWriter:
+    """Appends fixed size telemetry records to a binary recording.
+
+    Records are only ever appended. New sw_state/pl_state strings go into a free slot of the string
+    table in the header, which is the only part of the file rewritten in place. Reopening an existing
+    recording continues it, dropping any partial record left by a crash.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.labels = []
+        self.label_codes = {}
+
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE:
+            self.file = open(path, "r+b")
+            self.labels = read_header(self.file.read(HEADER_SIZE), path)
+            self.label_codes = {label: code for code, label in enumerate(self.labels)}
+            records = (os.path.getsize(path) - HEADER_SIZE) // RECORD_SIZE
+            self.file.truncate(HEADER_SIZE + records * RECORD_SIZE)
+        else:
+            self.file = open(path, "w+b")
+            self.file.write(bytes(HEADER_SIZE))
+            self.write_header()
+
+    def write_rows(self, rows):
+        """Append parsed telemetry rows (as returned by SerialReader.parse_data)."""
+        records = bytearray()
+        for row in rows:
+            records += RECORD_STRUCT.pack(row[0], row[1], row[2], self.label_code(row[3]), self.label_code(row[4]),
+                                          row[5], row[6], row[7], row[8], row[9], row[10])
+        self.file.seek(0, os.SEEK_END)
+        self.file.write(records)
+
+    def write_columns(self, columns, labels):
+        """Append whole telemetry columns at once (NumPy arrays, states as codes into labels)."""
+        import numpy as np
+
+        records = np.zeros(len(columns["team_id"]), dtype=record_dtype())
+        for name in FIELD_NAMES:
+            if name in STATE_FIELDS:
+                file_codes = np.array([self.label_code(label) for label in labels], dtype=np.uint16)
+                records[name] = file_codes[columns[name]] if len(labels) else 0
+            else:
+                records[name] = columns[name]
+        self.file.seek(0, os.SEEK_END)
+        self.file.write(records.tobytes())
+
+    def label_code(self, label):
+        code = self.label_codes.get(label)
+        if code is None:
+            if len(self.labels) >= UNKNOWN_LABEL:
+                return UNKNOWN_LABEL
+            code = len(self.labels)
+            self.labels.append(label)
+            self.label_codes[label] = code
+            self.write_label(code, label)
+            self.write_header()
+        return code
+
+    def write_header(self):
+        self.file.seek(0)
+        self.file.write(HEADER_STRUCT.pack(MAGIC, VERSION, RECORD_SIZE, MAX_LABELS, len(self.labels)))
+
+    def write_label(self, code, label):
+        self.file.seek(LABEL_TABLE_OFFSET + code * LABEL_SIZE)
+        self.file.write(label.encode("utf-8")[:LABEL_SIZE].ljust(LABEL_SIZE, b"\0"))
+
+    def flush(self):
+        self.file.flush()
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+##################################################################################################################################
+#   Reading and Export
+##################################################################################################################################
+
+def read_header(header, path):
+    """Check a recording header and return its string table."""
+    magic, version, record_size, max_labels, label_count = HEADER_STRUCT.unpack_from(header)
+    if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+        raise ValueError(f"Not a version {VERSION} binary recording: {path}")
+
+    labels = []
+    for code in range(label_count):
+        start = LABEL_TABLE_OFFSET + code * LABEL_SIZE
+        labels.append(header[start:start + LABEL_SIZE].rstrip(b"\0").decode("utf-8", errors="replace"))
+    return labels
+
+
+def read_binary_log(path):
+    """Load a binary recording with a single read, returns (records, labels).
+
+    records is a NumPy structured array with one field per telemetry column, sw_state and
+    pl_state hold codes into labels.
+    """
+    import numpy as np
+
+    with open(path, "rb") as file:
+        data = file.read()
+
+    labels = read_header(data, path)
+    labels.extend(["?"] * (MAX_LABELS - len(labels)))
+    count = (len(data) - HEADER_SIZE) // RECORD_SIZE
+    records = np.frombuffer(data, dtype=record_dtype(), count=count, offset=HEADER_SIZE)
+    return records, labels
+
+
+def format_time(mission_time):
+    """Format milliseconds the same way SerialReader writes MISSION_TIME."""
+    total_seconds = mission_time / 1000.0
+    hours = int(total_seconds) // 3600
+    total_seconds %= 3600
+    minutes = int(total_seconds) // 60
+    seconds = total_seconds % 60
+    return f"{hours:02}:{minutes:02}:{seconds:05.2f}"
+
+
+def export_csv(binary_file, csv_file):
+    """Write a binary recording back out in the CSV recording format."""
+    records, labels = read_binary_log(binary_file)
+    with open(csv_file, mode="w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        for record in records.tolist():
+            row = [str(value) for value in record]
+            row[1] = format_time(record[1])
+            row[3] = labels[record[3]]
+            row[4] = labels[record[4]]
+            writer.writerow(row)
+    return len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a binary mission recording to CSV.")
+    parser.add_argument("binary_file")
+    parser.add_argument("csv_file", nargs="?", help="defaults to <recording>_export.csv")
+    args = parser.parse_args()
+
+    csv_file = args.csv_file or os.path.splitext(args.binary_file)[0] + "_export.csv"
+    rows = export_csv(args.binary_file, csv_file)
+    print(f"Exported {rows} rows to {csv_file}")
@@ -1,5 +1,9 @@
 import csv
 import os
+from itertools import compress
+from Data.Telemetry_Store import CSV_HEADER, FIELD_NAMES, STATE_FIELDS, TELEMETRY_FIELDS
+from Data.Binary_Log import BINARY_EXTENSION, HEADER_SIZE, BinaryLogWriter, binary_log_path, csv_cache_path
+from Data.Recording_Catalog import RecordingCatalog
 
 class CSV_Handler():
     def __init__(self):
@@ -7,83 +11,237 @@ class CSV_Handler():
         self.directory = "CSV Files"
         self.file = ""
 
+        # Memory mapped view of the opened recording
+        self.mission = None
+
+        # Follows the opened recording while another process is still writing it
+        self.follower = None
+
+        # Catalog of the recordings in the directory, opened on first use
+        self.catalog = None
+
     def set_csv(self, filename):
         "Set the current file name manually"
         file = self.directory + '/' + filename
         return file
 
     def create_csv(self, status):
-        """Creates a CSV file with the format 'status{i}.csv' in the given directory."""
-        # Look for an available filename: status{i}.csv
-        i = 1
+        """Creates a CSV file with the format 'status{i}.csv' in the given directory, the next free i comes from the recordings catalog."""
+        catalog = self.recording_catalog()
         while True:
-            file_path = os.path.join(self.directory, f"{status}{i}.csv")
-            if not os.path.exists(file_path):
-                self.file = file_path  # Save the file path
-                break
-            i += 1
+            self.file = catalog.allocate(status) + ".csv"  # Save the file path
 
-        # Open the file in write mode and create it with headers
-        try:
-            with open(self.file, mode='w', newline='', buffering=1) as file:  # Using buffered I/O
-                writer = csv.writer(file)
-                writer.writerow([
-                    "TEAM_ID", "MISSION_TIME", "PACKET_COUNT", "SW_STATE", "PL_STATE", 
-                    "ALTITUDE", "PRESSURE", "TEMP", "VOLTAGE", "GPS_LATITUDE", "GPS_LONGITUDE"
-                ])
-        except IOError as e:
-            print(f"Error creating CSV file: {e}")
+            # Create the file exclusively with headers, another station may have taken the same name from its own catalog
+            try:
+                with open(self.file, mode='x', newline='', buffering=1) as file:  # Using buffered I/O
+                    writer = csv.writer(file)
+                    writer.writerow(CSV_HEADER)
+                return
+            except FileExistsError:
+                continue
+            except IOError as e:
+                print(f"Error creating CSV file: {e}")
+                return
+
+    def recording_catalog(self, directory=None):
+        """Catalog of a recordings directory, the handler's own by default."""
+        directory = directory or self.directory
+        if self.catalog is None or self.catalog.directory != directory:
+            self.catalog = RecordingCatalog(directory)
+        return self.catalog
+
+    def recordings(self, directory=None, order="Newest"):
+        """Catalog entries of the CSV recordings in a directory, brought up to date and sorted by one of Recording_Catalog.SORT_ORDERS."""
+        catalog = self.recording_catalog(directory)
+        catalog.refresh()
+        return catalog.recordings(order)
 
     def open_csv(self, telementary):
-        """Reads CSV data incrementally and appends it to the telementary dictionary."""
-        #print(f"Trying to open CSV file: {self.file}")  # Debugging line
+        """Maps the opened recording and loads its newest packets into the telemetry store."""
+        self.mission = self.map_recording()
+        if self.mission is not None:
+            return self.mission.load_into(telementary)
+
+    def follow_csv(self, telementary, on_rows=None):
+        """Loads the newest packets of a recording that is still being written and keeps adding new ones as they are appended.
+
+        Nothing is mapped or converted, so rejoining a long recording only reads its tail.
+        on_rows is called from the follower thread after every batch of new packets.
+        """
+        from Data.Recording_Follower import RecordingFollower
+        self.stop_following()
+        self.mission = None
+        telementary.clear()
+        self.follower = RecordingFollower(self.file, telementary)
+        if on_rows is not None:
+            self.follower.register_callback(on_rows)
+        try:
+            self.follower.start()
+        except OSError as e:
+            print(f"Error following recording: {e}")
+            self.follower = None
+
+    def stop_following(self):
+        if self.follower is not None:
+            self.follower.stop()
+            self.follower = None
+
+    def map_recording(self):
+        """Returns a memory mapped view of the opened recording, CSV files are mapped through their binary recording or a converted copy."""
+        # Imported on demand so recording (and the headless mode) never loads NumPy
+        from Data.Mission_Loader import MappedMission
         try:
-            with open(self.file, newline='', encoding='utf-8', buffering=1) as csvfile:
-                csv_reader = csv.reader(csvfile)
-                
-                # Skip the header row
-                next(csv_reader)
-
-                for row in csv_reader:
-                    if len(row) >= 10:
-                        telementary["team_id"].append(int(row[0]))
-                        telementary["mission_time"].append(self.convert_to_milliseconds(row[1]))
-                        telementary["packet_count"].append(float(row[2]))
-                        telementary["sw_state"].append(row[3])
-                        telementary["pl_state"].append(row[4])
-                        telementary["altitude"].append(float(row[5]))
-                        telementary["pressure"].append(float(row[6]))
-                        telementary["temp"].append(float(row[7]))
-                        telementary["voltage"].append(float(row[8]))
-                        telementary["gps_latitude"].append(float(row[9]))
-                        telementary["gps_longitude"].append(float(row[10]))
-                        #print(f"Read row: {row}")
-                    
-                #print(f"Read CSV file: {self.file}") # Debugging Line
-
-                return telementary
+            if self.file.endswith(BINARY_EXTENSION):
+                return MappedMission(self.file)
+
+            # The binary recording written alongside the CSV holds the same packets, it is mapped as it is and never
+            # rebuilt, its writer may still be appending to it
+            binary_file = binary_log_path(self.file)
+            if os.path.exists(binary_file) and os.path.getsize(binary_file) >= HEADER_SIZE:
+                return MappedMission(binary_file)
+
+            # A CSV without one is converted into a copy of its own, rebuilt whenever the CSV is newer
+            sidecar = csv_cache_path(self.file)
+            if not os.path.exists(sidecar) or os.path.getmtime(sidecar) < os.path.getmtime(self.file):
+                self.build_sidecar(self.file, sidecar)
+            return MappedMission(sidecar)
         except FileNotFoundError:
             print(f"File not found: {self.file}")
-        except IOError as e:
-            print(f"Error reading CSV file: {e}")
-    
-            
+        except (IOError, ValueError) as e:
+            print(f"Error reading recording: {e}")
+
+    def build_sidecar(self, csv_file, binary_file):
+        """Converts a CSV recording into a binary copy (at csv_cache_path) that can be memory mapped."""
+        columns, labels, errors = self.load_csv_columns(csv_file)
+        self.report_errors(csv_file, errors)
+
+        temp_file = binary_file + ".tmp"
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        binary = BinaryLogWriter(temp_file)
+        binary.write_columns(columns, labels)
+        binary.close()
+        os.replace(temp_file, binary_file)
+
+        # The mission time index of the previous sidecar no longer matches it
+        from Data.Mission_Index import index_path
+        if os.path.exists(index_path(binary_file)):
+            os.remove(index_path(binary_file))
+
+    def load_csv_columns(self, csv_file):
+        """Parses a whole CSV recording column by column into typed NumPy arrays.
+
+        Returns (columns, labels, errors): one array per telemetry field with sw_state/pl_state as
+        codes into labels, and (line number, reason) for every malformed row that was left out.
+        """
+        import numpy as np
+        with open(csv_file, encoding='utf-8', errors='replace', newline='') as csvfile:
+            lines = csvfile.read().splitlines()
+
+        # Keep rows with the right number of fields, line numbers are 1 based and the header is line 1
+        body = lines[1:]
+        numbers = np.arange(2, len(body) + 2, dtype=np.int64)
+        field_counts = np.array([line.count(',') for line in body], dtype=np.int64) + 1
+        valid = field_counts == len(FIELD_NAMES)
+        errors = []
+        if valid.all():
+            rows = body
+        else:
+            rows = list(compress(body, valid))
+            for index in np.flatnonzero(~valid):
+                # Marker lines ('#GAP,...' and the like written by SerialReader) are left out without an error
+                if body[index].strip() and body[index][:1] != '#':
+                    errors.append((int(numbers[index]), f"expected {len(FIELD_NAMES)} fields, found {field_counts[index]}"))
+            numbers = numbers[valid]
+
+        # Split every kept row in one go, then each column is a strided slice of the flat field list
+        fields = ','.join(rows).split(',') if rows else []
+        width = len(FIELD_NAMES)
+
+        # Convert column by column, a bad cell only marks its row to be left out
+        columns = {}
+        bad = np.zeros(len(rows), dtype=bool)
+        for index, (name, code) in enumerate(TELEMETRY_FIELDS):
+            if name in STATE_FIELDS:
+                continue
+            strings = fields[index::width]
+            if name == "mission_time":
+                values, bad_cells = self.times_to_milliseconds(strings)
+            else:
+                values, bad_cells = self.strings_to_numbers(strings)
+            errors.extend((int(number), f"invalid {name}") for number in numbers[bad_cells & ~bad])
+            bad |= bad_cells
+            columns[name] = values.astype(np.dtype(code))
+
+        # Text states become codes into one shared label table
+        state_strings = [fields[FIELD_NAMES.index(name)::width] for name in STATE_FIELDS]
+        labels = list(dict.fromkeys(text for strings in state_strings for text in dict.fromkeys(strings)))
+        label_codes = {label: code for code, label in enumerate(labels)}
+        for name, strings in zip(STATE_FIELDS, state_strings):
+            columns[name] = np.fromiter(map(label_codes.__getitem__, strings), dtype=np.uint16, count=len(strings))
+
+        keep = ~bad
+        errors.sort()
+        columns = {name: columns[name][keep] for name in FIELD_NAMES}
+        return columns, labels, errors
+
+    def strings_to_numbers(self, strings):
+        """Vectorized string to float conversion, returns (values, mask of unparseable entries)."""
+        import numpy as np
+        try:
+            return np.array(strings, dtype=np.float64), np.zeros(len(strings), dtype=bool)
+        except ValueError:
+            pass
+
+        # Slow path, only taken when the column has bad cells
+        bad = np.zeros(len(strings), dtype=bool)
+        values = np.zeros(len(strings), dtype=np.float64)
+        for index, text in enumerate(strings):
+            try:
+                values[index] = float(text)
+            except ValueError:
+                bad[index] = True
+        return values, bad
+
+    def times_to_milliseconds(self, times):
+        """Vectorized HH:MM:SS.sss to milliseconds, returns (values, mask of unparseable entries)."""
+        import numpy as np
+        if '' in times:
+            times = [text or '0:0:0' for text in times]
+
+        # Split every time at once and do the arithmetic on whole columns
+        parts = ':'.join(times).split(':') if times else []
+        if len(parts) == 3 * len(times):
+            try:
+                hours, minutes, seconds = np.array(parts, dtype=np.float64).reshape(-1, 3).T
+                milliseconds = (hours * 3600 + minutes * 60 + seconds) * 1000
+                return milliseconds.astype(np.int64), np.zeros(len(times), dtype=bool)
+            except ValueError:
+                pass
+
+        # Slow path, only taken when some times are malformed
+        bad = np.zeros(len(times), dtype=bool)
+        milliseconds = np.zeros(len(times), dtype=np.int64)
+        for index, text in enumerate(times):
+            try:
+                milliseconds[index] = self.convert_to_milliseconds(text)
+            except ValueError:
+                bad[index] = True
+        return milliseconds, bad
+
+    def report_errors(self, csv_file, errors, limit=20):
+        """Prints the malformed rows skipped while loading a recording."""
+        for number, reason in errors[:limit]:
+            print(f"Skipped line {number} of {csv_file}: {reason}")
+        if len(errors) > limit:
+            print(f"Skipped {len(errors) - limit} more malformed lines in {csv_file}")
+
     def close_csv(self, telementary, current_error, current_status, csv):
         # Resetting the values
         csv = ""
-        telementary = {
-            "team_id": [],
-            "mission_time": [],
-            "packet_count": [],
-            "sw_state": [],
-            "pl_state": [],
-            "altitude": [],
-            "pressure": [],
-            "temp": [],
-            "voltage": [],
-            "gps_latitude": [],
-            "gps_longitude": []
-        }
+        self.stop_following()
+        self.mission = None
+        telementary.clear()
 
         current_error = ""
         current_status = ""
@@ -92,7 +250,7 @@ class CSV_Handler():
         return telementary, current_error, current_status, csv
     
     def files_in_directory(self, directory):
-        return [f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f))]
+        return [entry["name"] for entry in self.recordings(directory)]
     
     def convert_to_milliseconds(self, formatted_time):
         if formatted_time:
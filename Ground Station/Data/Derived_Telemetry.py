@@ -0,0 +1,255 @@
+import math
+from collections import deque
+from Data.Telemetry_Store import DERIVED_NAMES
+
+
+# Flight events, also the marker written into the recording for each
+APOGEE = "APOGEE"
+LANDING = "LANDING"
+
+# Most packets per step of the vectorised EWMA, fewer when (1 - alpha) to that power would leave float64's range
+EWMA_BLOCK = 4096
+EWMA_MAX_EXPONENT = 200
+
+# International barometric formula, altitude from pressure relative to a reference pressure
+BAROMETRIC_SCALE = 44330.0
+BAROMETRIC_EXPONENT = 1 / 5.255
+
+
+##################################################################################################################################
+#   DerivedTelemetry Class
+##################################################################################################################################
+
+class DerivedTelemetry:
+    """Streaming derived channels and flight events, O(1) state and (amortized) work per packet.
+
+    Channels (DERIVED_FIELDS in Telemetry_Store):
+        altitude_smoothed   EWMA of altitude, weight `alpha` on each new packet
+        vertical_speed      m/s, change of the smoothed altitude over the last `speed_span_ms`
+        altitude_min/max/mean   over the last `window` packets, monotonic deques and a running sum
+        pressure_altitude   altitude from pressure against the first pressure received (the pad)
+        altitude_error      altitude - pressure_altitude, a cross check of the two sensors' readings
+
+    Events, returned like SequenceTracker's as (index in batch, kind, details):
+        APOGEE   once the smoothed altitude has climbed past `launch_altitude` and fallen
+                 `apogee_drop` metres below its peak, details (time of the peak, peak altitude)
+        LANDING  after apogee, once the rolling altitude range stayed within `landing_band` for
+                 `landing_time_ms`, details (mission time, smoothed altitude)
+    A packet older than the newest one (reordered on the link) is given the current rolling values
+    and leaves the flight state alone. Mission time jumping back more than `restart_jump_ms`, or a
+    RESET from the sequence tracker passed in `restarts`, starts a new flight.
+    """
+
+    def __init__(self, window=20, alpha=0.2, speed_span_ms=1000, launch_altitude=10.0, apogee_drop=3.0, landing_band=2.0, landing_time_ms=5000,
+                 restart_jump_ms=10000):
+        self.window = window
+        self.alpha = alpha
+        self.speed_span_ms = speed_span_ms
+        self.launch_altitude = launch_altitude
+        self.apogee_drop = apogee_drop
+        self.landing_band = landing_band
+        self.landing_time_ms = landing_time_ms
+        self.restart_jump_ms = restart_jump_ms
+        self.reset()
+
+    def reset(self):
+        self.last_time = None
+        self.smoothed = None
+        self.speed = 0.0
+        self.reference_pressure = None
+
+        # (mission time, smoothed altitude) over the vertical speed span
+        self.history = deque()
+
+        # Rolling window of raw altitudes, with (index, value) deques whose fronts are the min and max
+        self.recent = deque()
+        self.recent_sum = 0.0
+        self.minimums = deque()
+        self.maximums = deque()
+        self.seen = 0
+
+        # Flight phase: peak so far, whether apogee and landing have been reported, when the altitude last settled
+        self.peak = None
+        self.peak_time = None
+        self.apogee_time = None
+        self.landing_time = None
+        self.settled_since = None
+
+    def process(self, columns, restarts=()):
+        """Derived channels for a batch of parsed columns, returns (derived columns, events).
+
+        restarts holds the indexes in the batch where the firmware restarted, e.g. SequenceTracker RESETs.
+        """
+        derived = {name: [] for name in ("altitude_smoothed", "vertical_speed", "altitude_min", "altitude_max",
+                                         "altitude_mean", "pressure_altitude", "altitude_error")}
+        smoothed_out = derived["altitude_smoothed"].append
+        speed_out = derived["vertical_speed"].append
+        min_out = derived["altitude_min"].append
+        max_out = derived["altitude_max"].append
+        mean_out = derived["altitude_mean"].append
+        pressure_out = derived["pressure_altitude"].append
+        error_out = derived["altitude_error"].append
+        events = []
+
+        for index, (mission_time, altitude, pressure) in enumerate(zip(columns["mission_time"], columns["altitude"], columns["pressure"])):
+            if index in restarts or (self.last_time is not None and self.last_time - mission_time > self.restart_jump_ms):
+                self.reset()
+            elif self.last_time is not None and mission_time < self.last_time:
+                # Late packet: only its own pressure altitude, the rolling values stay those of the newest packet
+                pressure_altitude = self.pressure_altitude(pressure)
+                smoothed_out(self.smoothed)
+                speed_out(self.speed)
+                min_out(self.minimums[0][1])
+                max_out(self.maximums[0][1])
+                mean_out(self.recent_sum / len(self.recent))
+                pressure_out(pressure_altitude)
+                error_out(altitude - pressure_altitude)
+                continue
+            self.last_time = mission_time
+
+            # Smoothed altitude and its rate of change over the speed span
+            smoothed = altitude if self.smoothed is None else self.smoothed + self.alpha * (altitude - self.smoothed)
+            self.smoothed = smoothed
+            history = self.history
+            history.append((mission_time, smoothed))
+            while mission_time - history[0][0] > self.speed_span_ms:
+                history.popleft()
+            elapsed = mission_time - history[0][0]
+            if elapsed > 0:
+                self.speed = (smoothed - history[0][1]) * 1000.0 / elapsed
+
+            # Rolling min, max and mean of the raw altitude
+            seen = self.seen
+            self.seen += 1
+            self.recent.append(altitude)
+            self.recent_sum += altitude
+            if len(self.recent) > self.window:
+                self.recent_sum -= self.recent.popleft()
+            minimums, maximums = self.minimums, self.maximums
+            while minimums and minimums[-1][1] >= altitude:
+                minimums.pop()
+            minimums.append((seen, altitude))
+            while maximums and maximums[-1][1] <= altitude:
+                maximums.pop()
+            maximums.append((seen, altitude))
+            oldest = seen - self.window + 1
+            if minimums[0][0] < oldest:
+                minimums.popleft()
+            if maximums[0][0] < oldest:
+                maximums.popleft()
+            low, high = minimums[0][1], maximums[0][1]
+
+            # Pressure altitude against the first pressure of the flight
+            if self.reference_pressure is None and pressure > 0:
+                self.reference_pressure = pressure
+            pressure_altitude = self.pressure_altitude(pressure)
+
+            smoothed_out(smoothed)
+            speed_out(self.speed)
+            min_out(low)
+            max_out(high)
+            mean_out(self.recent_sum / len(self.recent))
+            pressure_out(pressure_altitude)
+            error_out(altitude - pressure_altitude)
+
+            # Apogee: past the launch altitude and clearly falling from the peak
+            if self.apogee_time is None:
+                if self.peak is None or smoothed > self.peak:
+                    self.peak, self.peak_time = smoothed, mission_time
+                if self.peak > self.launch_altitude and smoothed < self.peak - self.apogee_drop and self.speed < 0:
+                    self.apogee_time = self.peak_time
+                    events.append((index, APOGEE, (self.peak_time, round(self.peak, 2))))
+
+            # Landing: after apogee, the altitude stays within the band for long enough
+            elif self.landing_time is None:
+                if high - low <= self.landing_band:
+                    if self.settled_since is None:
+                        self.settled_since = mission_time
+                    elif mission_time - self.settled_since >= self.landing_time_ms:
+                        self.landing_time = mission_time
+                        events.append((index, LANDING, (mission_time, round(smoothed, 2))))
+                else:
+                    self.settled_since = None
+
+        return derived, events
+
+    def process_arrays(self, mission_time, altitude, pressure):
+        """Derived channels of a whole recording in mission time order with NumPy, the same values process() gives.
+
+        Flight state is left alone, events are only detected live. The EWMA is worked out in blocks of
+        up to EWMA_BLOCK packets, within a block as a cumulative sum scaled by powers of (1 - alpha).
+        """
+        import numpy as np
+
+        mission_time = np.asarray(mission_time, dtype=np.float64)
+        altitude = np.asarray(altitude, dtype=np.float64)
+        pressure = np.asarray(pressure, dtype=np.float64)
+        count = len(altitude)
+        if count == 0:
+            return {name: np.empty(0) for name in DERIVED_NAMES}
+
+        # altitude_smoothed: s[i] = decay * s[i - 1] + alpha * altitude[i] from the first altitude, so within a block
+        # after s[c], s[c + j] = decay^j * (s[c] + alpha * sum of altitude[c + k] / decay^k for k = 1..j)
+        decay = 1.0 - self.alpha
+        smoothed = altitude.copy()
+        if decay > 0:
+            block_size = int(min(EWMA_BLOCK, max(1, EWMA_MAX_EXPONENT / max(-math.log10(decay), 1e-12))))
+            scale = decay ** np.arange(1, block_size + 1, dtype=np.float64)
+            for start in range(1, count, block_size):
+                block = altitude[start:start + block_size]
+                length = len(block)
+                smoothed[start:start + length] = scale[:length] * (smoothed[start - 1] + self.alpha * np.cumsum(block / scale[:length]))
+
+        # vertical_speed: against the oldest packet within the speed span, the last speed carried over a zero time step
+        oldest = np.searchsorted(mission_time, mission_time - self.speed_span_ms, side="left")
+        elapsed = mission_time - mission_time[oldest]
+        valid = elapsed > 0
+        speed = np.zeros(count)
+        speed[valid] = (smoothed[valid] - smoothed[oldest[valid]]) * 1000.0 / elapsed[valid]
+        last_valid = np.maximum.accumulate(np.where(valid, np.arange(count), -1))
+        speed = np.where(last_valid >= 0, speed[np.maximum(last_valid, 0)], 0.0)
+
+        # Rolling min, max and mean over the last `window` packets, the first ones over what there is
+        sums = np.concatenate(([0.0], np.cumsum(altitude)))
+        ends = np.arange(1, count + 1)
+        starts = np.maximum(ends - self.window, 0)
+
+        # Pressure altitude against the first positive pressure
+        positive = np.flatnonzero(pressure > 0)
+        pressure_altitude = np.full(count, np.nan)
+        if len(positive):
+            reference = pressure[positive[0]]
+            after = np.arange(count) >= positive[0]
+            usable = after & (pressure > 0)
+            pressure_altitude[usable] = BAROMETRIC_SCALE * (1 - (pressure[usable] / reference) ** BAROMETRIC_EXPONENT)
+
+        return {
+            "altitude_smoothed": smoothed,
+            "vertical_speed": speed,
+            "altitude_min": rolling_extreme(altitude, self.window, np.minimum),
+            "altitude_max": rolling_extreme(altitude, self.window, np.maximum),
+            "altitude_mean": (sums[ends] - sums[starts]) / (ends - starts),
+            "pressure_altitude": pressure_altitude,
+            "altitude_error": altitude - pressure_altitude,
+        }
+
+    def pressure_altitude(self, pressure):
+        if self.reference_pressure and pressure > 0:
+            return BAROMETRIC_SCALE * (1 - (pressure / self.reference_pressure) ** BAROMETRIC_EXPONENT)
+        return math.nan
+
+
+def rolling_extreme(values, window, extreme):
+    """np.minimum or np.maximum of each value and the window - 1 before it, in O(n).
+
+    Running extremes forwards and backwards within blocks of `window` values meet in every window.
+    """
+    import numpy as np
+
+    count = len(values)
+    padded = np.concatenate((np.full(window - 1, values[0]), values))
+    padded = np.concatenate((padded, np.full(-len(padded) % window, values[-1])))
+    blocks = padded.reshape(-1, window)
+    forwards = extreme.accumulate(blocks, axis=1).ravel()
+    backwards = extreme.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return extreme(backwards[:count], forwards[window - 1:window - 1 + count])
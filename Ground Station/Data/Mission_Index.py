@@ -0,0 +1,151 @@
+import os
+import re
+import numpy as np
+from Data.Binary_Log import HEADER_SIZE, RECORD_SIZE
+
+
+# File extension of the mission time index kept next to a binary recording
+INDEX_EXTENSION = ".vli"
+
+# One entry per record, sorted by mission time: the time in milliseconds and where the record starts in the recording
+INDEX_DTYPE = np.dtype([("mission_time", "<i8"), ("offset", "<i8")])
+
+
+def index_path(recording):
+    """Path of the mission time index of a binary recording."""
+    return os.path.splitext(recording)[0] + INDEX_EXTENSION
+
+
+##################################################################################################################################
+#   MissionIndex Class
+##################################################################################################################################
+
+class MissionIndex:
+    """Mission time index of a binary recording, for range queries by time.
+
+    Built once from the recording's mission_time column and cached next to it as a .npy file that
+    is memory mapped on the next open. Records a firmware reset or reordered packets put out of
+    time order are still found, as the index is sorted by time, not by position in the file.
+    A recording that has grown since only has its new records merged in.
+    """
+
+    def __init__(self, times, offsets):
+        self.times = times
+        self.offsets = offsets
+
+        # Record numbers in time order, worked out on first use
+        self.order = None
+
+    @classmethod
+    def for_mission(cls, mission):
+        """Load the cached index of a MappedMission, building or extending it if it is missing or behind."""
+        path = index_path(mission.path)
+        count = len(mission)
+        cached = None
+        if os.path.exists(path):
+            try:
+                cached = np.load(path, mmap_mode="r")
+            except (OSError, ValueError):
+                cached = None
+            if cached is not None and (cached.dtype != INDEX_DTYPE or len(cached) > count):
+                cached = None
+
+        if cached is not None and len(cached) == count:
+            return cls(cached["mission_time"], cached["offset"])
+
+        if cached is not None and len(cached) > 0:
+            # Merge in only the records appended since the index was written
+            known = len(cached)
+            entries = np.concatenate((np.asarray(cached), build_entries(mission["mission_time"][known:], known)))
+            # The cached part is sorted, so the new records and the boundary before them are all that can be out of order
+            if (np.diff(entries["mission_time"][known - 1:]) < 0).any():
+                entries = entries[np.argsort(entries["mission_time"], kind="stable")]
+        else:
+            entries = build_entries(mission["mission_time"], 0)
+            if len(entries) > 1 and (np.diff(entries["mission_time"]) < 0).any():
+                entries = entries[np.argsort(entries["mission_time"], kind="stable")]
+
+        save_index(path, entries)
+        return cls(entries["mission_time"], entries["offset"])
+
+    def __len__(self):
+        return len(self.times)
+
+    def bounds(self, start_ms=None, end_ms=None):
+        """Positions [low, high) in time order of the packets with start_ms <= mission_time <= end_ms, by binary search."""
+        low = 0 if start_ms is None else int(np.searchsorted(self.times, start_ms, side="left"))
+        high = len(self.times) if end_ms is None else int(np.searchsorted(self.times, end_ms, side="right"))
+        return low, max(low, high)
+
+    def records(self, start_ms=None, end_ms=None):
+        """Record numbers, in time order, of the packets with start_ms <= mission_time <= end_ms."""
+        low, high = self.bounds(start_ms, end_ms)
+        return (np.asarray(self.offsets[low:high]) - HEADER_SIZE) // RECORD_SIZE
+
+    def record(self, position):
+        """Record number of the packet at one position in time order."""
+        return int((self.offsets[position] - HEADER_SIZE) // RECORD_SIZE)
+
+    def time_order(self):
+        """Record numbers of the whole recording in time order, None if it is already in time order."""
+        if self.order is None:
+            order = (np.asarray(self.offsets) - HEADER_SIZE) // RECORD_SIZE
+            self.order = False if len(order) < 2 or (np.diff(order) > 0).all() else order
+        return None if self.order is False else self.order
+
+    def time_range(self):
+        if len(self.times) == 0:
+            return None
+        return int(self.times[0]), int(self.times[-1])
+
+
+def build_entries(mission_times, first_record):
+    entries = np.empty(len(mission_times), dtype=INDEX_DTYPE)
+    entries["mission_time"] = mission_times
+    entries["offset"] = HEADER_SIZE + (np.arange(len(mission_times), dtype=np.int64) + first_record) * RECORD_SIZE
+    return entries
+
+
+def save_index(path, entries):
+    """Write the index next to its recording, replaced in one step. A read only directory just goes without a cache."""
+    temp_file = path + ".tmp.npy"
+    try:
+        np.save(temp_file, entries)
+        os.replace(temp_file, path)
+    except OSError:
+        pass
+
+
+######################### Time Expressions #########################
+
+TIME_PATTERN = re.compile(r"^\s*(?:T?\+?\s*(?P<clock>[\d:.]+)|(?P<anchor>[a-z]+))\s*(?:(?P<sign>[+-])\s*(?P<offset>[\d:.]+)\s*s?)?\s*$", re.IGNORECASE)
+
+
+def clock_to_milliseconds(text):
+    """'HH:MM:SS.sss', 'MM:SS' or plain seconds to milliseconds."""
+    seconds = 0.0
+    for part in text.split(":"):
+        seconds = seconds * 60 + float(part)
+    return int(round(seconds * 1000))
+
+
+def parse_mission_time(text, anchors):
+    """Mission time in milliseconds from an expression such as 'T+00:04:10', '250', 'apogee + 30 s' or 'end - 1:00'.
+
+    anchors maps names (start, end, apogee, ...) to times in milliseconds. Raises ValueError if
+    the expression cannot be read or names an unknown anchor.
+    """
+    match = TIME_PATTERN.match(text)
+    if match is None:
+        raise ValueError(f"Cannot read time '{text}'")
+    if match["anchor"]:
+        anchor = match["anchor"].lower()
+        if anchor not in anchors:
+            raise ValueError(f"Unknown time '{anchor}', use one of: {', '.join(anchors)}")
+        milliseconds = anchors[anchor]
+    else:
+        milliseconds = clock_to_milliseconds(match["clock"])
+    if match["offset"]:
+        offset = clock_to_milliseconds(match["offset"])
+        milliseconds += offset if match["sign"] == "+" else -offset
+    return milliseconds
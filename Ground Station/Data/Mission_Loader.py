@@ -0,0 +1,123 @@
+import os
+import numpy as np
+from Data.Binary_Log import HEADER_SIZE, MAX_LABELS, RECORD_SIZE, read_header, record_dtype
+from Data.Mission_Index import MissionIndex
+from Data.Derived_Telemetry import DerivedTelemetry
+from Data.Telemetry_Store import DERIVED_NAMES, FIELD_NAMES, STATE_FIELDS
+
+
+##################################################################################################################################
+#   MappedMission Class
+##################################################################################################################################
+
+class MappedMission:
+    """Read only, memory mapped view of a binary recording.
+
+    Nothing is read up front besides the header: each telemetry column is a zero-copy NumPy view
+    into the mapped file, so multi-hour recordings open instantly and pages are only touched
+    when a column is actually used.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, "rb") as file:
+            self.labels = read_header(file.read(HEADER_SIZE), path)
+        self.labels.extend(["?"] * (MAX_LABELS - len(self.labels)))
+
+        # Ignore a partial record at the end of a recording that is still being written
+        count = max(os.path.getsize(path) - HEADER_SIZE, 0) // RECORD_SIZE
+        if count > 0:
+            self.records = np.memmap(path, dtype=record_dtype(), mode="r", offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.empty(0, dtype=record_dtype())
+
+        # Mission time index, loaded or built on first use
+        self.index = None
+
+        # Derived channels of the whole recording in time order, worked out the first time one is asked for
+        self.derived_columns = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, name):
+        """Zero-copy view of one column, sw_state/pl_state are codes into self.labels."""
+        return self.records[name]
+
+    def keys(self):
+        return FIELD_NAMES
+
+    def time_index(self):
+        if self.index is None:
+            self.index = MissionIndex.for_mission(self)
+        return self.index
+
+    def window(self, start_ms=None, end_ms=None):
+        """Packets with start_ms <= mission_time <= end_ms in time order, found by binary search and read on their own.
+
+        A zero-copy slice of the mapped file when the recording is in time order.
+        """
+        index = self.time_index()
+        low, high = index.bounds(start_ms, end_ms)
+        order = index.time_order()
+        return self.records[low:high] if order is None else self.records[order[low:high]]
+
+    def last_in_window(self, start_ms=None, end_ms=None):
+        """The latest packet with start_ms <= mission_time <= end_ms as a one record array, None if there is none."""
+        index = self.time_index()
+        low, high = index.bounds(start_ms, end_ms)
+        if high == low:
+            return None
+        return self.records[[index.record(high - 1)]]
+
+    def derived(self):
+        """Derived channels of the whole recording in mission time order, the live engine's values worked out with NumPy."""
+        if self.derived_columns is None:
+            self.derived_columns = DerivedTelemetry().process_arrays(self.ordered("mission_time"), self.ordered("altitude"), self.ordered("pressure"))
+        return self.derived_columns
+
+    def ordered(self, name):
+        """One column of the whole recording in mission time order, zero-copy when the recording is in time order."""
+        if name in DERIVED_NAMES:
+            return self.derived()[name]
+        order = self.time_index().time_order()
+        return self.records[name] if order is None else self.records[name][order]
+
+    def anchors(self):
+        """Named mission times in milliseconds for Mission_Index.parse_mission_time."""
+        time_range = self.time_index().time_range()
+        if time_range is None:
+            return {}
+        return {
+            "start": time_range[0],
+            "end": time_range[1],
+            "apogee": int(self.records["mission_time"][np.argmax(self.records["altitude"])]),
+        }
+
+    def state_text(self, name, index):
+        """Text of a state column at one packet."""
+        return self.labels[self.records[name][index]]
+
+    def load_into(self, telementary, window=None):
+        """Copy the newest packets (at most the store's capacity) into a telemetry store."""
+        count = min(len(self.records), telementary.capacity)
+        if window is not None:
+            count = min(count, window)
+        if count == 0:
+            return telementary
+
+        tail = self.records[len(self.records) - count:]
+        columns = {}
+        for name in FIELD_NAMES:
+            code = telementary.views[name].format
+            if name in STATE_FIELDS:
+                # Translate the recording's string table codes into the store's own label codes
+                store_codes = np.zeros(MAX_LABELS, dtype=np.uint16)
+                for file_code in np.unique(tail[name]):
+                    store_codes[file_code] = telementary.label_code(self.labels[file_code])
+                columns[name] = store_codes[tail[name]]
+            else:
+                columns[name] = np.ascontiguousarray(tail[name], dtype=np.dtype(code))
+        telementary.extend(columns, count)
+        return telementary
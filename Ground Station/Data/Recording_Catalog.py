@@ -0,0 +1,258 @@
+import json
+import os
+import re
+from Serial.Packet_Parser import DataFrameParser
+from Serial.Sequence_Tracker import SequenceTracker
+
+
+# Catalog file, kept in a directory of its own inside the recordings directory so that replacing it
+# never changes the recordings directory's mtime
+CATALOG_DIRECTORY = ".catalog"
+CATALOG_FILE = "catalog.json"
+CATALOG_VERSION = 2
+
+# Most bytes read and parsed in one go while scanning a recording
+READ_CHUNK = 1 << 20
+
+# Orders the Open dialog offers, each a key on a catalog entry and whether it sorts largest first
+SORT_ORDERS = {
+    "Newest": ("mtime_ns", True),
+    "Name": ("name", False),
+    "Duration": ("duration_ms", True),
+    "Max Altitude": ("max_altitude", True),
+    "Packets Lost": ("packet_loss", True),
+}
+
+
+def new_entry(name):
+    """Catalog entry of a recording nothing has been read from yet."""
+    return {
+        "name": name,
+        "size": 0,
+        "mtime_ns": 0,
+        "offset": 0,              # Bytes read so far, always just past a complete line
+        "rows": 0,
+        "skipped": 0,             # Lines that were not valid telemetry rows
+        "team_id": None,
+        "first_time": None,       # Lowest and highest mission time in milliseconds
+        "last_time": None,
+        "duration_ms": 0,
+        "max_altitude": None,
+        "packet_loss": 0,         # Missing packets as the live SequenceTracker counts them
+        "sequence": None,         # That tracker's state where the last scan stopped
+    }
+
+
+##################################################################################################################################
+#   RecordingCatalog Class
+##################################################################################################################################
+
+class RecordingCatalog:
+    """Persistent catalog of the CSV recordings in a directory with a summary of each one.
+
+    Kept as CATALOG_DIRECTORY/CATALOG_FILE in the directory. refresh() lists the directory once and
+    only reads recordings whose size or mtime changed since: a recording that grew is read from where
+    the last scan stopped, one that shrank or was replaced is read again. The catalog also keeps the
+    names of every file in the directory, so allocate() finds the first free number without a syscall
+    per candidate and only lists the directory again (names only, nothing is opened or stat'ed) when
+    the directory's mtime says files came or went since.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, CATALOG_DIRECTORY, CATALOG_FILE)
+
+        # Entries by file name, and the names of every file in the directory
+        self.entries = {}
+        self.names = set()
+
+        # Directory mtime when the names were last brought up to date
+        self.directory_mtime_ns = None
+
+        # False until the catalog has been read from disk or built by a refresh
+        self.loaded = self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != CATALOG_VERSION:
+            return False
+        self.entries = data.get("entries", {})
+        self.names = set(data.get("names", []))
+        self.directory_mtime_ns = data.get("directory_mtime_ns")
+        return True
+
+    def save(self):
+        """Write the catalog in one step, a read only directory just goes without it."""
+        temp_file = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(temp_file, "w") as file:
+                json.dump({"version": CATALOG_VERSION, "entries": self.entries, "names": sorted(self.names),
+                           "directory_mtime_ns": self.directory_mtime_ns}, file)
+            os.replace(temp_file, self.path)
+        except OSError:
+            pass
+
+    ######################### Refresh #########################
+
+    def refresh(self):
+        """Bring the catalog up to date with the directory, returns its entries."""
+        changed = not self.loaded
+        seen = set()
+        try:
+            # Created before the directory's mtime is taken, so the first save does not look like a change
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        except OSError:
+            pass
+        directory_mtime_ns = self.directory_mtime()
+        try:
+            files = list(os.scandir(self.directory))
+        except OSError:
+            files = []
+
+        self.names = {file.name for file in files}
+        for file in files:
+            if not file.name.endswith(".csv") or not file.is_file():
+                continue
+            seen.add(file.name)
+            stat = file.stat()
+            entry = self.entries.get(file.name)
+            if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                continue
+
+            # Only a recording that grew keeps what was read of it, anything else is read from the start
+            if entry is None or stat.st_size < entry["offset"]:
+                entry = self.entries[file.name] = new_entry(file.name)
+            self.scan(entry, file.path, stat.st_size)
+            entry["size"] = stat.st_size
+            entry["mtime_ns"] = stat.st_mtime_ns
+            changed = True
+
+        for name in set(self.entries) - seen:
+            del self.entries[name]
+            changed = True
+
+        if changed or directory_mtime_ns != self.directory_mtime_ns:
+            self.loaded = True
+            self.directory_mtime_ns = directory_mtime_ns
+            self.save()
+        return self.entries
+
+    def scan(self, entry, path, size):
+        """Read the complete lines from entry['offset'] up to `size` into the entry's summary."""
+        parser = DataFrameParser()
+        try:
+            with open(path, "rb") as file:
+                file.seek(entry["offset"])
+                while entry["offset"] < size:
+                    data = file.read(min(size - entry["offset"], READ_CHUNK))
+                    end = data.rfind(b"\n")
+                    if end < 0:
+                        if len(data) >= READ_CHUNK:
+                            # A line longer than a whole chunk is never a telemetry row
+                            entry["offset"] += len(data)
+                            entry["skipped"] += 1
+                            continue
+                        break  # Only part of a line so far
+                    lines = data[:end].split(b"\n")
+                    if entry["offset"] == 0:
+                        lines = lines[1:]  # Header
+                    file.seek(entry["offset"] + end + 1)
+                    entry["offset"] += end + 1
+                    self.summarize(entry, parser, lines)
+        except OSError:
+            pass
+
+    def summarize(self, entry, parser, lines):
+        # Marker lines and blank lines are not telemetry, data rows get the '0' identifier the parser expects
+        frames = [b"0" + line for line in lines if line[:1] not in (b"#", b"", b"\r")]
+        failed = parser.invalid_frames
+        columns = parser.parse_batch(frames)
+        entry["skipped"] += parser.invalid_frames - failed
+        count = len(columns["team_id"])
+        if count == 0:
+            return
+
+        entry["rows"] += count
+        entry["team_id"] = columns["team_id"][-1]
+        times = columns["mission_time"]
+        entry["first_time"] = min(times) if entry["first_time"] is None else min(entry["first_time"], min(times))
+        entry["last_time"] = max(times) if entry["last_time"] is None else max(entry["last_time"], max(times))
+        entry["duration_ms"] = entry["last_time"] - entry["first_time"]
+        highest = max(columns["altitude"])
+        entry["max_altitude"] = highest if entry["max_altitude"] is None else max(entry["max_altitude"], highest)
+
+        # Missing packets counted by the same tracker as the live metrics, carried on from the last scan
+        tracker = SequenceTracker()
+        if entry["sequence"] is not None:
+            tracker.restore(entry["sequence"])
+        tracker.track(columns["packet_count"], times)
+        entry["packet_loss"] = tracker.missing
+        entry["sequence"] = tracker.state()
+
+    ######################### Queries #########################
+
+    def recordings(self, order="Newest"):
+        """Entries sorted by one of the SORT_ORDERS, entries without the value last."""
+        key, largest_first = SORT_ORDERS[order]
+        entries = list(self.entries.values())
+        known = [entry for entry in entries if entry[key] is not None]
+        unknown = [entry for entry in entries if entry[key] is None]
+        known.sort(key=lambda entry: entry[key], reverse=largest_first)
+        return known + unknown
+
+    ######################### Name Allocation #########################
+
+    def directory_mtime(self):
+        try:
+            return os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return None
+
+    def allocate(self, name):
+        """'<directory>/<name><i>' for the lowest i no file uses, reserved in the catalog straight away.
+
+        '<name><i>.<ext>' and '<name><i>_<team_id>.<ext>' take i, the number of a deleted recording is
+        free again.
+        A stat of the directory when nothing came or went since the catalog last looked, one listing
+        of the names otherwise. Callers should still create the file exclusively, another process
+        (or a change within the directory mtime's resolution) can take the same number.
+        """
+        if not self.loaded:
+            self.refresh()
+        directory_mtime_ns = self.directory_mtime()
+        if directory_mtime_ns != self.directory_mtime_ns:
+            try:
+                self.names = set(os.listdir(self.directory))
+            except OSError:
+                pass
+            self.directory_mtime_ns = directory_mtime_ns
+
+        numbered = re.compile(re.escape(name) + r"(\d+)(?:_\d+)?\.")
+        taken = {int(match[1]) for match in map(numbered.match, self.names) if match is not None}
+        number = 1
+        while number in taken:
+            number += 1
+        self.names.add(f"{name}{number}.csv")
+        self.save()
+        return os.path.join(self.directory, f"{name}{number}")
+
+
+def format_entry(entry):
+    """One line summary of a recording for the Open dialog."""
+    parts = [entry["name"]]
+    if entry["rows"]:
+        seconds = entry["duration_ms"] / 1000
+        parts.append(f"team {entry['team_id']}")
+        parts.append(f"{int(seconds // 60)}:{seconds % 60:04.1f}")
+        parts.append(f"{entry['max_altitude']:.0f} m max")
+        parts.append(f"{entry['rows']} rows")
+        if entry["packet_loss"]:
+            parts.append(f"{entry['packet_loss']} lost")
+    else:
+        parts.append("no data")
+    return "  |  ".join(parts)
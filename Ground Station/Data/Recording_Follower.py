@@ -0,0 +1,220 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import sys
+from threading import Thread, Event
+from Serial.Packet_Parser import DataFrameParser
+from Serial.Ingest_Metrics import RateLimitFilter
+from Data.Derived_Telemetry import DerivedTelemetry
+
+log = logging.getLogger(__name__)
+log.addFilter(RateLimitFilter())
+
+
+# inotify events that mean the followed file grew, was truncated or was replaced
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_DELETE_SELF | IN_MOVE_SELF
+
+# Most bytes read and parsed in one go while catching up
+READ_CHUNK = 1 << 20
+
+
+def inotify_watch(path):
+    """File descriptor that turns readable whenever `path` changes, None where inotify is not available."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if not add_watch(fd, path):
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+def add_watch(fd, path):
+    """Watch the file now at `path` on an inotify descriptor as well, e.g. after the one watched before was replaced."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        return libc.inotify_add_watch(fd, os.fsencode(path), WATCH_MASK) >= 0
+    except (OSError, AttributeError):
+        return False
+
+
+def tail_offset(path, rows, block=65536):
+    """Byte offset where the last `rows` complete lines of a file start, reading backwards only as far as needed."""
+    with open(path, "rb") as file:
+        position = file.seek(0, os.SEEK_END)
+        newlines = 0
+        while position > 0:
+            start = max(0, position - block)
+            file.seek(start)
+            data = file.read(position - start)
+            index = len(data)
+            while True:
+                index = data.rfind(b"\n", 0, index)
+                if index < 0:
+                    break
+                newlines += 1
+                # The newline ending the line before the first one wanted
+                if newlines > rows:
+                    return start + index + 1
+            position = start
+    return 0
+
+
+##################################################################################################################################
+#   RecordingFollower Class
+##################################################################################################################################
+
+class RecordingFollower:
+    """Follows a CSV recording that another process (or a crashed GUI's writer) is still appending to.
+
+    Only the newest `telementary.capacity` rows are read when following starts, found by reading the
+    file backwards, after that just the bytes appended since the remembered offset. A partial last
+    line is left for the next read. A file that shrank, or another file now at the path (a new
+    device or inode number), is read again from its start and watched in place of the old one. The thread wakes on inotify where it is available and checks
+    every `poll_interval` seconds otherwise. New rows go into the telemetry store in batches and
+    registered callbacks are called once per batch, like SerialReader does. The follower is the
+    store's only writer while it runs.
+    """
+
+    def __init__(self, csv_file, telementary, poll_interval=0.25):
+        self.csv_file = csv_file
+        self.telementary = telementary
+        self.poll_interval = poll_interval
+
+        # Byte offset just past the last complete line read, and the number of rows taken from the file
+        self.offset = 0
+        self.rows = 0
+
+        # (st_dev, st_ino) of the file the offset belongs to
+        self.identity = None
+
+        self.parser = DataFrameParser()
+        self.derived = DerivedTelemetry()
+        self.callbacks = []
+
+        self.thread = None
+        self.stop_event = Event()
+
+        # inotify descriptor, and a pipe stop() writes to so the thread does not sit out its wait
+        self.watch = None
+        self.wake_read = self.wake_write = None
+
+    def register_callback(self, callback):
+        self.callbacks.append(callback)
+
+    def start(self, catch_up=True):
+        """Load the newest rows (or none, catch_up=False) and follow the file from there."""
+        self.offset = tail_offset(self.csv_file, self.telementary.capacity) if catch_up else os.path.getsize(self.csv_file)
+        start = self.offset
+        self.identity = None
+        self.read_new()
+        self.watch = inotify_watch(self.csv_file)
+        self.wake_read, self.wake_write = os.pipe()
+        self.stop_event.clear()
+        self.thread = Thread(target=self.run, name=f"RecordingFollower {self.csv_file}", daemon=True)
+        self.thread.start()
+        log.info("Following %s from byte %d (%s)", self.csv_file, start, "inotify" if self.watch is not None else "polling")
+
+    def stop(self):
+        if self.thread is not None:
+            self.stop_event.set()
+            os.write(self.wake_write, b"\0")
+            self.thread.join()
+            self.thread = None
+            os.close(self.wake_read)
+            os.close(self.wake_write)
+        if self.watch is not None:
+            os.close(self.watch)
+            self.watch = None
+
+    @property
+    def running(self):
+        return self.thread is not None
+
+    ######################### Follower Thread #########################
+
+    def run(self):
+        waits = [self.wake_read] if self.watch is None else [self.wake_read, self.watch]
+        while not self.stop_event.is_set():
+            # The timeout also covers changes inotify does not report, such as writes over a network share
+            ready, _, _ = select.select(waits, [], [], self.poll_interval)
+            for fd in ready:
+                try:
+                    os.read(fd, 4096)
+                except BlockingIOError:
+                    pass
+            if not self.stop_event.is_set():
+                self.read_new()
+
+    def read_new(self):
+        """Parse the complete lines appended since the last read into the store."""
+        try:
+            file = open(self.csv_file, "rb")
+        except OSError as e:
+            log.warning("Cannot read %s: %s", self.csv_file, e)
+            return
+
+        with file:
+            # Size and identity of the file actually opened, so a replacement in between cannot mix the two
+            stat = os.fstat(file.fileno())
+            size = stat.st_size
+            identity = (stat.st_dev, stat.st_ino)
+            if self.identity is not None and identity != self.identity:
+                log.warning("%s was replaced, reading the new file from its start", self.csv_file)
+                self.start_over()
+                if self.watch is not None and not add_watch(self.watch, self.csv_file):
+                    log.warning("Cannot watch the new %s, polling it", self.csv_file)
+            elif size < self.offset:
+                log.warning("%s shrank from %d to %d bytes, reading it again", self.csv_file, self.offset, size)
+                self.start_over()
+            self.identity = identity
+
+            while self.offset < size:
+                file.seek(self.offset)
+                data = file.read(min(size - self.offset, READ_CHUNK))
+                end = data.rfind(b"\n")
+                if end < 0:
+                    if len(data) >= READ_CHUNK:
+                        # A line longer than a whole chunk is never a telemetry row, skip past it
+                        self.offset += len(data)
+                        continue
+                    return  # Only part of a line so far
+
+                lines = data[:end].split(b"\n")
+                if self.offset == 0:
+                    lines = lines[1:]  # Header
+                self.offset += end + 1
+                self.ingest(lines)
+
+    def start_over(self):
+        """Forget what was read, the file is read again from its beginning."""
+        self.offset = 0
+        self.telementary.clear()
+        self.derived.reset()
+
+    def ingest(self, lines):
+        # Marker lines and blank lines are not telemetry, data rows get the '0' identifier the parser expects
+        frames = [b"0" + line for line in lines if line[:1] not in (b"#", b"", b"\r")]
+        if not frames:
+            return
+        columns = self.parser.parse_batch(frames)
+        count = len(columns["team_id"])
+        if count:
+            derived, _ = self.derived.process(columns)
+            self.telementary.extend_columns(columns, derived)
+            self.rows += count
+            for callback in self.callbacks:
+                callback()
@@ -0,0 +1,113 @@
+from multiprocessing import shared_memory
+from Data.Telemetry_Store import TelemetryStore, TELEMETRY_FIELDS, DERIVED_FIELDS
+
+
+# Start of the shared block: capacity, the published packet count and the headroom, then the columns
+HEADER_BYTES = 64
+CAPACITY_SLOT = 0
+COUNT_SLOT = 1
+HEADROOM_SLOT = 2
+
+# Bytes per value of each typecode, each column starts on an 8 byte boundary
+ITEM_SIZES = {"q": 8, "d": 8, "H": 2}
+
+
+def column_layout(capacity):
+    """(name, typecode, byte offset, byte length) of every column in the shared block, and the block's size."""
+    layout = []
+    offset = HEADER_BYTES
+    for name, code in TELEMETRY_FIELDS + DERIVED_FIELDS:
+        length = ITEM_SIZES[code] * 2 * capacity
+        layout.append((name, code, offset, length))
+        offset += (length + 7) // 8 * 8
+    return layout, offset
+
+
+##################################################################################################################################
+#   SharedTelemetryStore Class
+##################################################################################################################################
+
+class SharedTelemetryStore(TelemetryStore):
+    """TelemetryStore whose columns live in a multiprocessing.shared_memory block.
+
+    The writer (the serial thread, a followed recording, a loaded recording) fills it exactly like
+    a TelemetryStore and then publishes the packet count in the block's header, so another process
+    attached with SharedTelemetryView reads the same columns without a copy or a pipe, under the
+    same one writer rule. The label table stays in this process, other processes see state codes.
+    """
+
+    def __init__(self, capacity=4096, headroom=None):
+        layout, size = column_layout(capacity)
+        self.layout = layout
+        self.shared = shared_memory.SharedMemory(create=True, size=size)
+        self.header = self.shared.buf[:HEADER_BYTES].cast("q")
+        super().__init__(capacity, headroom)
+        self.header[CAPACITY_SLOT] = capacity
+        self.header[COUNT_SLOT] = 0
+        self.header[HEADROOM_SLOT] = self.headroom
+
+    @property
+    def name(self):
+        """Name other processes attach to the block by."""
+        return self.shared.name
+
+    def allocate_columns(self):
+        return {name: self.shared.buf[offset:offset + length].cast(code) for name, code, offset, length in self.layout}
+
+    def append(self, *row):
+        super().append(*row)
+        self.header[COUNT_SLOT] = self.count
+
+    def extend(self, columns, count):
+        super().extend(columns, count)
+        self.header[COUNT_SLOT] = self.count
+
+    def clear(self):
+        super().clear()
+        self.header[COUNT_SLOT] = 0
+
+    def close(self):
+        """Remove the block, it is unmapped once the last snapshot taken from it is gone. Only call this while nothing is writing."""
+        self.shared.unlink()
+        for view in (*self.byte_views.values(), *self.views.values(), *self.columns.values(), self.header):
+            view.release()
+        try:
+            self.shared.close()
+        except BufferError:
+            pass
+
+
+##################################################################################################################################
+#   SharedTelemetryView Class
+##################################################################################################################################
+
+class SharedTelemetryView:
+    """Read only view of a SharedTelemetryStore from another process, columns as NumPy arrays."""
+
+    def __init__(self, name):
+        import numpy as np
+
+        self.shared = shared_memory.SharedMemory(name=name)
+        self.header = np.ndarray((3,), dtype="<q", buffer=self.shared.buf)
+        self.capacity = int(self.header[CAPACITY_SLOT])
+        self.headroom = int(self.header[HEADROOM_SLOT])
+        layout, _ = column_layout(self.capacity)
+        self.columns = {name: np.ndarray((2 * self.capacity,), dtype=code, buffer=self.shared.buf, offset=offset)
+                        for name, code, offset, _ in layout}
+
+    @property
+    def count(self):
+        return int(self.header[COUNT_SLOT])
+
+    def snapshot(self, window=None):
+        """Newest `window` packets (all readable packets if None) as one contiguous array view per column."""
+        count = self.count
+        length = min(count, self.capacity - self.headroom)
+        if window is not None:
+            length = min(length, window)
+        end = count % self.capacity + self.capacity
+        return {name: column[end - length:end] for name, column in self.columns.items()}
+
+    def close(self):
+        self.header = self.columns = None
+        self.shared.close()
@@ -0,0 +1,234 @@
+from array import array
+
+
+# Value of a derived channel for packets stored without one
+NAN = float("nan")
+
+
+# Telemetry columns in the order the pico sends them, with the array typecode each is stored as
+TELEMETRY_FIELDS = (
+    ("team_id", "q"),
+    ("mission_time", "q"),
+    ("packet_count", "q"),
+    ("sw_state", "H"),
+    ("pl_state", "H"),
+    ("altitude", "d"),
+    ("pressure", "d"),
+    ("temp", "d"),
+    ("voltage", "d"),
+    ("gps_latitude", "d"),
+    ("gps_longitude", "d"),
+)
+
+# Columns holding text states, stored as codes into the store's label table
+STATE_FIELDS = ("sw_state", "pl_state")
+
+FIELD_NAMES = tuple(name for name, _ in TELEMETRY_FIELDS)
+
+# Channels worked out on the ground by Derived_Telemetry.DerivedTelemetry, stored alongside the telemetry but never recorded
+DERIVED_FIELDS = (
+    ("altitude_smoothed", "d"),
+    ("vertical_speed", "d"),
+    ("altitude_min", "d"),
+    ("altitude_max", "d"),
+    ("altitude_mean", "d"),
+    ("pressure_altitude", "d"),
+    ("altitude_error", "d"),
+)
+
+DERIVED_NAMES = tuple(name for name, _ in DERIVED_FIELDS)
+
+# Header row of recorded CSV files
+CSV_HEADER = ["TEAM_ID", "MISSION_TIME", "PACKET_COUNT", "SW_STATE", "PL_STATE",
+              "ALTITUDE", "PRESSURE", "TEMP", "VOLTAGE", "GPS_LATITUDE", "GPS_LONGITUDE"]
+
+
+##################################################################################################################################
+#   TelemetryStore Class
+##################################################################################################################################
+
+class TelemetryStore:
+    """Fixed capacity columnar ring buffer for telemetry packets.
+
+    Every column is preallocated at twice the capacity and each sample is written to both halves,
+    so the newest `capacity` samples are always one contiguous slice and readers get them as
+    memoryviews without copying. The derived channels have columns of their own, NaN for packets
+    stored without them. There is one writer (the serial thread) and any number of readers:
+    the writer fills a slot and only then advances the packet count, so a reader that takes the
+    count first always sees complete rows. The writer overwrites the oldest slots first, so the
+    oldest `headroom` slots are never handed to readers: a snapshot stays intact until the writer
+    has stored `headroom` more packets, and readers see at most `capacity - headroom` packets.
+    """
+
+    def __init__(self, capacity=4096, headroom=None):
+        self.capacity = capacity
+        self.headroom = capacity // 4 if headroom is None else headroom
+
+        # Preallocated columns and a memoryview over each one for slicing out snapshots
+        self.columns = self.allocate_columns()
+        self.views = {name: memoryview(column) for name, column in self.columns.items()}
+        self.byte_views = {name: view.cast("B") for name, view in self.views.items()}
+        self.ordered_columns = [self.columns[name] for name in FIELD_NAMES]
+        self.derived_columns = [self.columns[name] for name in DERIVED_NAMES]
+
+        # Text states are interned into this table, codes index into it and are never reused
+        self.labels = []
+        self.label_codes = {}
+
+        # Total packets ever appended, only the writer changes it
+        self.count = 0
+
+    def allocate_columns(self):
+        """Column buffers of 2 * capacity values each, anything indexable by slot with an itemsize."""
+        return {name: array(code, bytes(array(code).itemsize * 2 * self.capacity)) for name, code in TELEMETRY_FIELDS + DERIVED_FIELDS}
+
+    ######################### Writer Side #########################
+
+    def append(self, team_id, mission_time, packet_count, sw_state, pl_state, altitude, pressure, temp, voltage, gps_latitude, gps_longitude):
+        """Write one packet into the next slot, overwriting the oldest packet once full."""
+        slot = self.count % self.capacity
+        mirror = slot + self.capacity
+
+        row = (team_id, mission_time, packet_count, self.label_code(sw_state), self.label_code(pl_state),
+               altitude, pressure, temp, voltage, gps_latitude, gps_longitude)
+        for column, value in zip(self.ordered_columns, row):
+            column[slot] = value
+            column[mirror] = value
+        for column in self.derived_columns:
+            column[slot] = column[mirror] = NAN
+
+        # Publish the row only after every column has been written
+        self.count += 1
+
+    def extend(self, columns, count):
+        """Bulk append `count` packets given as one buffer per column.
+
+        Each buffer holds the column's values packed with its TELEMETRY_FIELDS typecode (states as
+        label codes from this store). Derived columns left out are stored as NaN. Only the newest
+        `capacity` packets are kept.
+        """
+        skip = max(count - self.capacity, 0)
+        count -= skip
+        slot = (self.count + skip) % self.capacity
+        first = min(count, self.capacity - slot)
+
+        for name, column in self.columns.items():
+            size = column.itemsize
+            values = columns.get(name)
+            if values is None:
+                values = array("d", [NAN]) * (skip + count)
+            data = memoryview(values).cast("B")[skip * size:]
+            raw = self.byte_views[name]
+
+            # Fill up to the end of the ring, then wrap around to the start, writing both halves each time
+            for start, part in ((slot, data[:first * size]), (0, data[first * size:count * size])):
+                if len(part):
+                    raw[start * size:start * size + len(part)] = part
+                    raw[(start + self.capacity) * size:(start + self.capacity) * size + len(part)] = part
+
+        # Publish the rows only after every column has been written
+        self.count += skip + count
+
+    def extend_columns(self, columns, derived=None):
+        """Bulk append packets given as one Python sequence per field, states as text, plus their derived channels if given."""
+        count = len(columns["team_id"])
+        buffers = {}
+        for name, code in TELEMETRY_FIELDS:
+            values = columns[name]
+            if name in STATE_FIELDS:
+                values = map(self.label_code, values)
+            buffers[name] = array(code, values)
+        if derived is not None:
+            for name, code in DERIVED_FIELDS:
+                buffers[name] = array(code, derived[name])
+        self.extend(buffers, count)
+
+    def label_code(self, label):
+        """Return the code for a text state, adding it to the label table if it is new."""
+        code = self.label_codes.get(label)
+        if code is None:
+            code = len(self.labels)
+            self.labels.append(label)
+            self.label_codes[label] = code
+        return code
+
+    def clear(self):
+        """Drop every stored packet. Only call this while nothing is writing."""
+        self.count = 0
+        self.labels = []
+        self.label_codes = {}
+
+    ######################### Reader Side #########################
+
+    def snapshot(self, window=None):
+        """Return a consistent view of the newest `window` packets (all readable packets if None)."""
+        count = self.count
+        length = min(count, self.capacity - self.headroom)
+        if window is not None:
+            length = min(length, window)
+
+        end = count % self.capacity + self.capacity
+        return TelemetrySnapshot(self, end - length, end)
+
+    def latest(self):
+        """Return the newest packet as a tuple in field order, or None if the store is empty."""
+        count = self.count
+        if count == 0:
+            return None
+        slot = (count - 1) % self.capacity
+        row = [column[slot] for column in self.ordered_columns]
+        for name in STATE_FIELDS:
+            index = FIELD_NAMES.index(name)
+            row[index] = self.labels[row[index]]
+        return tuple(row)
+
+    def __getitem__(self, name):
+        return self.snapshot()[name]
+
+    def __len__(self):
+        return min(self.count, self.capacity - self.headroom)
+
+
+##################################################################################################################################
+#   Snapshot Views
+##################################################################################################################################
+
+class TelemetrySnapshot:
+    """Read only window into a TelemetryStore, indexed by column name like the old telementary dict."""
+
+    def __init__(self, store, start, end):
+        self.store = store
+        self.start = start
+        self.end = end
+
+    def __getitem__(self, name):
+        view = self.store.views[name][self.start:self.end]
+        if name in STATE_FIELDS:
+            return LabelView(view, self.store.labels)
+        return view
+
+    def __len__(self):
+        return self.end - self.start
+
+    def keys(self):
+        return FIELD_NAMES + DERIVED_NAMES
+
+
+class LabelView:
+    """Sequence view that decodes state codes back into their text on access."""
+
+    def __init__(self, codes, labels):
+        self.codes = codes
+        self.labels = labels
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LabelView(self.codes[index], self.labels)
+        return self.labels[self.codes[index]]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        labels = self.labels
+        return (labels[code] for code in self.codes)
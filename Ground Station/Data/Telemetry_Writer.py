@@ -0,0 +1,184 @@
+import csv
+import logging
+import os
+import time
+from queue import Queue, Empty, Full
+from threading import Thread
+from Data.Binary_Log import BinaryLogWriter
+from Serial.Ingest_Metrics import RateLimitFilter
+
+log = logging.getLogger(__name__)
+log.addFilter(RateLimitFilter())
+
+
+# Queued after the last row to tell the writer thread to finish up
+STOP = object()
+
+
+class Marker(list):
+    """Fields of a marker line, written to the CSV as they are and left out of the binary recording."""
+
+
+##################################################################################################################################
+#   TelemetryWriter Class
+##################################################################################################################################
+
+class TelemetryWriter:
+    """Records telemetry rows to a CSV file from its own thread.
+
+    The serial thread only puts raw rows on a bounded queue. The writer thread formats them, writes
+    them in batches and flushes once `batch_size` rows are waiting or `flush_interval` seconds have
+    passed. If `binary_file` is given every batch is also appended to that binary recording.
+    Durability is set by `fsync_interval`: None leaves syncing to the OS, 0 syncs on every flush,
+    anything else syncs at most that often in seconds. If storage stalls long enough to fill
+    the queue, rows are dropped from the recording (and counted) instead of blocking the serial port.
+    `on_write(written_rows)` is called from the writer thread after every batch written without error.
+    start() opens the files on the calling thread and raises if they cannot be opened. A write or
+    sync that fails later is logged and kept in `error`, rows queued after the thread died are dropped.
+    """
+
+    def __init__(self, csv_file, format_row, binary_file=None, max_queue=10000, batch_size=64, flush_interval=0.5, fsync_interval=1.0, on_write=None):
+        self.csv_file = csv_file
+        self.format_row = format_row
+        self.binary_file = binary_file
+
+        # Batching and durability policy
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+
+        self.queue = Queue(maxsize=max_queue)
+        self.thread = None
+
+        # Rows lost because the queue was full, rows accepted onto the queue and rows flushed to the file
+        self.dropped_rows = 0
+        self.queued_rows = 0
+        self.written_rows = 0
+        self.on_write = on_write
+
+        # Text of the last write, sync or thread failure, None while recording works
+        self.error = None
+
+    def start(self):
+        """Open the recording and start the writer thread, raises OSError (or ValueError for a .vlb that is not a recording) if it cannot be opened."""
+        file = open(self.csv_file, mode='a', newline='')
+        try:
+            binary = BinaryLogWriter(self.binary_file) if self.binary_file else None
+        except (OSError, ValueError):
+            file.close()
+            raise
+        self.thread = Thread(target=self.run, args=(file, binary), daemon=True)
+        self.thread.start()
+
+    def put(self, row):
+        """Queue a raw telemetry row for recording without ever blocking the caller."""
+        if self.thread is None or not self.thread.is_alive():
+            self.dropped_rows += 1
+            return
+        try:
+            self.queue.put_nowait(row)
+            self.queued_rows += 1
+        except Full:
+            self.dropped_rows += 1
+
+    def put_marker(self, fields):
+        """Queue a marker line (first field starting with '#') to be written between the rows around it.
+
+        Markers are not rows, one that finds the queue full is left out without being counted.
+        """
+        if self.thread is None or not self.thread.is_alive():
+            return
+        try:
+            self.queue.put_nowait(Marker(fields))
+        except Full:
+            pass
+
+    def stop(self):
+        """Write out every queued row, sync the file and wait for the thread to exit."""
+        if self.thread is not None:
+            # A thread that died leaves nobody to take the stop marker off a full queue
+            while self.thread.is_alive():
+                try:
+                    self.queue.put(STOP, timeout=0.5)
+                    break
+                except Full:
+                    pass
+            self.thread.join()
+            self.thread = None
+
+    ######################### Writer Thread #########################
+
+    def run(self, file, binary):
+        try:
+            self.write_loop(file, binary)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            log.exception("Recording thread failed, new rows are dropped")
+        finally:
+            file.close()
+            if binary is not None:
+                binary.close()
+
+    def write_loop(self, file, binary):
+        writer = csv.writer(file)
+        batch = []
+        last_flush = last_sync = time.monotonic()
+
+        while True:
+            try:
+                row = self.queue.get(timeout=self.flush_interval)
+            except Empty:
+                row = None
+
+            if row is STOP:
+                break
+            if row is not None:
+                batch.append(row)
+
+            now = time.monotonic()
+            if len(batch) >= self.batch_size or (batch and now - last_flush >= self.flush_interval):
+                self.write_batch(file, writer, binary, batch)
+                last_flush = now
+                if self.fsync_interval is not None and now - last_sync >= self.fsync_interval:
+                    self.sync(file, binary)
+                    last_sync = now
+
+        # Drain: everything queued before the stop marker is already in the batch
+        self.write_batch(file, writer, binary, batch)
+        if self.fsync_interval is not None:
+            self.sync(file, binary)
+
+    def write_batch(self, file, writer, binary, batch):
+        try:
+            if any(type(row) is Marker for row in batch):
+                # Rare: keep each marker in place between the rows around it
+                writer.writerows(row if type(row) is Marker else self.format_row(row) for row in batch)
+                rows = [row for row in batch if type(row) is not Marker]
+            else:
+                writer.writerows(map(self.format_row, batch))
+                rows = batch
+            file.flush()
+            if binary is not None:
+                binary.write_rows(rows)
+                binary.flush()
+            # Data rows only, taken before the clear below as rows can be the batch itself
+            written = len(rows)
+        except OSError as e:
+            self.error = f"Write failed: {e}"
+            log.error("Error writing recording: %s", e)
+            return
+        finally:
+            batch.clear()
+
+        self.written_rows += written
+        if self.on_write is not None:
+            self.on_write(self.written_rows)
+
+    def sync(self, file, binary):
+        try:
+            os.fsync(file.fileno())
+            if binary is not None:
+                os.fsync(binary.fileno())
+        except OSError as e:
+            self.error = f"Sync failed: {e}"
+            log.error("Error syncing recording: %s", e)
@@ -0,0 +1,139 @@
+import asyncio
+import heapq
+import math
+import selectors
+from PySide6.QtCore import QObject, QSocketNotifier, QTimer
+
+
+##################################################################################################################################
+#   QtEventLoop Class
+##################################################################################################################################
+
+class QtEventLoop(asyncio.SelectorEventLoop):
+    """Selector event loop that is stepped by AsyncioBridge instead of running a blocking loop of its own.
+
+    It only adds bookkeeping of when it next has work to do: every callback and timer scheduled on
+    it records its due time and calls `wake`, so the bridge can arm a Qt timer for it.
+    """
+
+    def __init__(self, selector, wake):
+        super().__init__(selector)
+        self.wake = wake
+
+        # Loop times at which callbacks or timers are due, cancelled timers only cost a spare step
+        self.deadlines = []
+
+    def call_soon(self, callback, *args, context=None):
+        handle = super().call_soon(callback, *args, context=context)
+        heapq.heappush(self.deadlines, self.time())
+        self.wake()
+        return handle
+
+    def call_at(self, when, callback, *args, context=None):
+        handle = super().call_at(when, callback, *args, context=context)
+        heapq.heappush(self.deadlines, when)
+        self.wake()
+        return handle
+
+    def run_once(self):
+        """One pass of the loop without blocking: runs what is ready and due, and whatever the selector reports."""
+        # The base call_soon, the stop itself must not ask for another step
+        asyncio.SelectorEventLoop.call_soon(self, self.stop)
+        self.run_forever()
+
+
+##################################################################################################################################
+#   AsyncioBridge Class
+##################################################################################################################################
+
+class AsyncioBridge(QObject):
+    """Runs an asyncio event loop inside the Qt event loop, in the style of qasync, without another thread.
+
+    The loop's selector (epoll or kqueue) has a descriptor of its own that turns readable when any
+    descriptor the loop waits on is ready, so one QSocketNotifier wakes the loop for every port,
+    socket and call_soon_threadsafe. A single shot QTimer covers callbacks and timers. Each wake
+    runs one non-blocking pass of the loop, so coroutines and Qt slots take turns on the GUI thread.
+    Where the selector has no descriptor (select() on Windows) the loop is polled every `poll_ms`.
+    PySide6.QtAsyncio is not used as its loop does not implement add_reader.
+    """
+
+    def __init__(self, parent=None, poll_ms=10):
+        super().__init__(parent)
+        selector = selectors.DefaultSelector()
+        self.loop = QtEventLoop(selector, self.schedule)
+        asyncio.set_event_loop(self.loop)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.step)
+
+        if hasattr(selector, "fileno"):
+            self.notifier = QSocketNotifier(selector.fileno(), QSocketNotifier.Read, self)
+            self.notifier.activated.connect(self.step)
+            self.poll_timer = None
+        else:
+            self.notifier = None
+            self.poll_timer = QTimer(self)
+            self.poll_timer.timeout.connect(self.step)
+            self.poll_timer.start(poll_ms)
+
+        # True during a pass, wakes requested meanwhile are handled once it is over
+        self.stepping = False
+
+        # Deadline the timer is running for, it is only restarted when an earlier one comes up
+        self.armed = None
+
+    def step(self, *args):
+        # A modal dialog opened from a coroutine spins the Qt loop inside a pass, the pass is not re-entered
+        if self.stepping or self.loop.is_closed():
+            return
+        self.stepping = True
+        started = self.loop.time()
+        try:
+            self.loop.run_once()
+        finally:
+            self.stepping = False
+
+        # Everything due before the pass started has been run
+        deadlines = self.loop.deadlines
+        while deadlines and deadlines[0] < started:
+            heapq.heappop(deadlines)
+        self.schedule()
+
+    def schedule(self):
+        """Arm the timer for the earliest callback or timer still due."""
+        if self.stepping or self.loop.is_closed():
+            return
+        deadlines = self.loop.deadlines
+        if not deadlines:
+            if self.timer.isActive():
+                self.timer.stop()
+            return
+        if deadlines[0] == self.armed and self.timer.isActive():
+            return
+        self.armed = deadlines[0]
+        delay = max(0.0, self.armed - self.loop.time())
+        self.timer.start(math.ceil(delay * 1000))
+
+    def create_task(self, coro):
+        """Start a coroutine on the loop, e.g. from a Qt slot."""
+        return self.loop.create_task(coro)
+
+    def close(self):
+        """Cancel every task and run the loop until they have all finished, then close it."""
+        if self.loop.is_closed():
+            return
+        self.timer.stop()
+        if self.notifier is not None:
+            self.notifier.setEnabled(False)
+        if self.poll_timer is not None:
+            self.poll_timer.stop()
+
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        self.loop.close()
+        asyncio.set_event_loop(None)
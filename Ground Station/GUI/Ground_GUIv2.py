@@ -1,4 +1,7 @@
 # Required libraries and scripts
+import functools
+import logging
+import os
 import sys
 from PySide6.QtWidgets import (
     QApplication,
@@ -8,12 +11,14 @@ from PySide6.QtWidgets import (
     QLabel,
     QPushButton,
     QComboBox,
+    QCheckBox,
     QDialog,
     QLineEdit,
     QSplitter,
 )
 from PySide6.QtCore import (
     Qt,
+    QTimer,
     Signal
 )
 from PySide6.QtGui import (
@@ -22,12 +27,30 @@ from PySide6.QtGui import (
 )
 import  Serial.Ground_serial as sr
 import LiveGraphing.Ground_livev2 as gl
+from LiveGraphing.Painter_Graph import PainterGraph
+from Data.Recording_Catalog import SORT_ORDERS, format_entry
 import Data.Data_Handler as data
+from GUI.Update_Dispatcher import UpdateDispatcher
 
 ## OBJECT DECLARATIONS
 csv_handler = data.CSV_Handler()
 serial = sr.SerialReader()
 
+# Graph backends --graph-backend picks from, all with LiveGraph's interface
+GRAPH_BACKENDS = {
+    "matplotlib": gl.LiveGraph,
+    "qpainter": PainterGraph,
+}
+
+# Builds the graphs, matplotlib unless --graph-backend or --render-process picks another way to draw them
+graph_factory = gl.LiveGraph
+
+# Most graph/label refreshes per second, packets arriving faster than this are drawn together
+MAX_REFRESH_HZ = 30
+
+# How often the ingest metrics panel refreshes, in milliseconds
+METRICS_INTERVAL_MS = 1000
+
 class MainWindow(QMainWindow):
     window_closed = Signal()
     def __init__(self):
@@ -49,33 +72,53 @@ class MainWindow(QMainWindow):
         # Top and bottom layouts using QSplitter to make them resizable
         top_splitter = QSplitter(self)
         top_splitter.setOrientation(Qt.Horizontal)
-        self.graph1 = gl.LiveGraph("Altitude", "Time(ms)", "Altitude(m)")
-        self.graph2 = gl.LiveGraph("Temperature", "Time(ms)", "Temperature(C)")
+        self.graph1 = graph_factory("Altitude", "Time(ms)", "Altitude(m)", channel="altitude")
+        self.graph2 = graph_factory("Temperature", "Time(ms)", "Temperature(C)", channel="temp")
         top_splitter.addWidget(self.graph1)
         top_splitter.addWidget(self.graph2)
 
         bottom_splitter = QSplitter(self)
         bottom_splitter.setOrientation(Qt.Horizontal)
-        self.graph3 = gl.LiveGraph("Voltage", "Time(ms)", "Voltage(V)")
+        self.graph3 = graph_factory("Voltage", "Time(ms)", "Voltage(V)", channel="voltage")
         self.info4 = gl.LiveData()
+        self.metrics_panel = gl.MetricsPanel()
         bottom_splitter.addWidget(self.graph3)
         bottom_splitter.addWidget(self.info4)
+        bottom_splitter.addWidget(self.metrics_panel)
+
+        # Each graph can be switched to any telemetry or derived channel
+        self.graphs = (self.graph1, self.graph2, self.graph3)
+        for graph in self.graphs:
+            graph.channel_changed.connect(lambda channel, graph=graph: self.change_channel(graph))
+
+        # Picks the part of an opened recording the graphs show, hidden while there is none
+        self.scrubber = gl.TimelineScrubber()
+        self.scrubber.window_changed.connect(self.show_window)
+        self.scrubber.hide()
 
         # Add the splitters to the main layout
         main_layout.addWidget(top_splitter)
         main_layout.addWidget(bottom_splitter)
+        main_layout.addWidget(self.scrubber)
 
         # Set stretch factors to make sure each widget resizes proportionally
         top_splitter.setStretchFactor(0, 1)  # First widget takes 50%
         top_splitter.setStretchFactor(1, 1)  # Second widget takes 50%
         bottom_splitter.setStretchFactor(0, 1)  # First widget takes 50%
         bottom_splitter.setStretchFactor(1, 1)  # Second widget takes 50%
+        bottom_splitter.setStretchFactor(2, 1)
 
         # Create menu bar
         self.create_menu_bar()
 
-        # Serial Callback
-        serial.register_callback(self.update_data)
+        # Serial Callback, routed through the dispatcher so redraws happen on the GUI thread at a capped rate
+        self.dispatcher = UpdateDispatcher(self.update_data, MAX_REFRESH_HZ)
+        serial.register_callback(self.dispatcher.request_update)
+
+        # Metrics are refreshed on a timer so the rates fall to zero when packets stop
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.timeout.connect(self.update_metrics)
+        self.metrics_timer.start(METRICS_INTERVAL_MS)
 
     def closeEvent(self, event):
         self.window_closed.emit()
@@ -144,25 +187,78 @@ class MainWindow(QMainWindow):
     def open_csv(self):
         if serial.running == False:
             self.open_window = OpenCSV(self, "CSV Files")
-            self.open_window.csv_opened.connect(self.update_data)
+            self.open_window.csv_opened.connect(self.show_recording)
             self.open_window.show()
     
     # Function to close csv file, called by the close file action in menu bar
     def close_csv(self):
         if serial.running == False:
             serial.telementary, serial.current_error, serial.current_status, serial.csv_file = csv_handler.close_csv(serial.telementary, serial.current_error, serial.current_status, serial.csv_file)
+            self.scrubber.clear()
+            self.scrubber.hide()
             self.update_data()
 
     def update_data(self):
-        self.graph1.update_graph(serial.telementary["mission_time"], serial.telementary["altitude"])
-        self.graph2.update_graph(serial.telementary["mission_time"], serial.telementary["temp"])
-        self.graph3.update_graph(serial.telementary["mission_time"], serial.telementary["voltage"])
-        self.info4.update_labels(serial.telementary["mission_time"],
-                                 serial.telementary["packet_count"],
-                                 serial.telementary["sw_state"],
-                                 serial.telementary["pl_state"],
-                                 serial.telementary["gps_latitude"],
-                                 serial.telementary["gps_longitude"])
+        # Packets counted before the snapshot are all in it, used for the arrival to screen latency
+        packets = serial.metrics.packets
+
+        # Take one snapshot so every widget shows the same packets
+        telemetry = serial.telementary.snapshot()
+        for graph in self.graphs:
+            graph.update_graph(telemetry["mission_time"], telemetry[graph.channel])
+        self.info4.update_labels(telemetry["mission_time"],
+                                 telemetry["packet_count"],
+                                 telemetry["sw_state"],
+                                 telemetry["pl_state"],
+                                 telemetry["gps_latitude"],
+                                 telemetry["gps_longitude"])
+        serial.metrics.record_render(packets)
+
+    def update_metrics(self):
+        self.metrics_panel.update_metrics(serial.metrics_snapshot())
+
+    # Redraws a graph switched to another channel, from the opened recording or the live store
+    def change_channel(self, graph):
+        mission = csv_handler.mission
+        if mission is not None:
+            graph.show_history(mission.ordered("mission_time"), mission.ordered(graph.channel))
+            if self.scrubber.window is not None:
+                graph.show_window(*self.scrubber.window)
+        else:
+            telemetry = serial.telementary.snapshot()
+            graph.update_graph(telemetry["mission_time"], telemetry[graph.channel])
+
+    # Shows the whole opened recording on the graphs, the labels show its last packet
+    def show_recording(self):
+        self.update_data()
+        mission = csv_handler.mission
+        if mission is not None:
+            # In mission time order, so a firmware reset cannot fold the graphs back on themselves
+            mission_time = mission.ordered("mission_time")
+            for graph in self.graphs:
+                graph.show_history(mission_time, mission.ordered(graph.channel))
+            self.scrubber.set_recording(mission.time_index().time_range(), mission.anchors())
+            self.scrubber.show()
+        else:
+            self.scrubber.hide()
+
+    # Shows one window of the opened recording, the labels show its last packet
+    def show_window(self, start, end):
+        mission = csv_handler.mission
+        if mission is None:
+            return
+        for graph in self.graphs:
+            graph.show_window(start, end)
+
+        # Only the last packet in the window is read from the recording
+        last = mission.last_in_window(start, end)
+        if last is not None:
+            self.info4.update_labels(last["mission_time"].tolist(),
+                                     last["packet_count"].tolist(),
+                                     [mission.labels[code] for code in last["sw_state"]],
+                                     [mission.labels[code] for code in last["pl_state"]],
+                                     last["gps_latitude"].tolist(),
+                                     last["gps_longitude"].tolist())
 
 
 ######################### Main Program Driver #########################
@@ -170,9 +266,15 @@ class MainWindow(QMainWindow):
     def toggle_serial(self):
         if serial.running == False:
             if serial.opened_port != '' and serial.baud_rate != '' and csv_handler.file != '':
-                print(f"Starting serial thread with port: {serial.opened_port}, baudrate: {serial.baud_rate}, csv: {csv_handler.file}")
                 self.run_serial.setText("Stop Serial")
+                # The serial port becomes the store's writer, a followed recording is left alone from here
+                csv_handler.stop_following()
+                self.scrubber.hide()
                 serial.start()
+                if not serial.running:
+                    self.run_serial.setText("Run Serial")
+                    self.error_window = ErrorWindow(self, "Could not open the serial port or the recording, see the log")
+                    self.error_window.exec()
             else:
                 self.error_window = ErrorWindow(self, "Need valid COM port, baud rate, and csv filepath")
                 self.error_window.exec()
@@ -241,28 +343,47 @@ class OpenCSV(QWidget):
         self.setWindowTitle("Open CSV File")
         layout = QVBoxLayout()
         self.setLayout(layout)
-        self.setFixedSize(300, 100)
+        self.setFixedSize(520, 160)
         self.parent = parent
+        self.directory = directory
         center_on_parent(self)
         self.setWindowIcon(QIcon(r'GUI\wolf_icon.ico'))
 
-        files = [""]
-        files.extend(csv_handler.files_in_directory(directory))
+        # Recordings come from the directory's catalog, listed with their summary
+        self.sort_select = QComboBox()
+        self.sort_select.addItems(SORT_ORDERS)
+        self.sort_select.currentTextChanged.connect(self.list_recordings)
         self.file_select = QComboBox()
-        self.file_select.addItems(files)
+        self.list_recordings(self.sort_select.currentText())
+
+        # Follow a recording another station (or a GUI that crashed) is still writing
+        self.follow_check = QCheckBox("Follow as it is written")
         
         confirm_button = QPushButton("Confirm")
         confirm_button.setCheckable(True)
         confirm_button.clicked.connect(self.open_csv)
 
 
+        layout.addWidget(self.sort_select)
         layout.addWidget(self.file_select)
+        layout.addWidget(self.follow_check)
         layout.addWidget(confirm_button)
 
+    def list_recordings(self, order):
+        self.file_select.clear()
+        self.file_select.addItem("", "")
+        for entry in csv_handler.recordings(self.directory, order):
+            self.file_select.addItem(format_entry(entry), entry["name"])
+
     def open_csv(self):
-        csv_handler.file = csv_handler.set_csv(self.file_select.currentText())
-        serial.set_csv(csv_handler.file)
-        csv_handler.open_csv(serial.telementary)
+        csv_handler.file = csv_handler.set_csv(self.file_select.currentData())
+        # New packets always go to the CSV recording, which keeps its binary recording alongside
+        serial.set_csv(os.path.splitext(csv_handler.file)[0] + '.csv')
+        if self.follow_check.isChecked():
+            csv_handler.file = serial.csv_file
+            csv_handler.follow_csv(serial.telementary, self.parent.dispatcher.request_update)
+        else:
+            csv_handler.open_csv(serial.telementary)
         #print(f"Updated Telementary: {serial.telementary}") # Debugging Line
         self.csv_opened.emit()
         self.close()
@@ -305,7 +426,7 @@ class SetupWindow(QWidget):
 
         # Set layout and Title
         self.setWindowTitle(title)
-        self.setFixedSize(300, 100)
+        self.setFixedSize(300, 130)
         layout = QVBoxLayout()
         self.setLayout(layout)
         self.parent = parent
@@ -318,10 +439,15 @@ class SetupWindow(QWidget):
         # Init port and baud selections
         self.port_select = QComboBox()
         self.port_select.addItems(ports)
+        self.port_select.setEditable(True)     # Allows typing ports that are not listed, e.g. a simulator pty or loop://
         
         self.baud_select = QComboBox()
         self.baud_select.addItems(['', '1200', '1800', '2400', '4800', '9600', '19200', '115200'])
 
+        # Must match FRAMED_TELEMETRY in ValhallaEmbedded.ino
+        self.framed_check = QCheckBox("Framed telemetry (COBS + CRC)")
+        self.framed_check.setChecked(serial.framed)
+
         # Init Confirm Button
         confirm_button = QPushButton("Confirm")
         confirm_button.setCheckable(True)
@@ -330,6 +456,7 @@ class SetupWindow(QWidget):
         # Add Widgits
         layout.addWidget(self.port_select)
         layout.addWidget(self.baud_select)
+        layout.addWidget(self.framed_check)
         layout.addWidget(confirm_button)
 
         # Reference for the error window DO NOT REMOVE OR IT WILL NOT WORK
@@ -350,6 +477,7 @@ class SetupWindow(QWidget):
         else:
             serial.opened_port= self.port_select.currentText()
             serial.baud_rate = self.baud_select.currentText()
+            serial.framed = self.framed_check.isChecked()
             self.close()
 
 # Status Window, called from show_status_message, shows connected port and baud, I need to set it up to also display if a connection is successful
@@ -394,8 +522,35 @@ class StatusWindow(QWidget):
 ##################################################################################################################################################################
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     app = QApplication([])
+
+    # --asyncio: read the port on an asyncio loop run by the Qt event loop instead of a reader thread (not on Windows)
+    if "--asyncio" in sys.argv:
+        from GUI.Async_Bridge import AsyncioBridge
+        from Serial.Async_Serial import AsyncSerialReader
+        bridge = AsyncioBridge(app)
+        app.aboutToQuit.connect(bridge.close)
+        serial = AsyncSerialReader()
+
+    # --graph-backend NAME: matplotlib, or qpainter for the lighter native renderer on slow machines
+    if "--graph-backend" in sys.argv:
+        backend = sys.argv[sys.argv.index("--graph-backend") + 1:][:1]
+        if not backend or backend[0] not in GRAPH_BACKENDS:
+            sys.exit(f"--graph-backend takes one of: {', '.join(GRAPH_BACKENDS)}")
+        graph_factory = GRAPH_BACKENDS[backend[0]]
+
+    # --render-process: draw the graphs with matplotlib in a worker process that reads the telemetry store through shared memory
+    if "--render-process" in sys.argv:
+        from Data.Shared_Telemetry import SharedTelemetryStore
+        from LiveGraphing.Remote_Graph import RenderProcess, RemoteGraph
+        serial.telementary = SharedTelemetryStore(serial.telementary.capacity, serial.telementary.headroom)
+        renderer = RenderProcess(serial.telementary, parent=app)
+        app.aboutToQuit.connect(renderer.close)
+        app.aboutToQuit.connect(serial.telementary.close)
+        graph_factory = functools.partial(RemoteGraph, renderer=renderer)
     window = MainWindow()
     window.window_closed.connect(serial.stop)
+    window.window_closed.connect(csv_handler.stop_following)
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
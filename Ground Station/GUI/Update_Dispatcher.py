@@ -0,0 +1,59 @@
+import time
+from threading import Lock
+from PySide6.QtCore import QObject, QTimer, Qt, Signal
+
+
+##################################################################################################################################
+#   UpdateDispatcher Class
+##################################################################################################################################
+
+class UpdateDispatcher(QObject):
+    """Moves refresh requests from any thread onto the Qt event loop.
+
+    Requests made while a refresh is already pending are folded into it, and refreshes are spaced
+    at least 1/max_refresh_hz apart, so a burst of packets costs one redraw and never blocks the caller.
+    """
+
+    update_requested = Signal()
+
+    def __init__(self, refresh, max_refresh_hz=30):
+        super().__init__()
+
+        # Function that actually redraws, always called on the GUI thread
+        self.refresh = refresh
+        self.min_interval = 1.0 / max_refresh_hz
+        self.last_refresh = 0.0
+
+        # True while a refresh is queued or waiting on the timer
+        self.pending = False
+        self.lock = Lock()
+
+        # Holds back a refresh that would come sooner than the rate cap allows
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.run_refresh)
+
+        # Queued connection so the slot runs on the thread that owns the dispatcher
+        self.update_requested.connect(self.schedule_refresh, Qt.QueuedConnection)
+
+    def request_update(self):
+        """Ask for a refresh, safe to call from the serial thread."""
+        with self.lock:
+            if self.pending:
+                return
+            self.pending = True
+        self.update_requested.emit()
+
+    def schedule_refresh(self):
+        wait = self.min_interval - (time.monotonic() - self.last_refresh)
+        if wait > 0:
+            self.timer.start(int(wait * 1000))
+        else:
+            self.run_refresh()
+
+    def run_refresh(self):
+        # Clear the flag first so packets arriving during the redraw queue another one
+        with self.lock:
+            self.pending = False
+        self.last_refresh = time.monotonic()
+        self.refresh()
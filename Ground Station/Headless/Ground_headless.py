@@ -0,0 +1,213 @@
+"""Headless ground station: reads and records a flight from the command line without the GUI.
+
+Nothing from PySide6, matplotlib or NumPy is imported, so it starts quickly on low-power laptops.
+Run from the Ground Station directory, for example:
+    python -m Headless.Ground_headless COM3 --baud 115200 --name Flight
+    python -m Headless.Ground_headless /dev/ttyACM0 --csv "CSV Files/Flight1.csv" --status-file status.json
+    python -m Headless.Ground_headless --list-ports
+    python -m Headless.Ground_headless COM3 COM4 --name Flight   (redundant radios and/or several vehicles)
+
+The recording is the usual CSV (plus binary sidecar), so the GUI can open it while or after it is
+written. --status-file keeps a small JSON summary up to date for other tools to attach to.
+With several ports (or --sessions) every team_id heard gets its own '<name><i>_<team_id>.csv', and
+packets received on more than one port are recorded once.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from threading import Event
+import Serial.Ground_serial as sr
+from Serial.Session_Manager import SessionManager, allocate_recording_base
+from Data.Data_Handler import CSV_Handler
+from Data.Telemetry_Store import CSV_HEADER
+
+
+##################################################################################################################################
+#   HeadlessStation Class
+##################################################################################################################################
+
+class HeadlessStation:
+    """Runs a SerialReader and its recording, and reports progress every `report_interval` seconds."""
+
+    def __init__(self, port, baud_rate, csv_file, report_interval=5.0, status_file=None, framed=False):
+        self.serial = sr.SerialReader()
+        self.serial.opened_port = port
+        self.serial.baud_rate = baud_rate
+        self.serial.framed = framed
+        self.serial.set_csv(csv_file)
+
+        self.report_interval = report_interval
+        self.status_file = status_file
+        self.start_time = None
+
+        # Set from a signal handler to end run()
+        self.stop_event = Event()
+
+    def status(self):
+        """Summary of the session so far."""
+        latest = self.serial.telementary.latest()
+        return {
+            "port": self.serial.opened_port,
+            "csv_file": self.serial.csv_file,
+            "running": self.serial.running,
+            "uptime_s": round(time.monotonic() - self.start_time, 1) if self.start_time else 0.0,
+            "packet_count": latest[2] if latest else None,
+            "mission_time": self.serial.format_time(latest[1]) if latest else None,
+            "sw_state": latest[3] if latest else None,
+            "pl_state": latest[4] if latest else None,
+            "altitude": latest[5] if latest else None,
+            "current_status": self.serial.current_status,
+            "current_error": self.serial.current_error,
+            **self.serial.metrics_snapshot(),
+        }
+
+    def report(self):
+        status = self.status()
+        print(f"[{status['uptime_s']:8.1f}s] packets: {status['packets']} ({status['packets_per_s']:.1f}/s)  "
+              f"failures: {status['parse_failures']}/{status['frame_errors']}  missing: {status['missing_packets']} ({status['loss_rate']:.2%})  "
+              f"queue: {status['queue_depth']}  dropped: {status['dropped_rows']}  recording error: {status['recording_error']!r}  "
+              f"time: {status['mission_time']}  alt: {status['altitude']}  "
+              f"state: {status['sw_state']}/{status['pl_state']}  status: {status['current_status']!r}  "
+              f"error: {status['current_error']!r}", flush=True)
+
+        self.write_status_file(status)
+
+    def write_status_file(self, status):
+        if self.status_file:
+            # Replace the file in one step so a reader never sees a half written summary
+            temp_file = self.status_file + ".tmp"
+            with open(temp_file, "w") as file:
+                json.dump(status, file, indent=2)
+            os.replace(temp_file, self.status_file)
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def run(self):
+        """Read and record until interrupted or the port fails, returns a process exit code."""
+        self.serial.start()
+        if not self.serial.running:
+            return 1
+        self.start_time = time.monotonic()
+
+        try:
+            while self.serial.running and not self.stop_event.wait(self.report_interval):
+                self.report()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.serial.stop()
+            self.report()
+            print(f"Recording closed: {self.serial.csv_file}")
+        return 0
+
+
+##################################################################################################################################
+#   SessionStation Class
+##################################################################################################################################
+
+class SessionStation(HeadlessStation):
+    """Several ports and vehicles at once through a SessionManager, one recording per team_id."""
+
+    def __init__(self, ports, baud_rate, recording_base, report_interval=5.0, status_file=None, framed=False):
+        self.sessions = SessionManager(recording_base)
+        for port in ports:
+            self.sessions.add_port(port, baud_rate, framed)
+
+        self.report_interval = report_interval
+        self.status_file = status_file
+        self.start_time = None
+        self.stop_event = Event()
+
+    def status(self):
+        status = self.sessions.status()
+        status["uptime_s"] = round(time.monotonic() - self.start_time, 1) if self.start_time else 0.0
+        return status
+
+    def report(self):
+        status = self.status()
+        lines = [f"[{status['uptime_s']:8.1f}s] {len(status['ports'])} ports, {len(status['vehicles'])} vehicles"]
+        for port, port_status in status["ports"].items():
+            lines.append(f"  port {port}: {'running' if port_status['running'] else 'stopped'}  "
+                         f"packets: {port_status['packets']} ({port_status['packets_per_s']:.1f}/s)  "
+                         f"failures: {port_status['parse_failures']}/{port_status['frame_errors']}  "
+                         f"status: {port_status['current_status']!r}  error: {port_status['current_error']!r}")
+        for team_id, vehicle in status["vehicles"].items():
+            lines.append(f"  team {team_id}: packets: {vehicle['packets']}  duplicates dropped: {vehicle['duplicates_dropped']}  "
+                         f"missing: {vehicle['missing_packets']} ({vehicle['loss_rate']:.2%})  "
+                         f"queue: {vehicle['queue_depth']}  dropped: {vehicle['dropped_rows']}  recording error: {vehicle['recording_error']!r}  "
+                         f"time: {vehicle['mission_time']}  alt: {vehicle['altitude']}  "
+                         f"state: {vehicle['sw_state']}/{vehicle['pl_state']}")
+        print("\n".join(lines), flush=True)
+        self.write_status_file(status)
+
+    def run(self):
+        if not self.sessions.start():
+            return 1
+        self.start_time = time.monotonic()
+
+        try:
+            while self.sessions.running and not self.stop_event.wait(self.report_interval):
+                self.report()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.sessions.stop()
+            self.report()
+            for vehicle in self.sessions.vehicles.values():
+                print(f"Recording closed: {vehicle.csv_file}")
+        return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("port", nargs="*", help="serial port names or pyserial URLs")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--csv", help="record to this CSV, appending if it exists")
+    parser.add_argument("--name", default="Flight", help="create a new '<name><i>.csv' in --directory (default)")
+    parser.add_argument("--directory", default="CSV Files")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between status reports")
+    parser.add_argument("--status-file", help="keep a JSON status summary in this file")
+    parser.add_argument("--list-ports", action="store_true", help="list serial ports and exit")
+    parser.add_argument("--sessions", action="store_true", help="one recording per team_id, implied by several ports")
+    parser.add_argument("--framed", action="store_true", help="the pico sends COBS/CRC frames (FRAMED_TELEMETRY 1)")
+    parser.add_argument("--verbose", action="store_true", help="log every line read")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if args.list_ports:
+        print("\n".join(sr.SerialReader().return_com_ports()) or "No serial ports found")
+        sys.exit(0)
+    if not args.port:
+        parser.error("a port is required")
+
+    if len(args.port) > 1 or args.sessions:
+        if args.csv:
+            parser.error("--csv records a single port, use --name/--directory with several ports")
+        os.makedirs(args.directory, exist_ok=True)
+        station = SessionStation(args.port, args.baud, allocate_recording_base(args.directory, args.name),
+                                 args.interval, args.status_file, args.framed)
+        signal.signal(signal.SIGTERM, station.stop)
+        print(f"Recording {', '.join(args.port)} at {args.baud} baud to {station.sessions.recording_base}_<team_id>.csv", flush=True)
+        sys.exit(station.run())
+
+    csv_file = args.csv
+    if not csv_file:
+        csv_handler = CSV_Handler()
+        csv_handler.directory = args.directory
+        os.makedirs(args.directory, exist_ok=True)
+        csv_handler.create_csv(args.name)
+        csv_file = csv_handler.file
+    elif not os.path.exists(csv_file):
+        with open(csv_file, mode='w', newline='') as file:
+            csv.writer(file).writerow(CSV_HEADER)
+
+    station = HeadlessStation(args.port[0], args.baud, csv_file, args.interval, args.status_file, args.framed)
+    signal.signal(signal.SIGTERM, station.stop)
+    print(f"Recording {args.port[0]} at {args.baud} baud to {csv_file}", flush=True)
+    sys.exit(station.run())
@@ -0,0 +1,91 @@
+import numpy as np
+
+
+def padded_limits(y_values):
+    """Axis limits around the finite values with a 10% margin, None if there are none."""
+    y_values = np.asarray(y_values, dtype=float)
+    y_values = y_values[np.isfinite(y_values)]
+    if len(y_values) == 0:
+        return None
+    y_min, y_max = y_values.min(), y_values.max()
+    y_pad = max((y_max - y_min) * 0.1, 1)
+    return y_min - y_pad, y_max + y_pad
+
+
+def minmax_decimate(x_values, y_values, buckets):
+    """Reduce a series to at most about 2 * buckets points, keeping each bucket's min and max.
+
+    Peaks such as apogee always survive because the extreme of every bucket is kept. The first
+    and last points are always kept so the line spans the same range.
+    """
+    x_values = np.asarray(x_values)
+    y_values = np.asarray(y_values)
+    count = len(y_values)
+    if buckets <= 0 or count <= 2 * buckets:
+        return x_values, y_values
+
+    indexes = minmax_indexes(y_values, -(-count // buckets))
+    return x_values[indexes], y_values[indexes]
+
+
+def minmax_indexes(y_values, bucket_size):
+    """Sorted indexes of the min and max of every bucket_size chunk, plus the first and last point."""
+    count = len(y_values)
+    full = count - count % bucket_size
+    chunks = y_values[:full].reshape(-1, bucket_size)
+    starts = np.arange(0, full, bucket_size)
+
+    pairs = np.stack((chunks.argmin(axis=1) + starts, chunks.argmax(axis=1) + starts), axis=1)
+    pairs.sort(axis=1)
+    indexes = [np.zeros(1, dtype=np.int64), pairs.ravel()]
+
+    # A short last chunk keeps its own extremes
+    if full < count:
+        tail = y_values[full:]
+        indexes.append(np.sort([full + tail.argmin(), full + tail.argmax()]))
+    indexes.append(np.array([count - 1]))
+
+    indexes = np.concatenate(indexes)
+    return indexes[np.concatenate(([True], np.diff(indexes) > 0))]
+
+
+##################################################################################################################################
+#   DecimationPyramid Class
+##################################################################################################################################
+
+class DecimationPyramid:
+    """Precomputed min/max levels of one series for fast zooming and panning.
+
+    Level 0 is the full series, each level above keeps the min and max of `factor` times larger
+    buckets. A query picks the finest level that still fits the requested number of points in
+    the visible range, so any view costs about the same no matter how long the series is.
+    x_values must be sorted (mission time).
+    """
+
+    def __init__(self, x_values, y_values, factor=4, min_points=2048):
+        x_values = np.asarray(x_values)
+        y_values = np.asarray(y_values)
+        self.levels = [(x_values, y_values)]
+
+        # Each level is built from the one below, which already holds min/max pairs
+        while len(self.levels[-1][1]) > min_points:
+            level_x, level_y = self.levels[-1]
+            indexes = minmax_indexes(level_y, 2 * factor)
+            self.levels.append((level_x[indexes], level_y[indexes]))
+
+    def x_range(self):
+        x_values = self.levels[0][0]
+        if len(x_values) == 0:
+            return None
+        return x_values[0], x_values[-1]
+
+    def query(self, x_min, x_max, max_points):
+        """Return (x, y) covering [x_min, x_max] with at most about max_points points."""
+        for level_x, level_y in self.levels:
+            start = max(np.searchsorted(level_x, x_min, side="left") - 1, 0)
+            end = min(np.searchsorted(level_x, x_max, side="right") + 1, len(level_x))
+            if end - start <= max_points:
+                return level_x[start:end], level_y[start:end]
+
+        # Even the coarsest level is too dense for this view, decimate it on the fly
+        return minmax_decimate(level_x[start:end], level_y[start:end], max_points // 2)
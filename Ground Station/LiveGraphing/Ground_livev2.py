@@ -1,60 +1,280 @@
-import sys
-import random                                                                             
-from PySide6.QtWidgets import QVBoxLayout, QWidget, QLabel, QSizePolicy
+from abc import ABCMeta, abstractmethod
+from PySide6.QtWidgets import QVBoxLayout, QHBoxLayout, QWidget, QLabel, QSizePolicy, QLineEdit, QPushButton, QSlider, QComboBox
 from PySide6.QtGui import QFont
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
+from PySide6.QtCore import Qt, QTimer, Signal
 
 
-class LiveGraph(QWidget):
-    def __init__(self, graph_title, x_label, y_label):
+# Telemetry store columns a graph can be switched to, with the title and y axis label shown for each
+CHANNELS = {
+    "altitude": ("Altitude", "Altitude(m)"),
+    "altitude_smoothed": ("Smoothed Altitude", "Altitude(m)"),
+    "vertical_speed": ("Vertical Speed", "Speed(m/s)"),
+    "altitude_min": ("Rolling Min Altitude", "Altitude(m)"),
+    "altitude_max": ("Rolling Max Altitude", "Altitude(m)"),
+    "altitude_mean": ("Rolling Mean Altitude", "Altitude(m)"),
+    "pressure_altitude": ("Pressure Altitude", "Altitude(m)"),
+    "altitude_error": ("Altitude - Pressure Altitude", "Difference(m)"),
+    "pressure": ("Pressure", "Pressure(hPa)"),
+    "temp": ("Temperature", "Temperature(C)"),
+    "voltage": ("Voltage", "Voltage(V)"),
+}
+
+
+class GraphWidgetMeta(ABCMeta, type(QWidget)):
+    """Qt's metaclass with abstract method bookkeeping, for QWidgets that define an interface."""
+
+
+class GraphWidget(QWidget, metaclass=GraphWidgetMeta):
+    """What the main window needs from a graph of one telemetry column, however it is drawn.
+
+    Backends implement the abstract update_graph, show_history and show_window. A backend missing
+    one fails with TypeError when it is constructed (checked here, Qt's constructor does not).
+    Given a `channel` the graph gets a selector for any of the CHANNELS and emits channel_changed
+    when another is picked.
+    """
+
+    channel_changed = Signal(str)
+
+    def __init__(self, graph_title, x_label, y_label, window=None, channel=None):
+        if type(self).__abstractmethods__:
+            raise TypeError(f"Can't instantiate graph backend {type(self).__name__} without "
+                            f"{', '.join(sorted(type(self).__abstractmethods__))}")
         super().__init__()
 
         # Layout setup
         layout = QVBoxLayout()
         self.setLayout(layout)
 
+        # Column of the telemetry store shown, and the selector for it
+        self.channel = channel
+        self.channel_select = None
+        if channel is not None:
+            self.channel_select = QComboBox()
+            for name, (title, _) in CHANNELS.items():
+                self.channel_select.addItem(title, name)
+            self.channel_select.setCurrentIndex(list(CHANNELS).index(channel))
+            self.channel_select.currentIndexChanged.connect(self.select_channel)
+            layout.addWidget(self.channel_select)
+
+        # Set the size policy to allow expanding and shrinking with the window
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+
+        self.graph_title = graph_title  # Store the title
+        self.x_label = x_label  # Store x-axis label
+        self.y_label = y_label  # Store y-axis label
+
+        # Newest samples shown live, None shows everything in the telemetry store
+        self.window = window
+
+    def select_channel(self, index):
+        """Switch the graph to another channel, whoever owns the data redraws it on channel_changed."""
+        self.channel = self.channel_select.itemData(index)
+        self.graph_title, self.y_label = CHANNELS[self.channel]
+        self.labels_changed()
+        self.channel_changed.emit(self.channel)
+
+    def labels_changed(self):
+        """Called once the title or y axis label changed, before the new channel's data arrives."""
+
+    @abstractmethod
+    def update_graph(self, x_values, y_values):
+        """Show live data: the newest packets' mission times and values of the graph's channel, in arrival order."""
+
+    @abstractmethod
+    def show_history(self, x_values, y_values):
+        """Take a whole recording in mission time order for browsing and show all of it."""
+
+    @abstractmethod
+    def show_window(self, x_min, x_max):
+        """Show mission times x_min to x_max of the recording given to show_history, nothing if there is none."""
+
+
+class LiveGraph(GraphWidget):
+    """Matplotlib graph of one telemetry column.
+
+    matplotlib (and NumPy) are only imported and the figure only built once the graph has first
+    been shown, so the main window can appear before any of it has loaded.
+    """
+
+    def __init__(self, graph_title, x_label, y_label, window=None, channel=None):
+        super().__init__(graph_title, x_label, y_label, window, channel)
+
+        # Initialize empty lists for storing x and y values
+        self.x_values = []
+        self.y_values = []
+
+        # Min/max pyramid of a recording being browsed, None while showing live data
+        self.pyramid = None
+
+        # Built by create_figure
+        self.figure = None
+        self.canvas = None
+        self.toolbar = None
+        self.ax = None
+        self.line = None
+
+        # Cached pixels of everything except the line, refreshed after every full draw
+        self.background = None
+
+    def paintEvent(self, event):
+        """Build the figure just after the graph is first painted, so the window is already on screen."""
+        super().paintEvent(event)
+        if self.figure is None:
+            QTimer.singleShot(0, self.create_figure)
+
+    def create_figure(self):
+        """Import matplotlib and build the figure, canvas, toolbar and line, does nothing if already built."""
+        if self.figure is not None:
+            return
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+        from matplotlib.figure import Figure
+
         # Matplotlib Figure and Canvas
         self.figure = Figure()
         self.canvas = FigureCanvas(self.figure)
-        layout.addWidget(self.canvas)
-        # Set the size policy to allow expanding and shrinking with the window
-        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.layout().addWidget(self.canvas)
+
+        # Toolbar for zooming and panning through long histories
+        self.toolbar = NavigationToolbar(self.canvas, self)
+        self.layout().addWidget(self.toolbar)
         self.canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
 
         # Initialize the Matplotlib axes with provided titles and labels
         self.ax = self.figure.add_subplot(111)
-        self.graph_title = graph_title  # Store the title
-        self.x_label = x_label  # Store x-axis label
-        self.y_label = y_label  # Store y-axis label
-        
         self.ax.set_title(self.graph_title)
         self.ax.set_xlabel(self.x_label)
         self.ax.set_ylabel(self.y_label)
         self.ax.grid(True)
+        self.ax.callbacks.connect("xlim_changed", self.on_xlim_changed)
 
-        # Initialize empty lists for storing x and y values
-        self.x_values = []
-        self.y_values = []
+        # Persistent line, animated so full redraws leave it out of the cached background
+        (self.line,) = self.ax.plot([], [], color="blue", animated=True)
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+
+        # Show whatever arrived before the figure existed
+        if self.pyramid is not None:
+            self.draw_history()
+        elif len(self.x_values) > 0:
+            self.update_graph(self.x_values, self.y_values)
+
+    def labels_changed(self):
+        if self.figure is not None:
+            self.ax.set_title(self.graph_title)
+            self.ax.set_ylabel(self.y_label)
+            # Fit the axes to the new channel on the next update
+            self.ax.set_ylim(0, 1)
+            self.background = None
 
     def update_graph(self, x_values, y_values):
         """Update the plot with the provided data."""
-        
-        self.x_values = x_values[-15:]
-        self.y_values = y_values[-15:]
-
-        # Clear and re-plot the data
-        self.ax.cla()
-        self.ax.plot(self.x_values, self.y_values, color="blue")
-        self.ax.set_title(self.graph_title)  # Restore the title
-        self.ax.set_xlabel(self.x_label)  # Restore x-axis label
-        self.ax.set_ylabel(self.y_label)  # Restore y-axis label
-        self.ax.grid(True)
+        import numpy as np
+        from LiveGraphing.Decimation import minmax_decimate
+
+        # Live data replaces any recording being browsed
+        self.pyramid = None
+
+        # Telemetry store columns are memoryviews, wrap them as arrays without copying
+        self.x_values = np.asarray(x_values)
+        self.y_values = np.asarray(y_values)
+        if self.window is not None:
+            self.x_values = self.x_values[-self.window:]
+            self.y_values = self.y_values[-self.window:]
+
+        # Drawn by create_figure once the graph is shown
+        if self.figure is None:
+            return
+
+        # Plot about two points per pixel column, min/max buckets keep the peaks
+        self.line.set_data(*minmax_decimate(self.x_values, self.y_values, self.canvas.width()))
+
+        # Only re-layout the axes when the data leaves the current view, otherwise blit the line
+        if self.rescale_if_needed() or self.background is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.background)
+            self.ax.draw_artist(self.line)
+            self.canvas.blit(self.ax.bbox)
+
+    def show_history(self, x_values, y_values):
+        """Show a whole recording, zooming and panning pick the matching level of a min/max pyramid."""
+        import numpy as np
+        from LiveGraphing.Decimation import DecimationPyramid
+
+        self.x_values = np.asarray(x_values)
+        self.y_values = np.asarray(y_values)
+        self.pyramid = DecimationPyramid(self.x_values, self.y_values)
+        if self.figure is not None:
+            self.draw_history()
+
+    def draw_history(self):
+        """Fit the axes to the recording in the pyramid and draw it."""
+        from LiveGraphing.Decimation import padded_limits
 
-        # Redraw the canvas
+        x_range = self.pyramid.x_range()
+        if x_range is None:
+            self.line.set_data([], [])
+        else:
+            # The coarsest level still holds the overall extremes
+            coarsest_y = self.pyramid.levels[-1][1]
+            y_limits = padded_limits(coarsest_y)
+            if y_limits is not None:
+                self.ax.set_ylim(*y_limits)
+            self.ax.set_xlim(x_range[0], max(x_range[1], x_range[0] + 1))  # Queries the pyramid through on_xlim_changed
         self.canvas.draw()
 
+    def show_window(self, x_min, x_max):
+        """Zoom a recording being browsed to [x_min, x_max], a pyramid query so it costs the same however long the recording is."""
+        if self.pyramid is None or self.figure is None:
+            return
+        from LiveGraphing.Decimation import padded_limits
+
+        self.ax.set_xlim(x_min, max(x_max, x_min + 1))  # Queries the pyramid through on_xlim_changed
+
+        # Fit the y axis to what is in the window
+        y_limits = padded_limits(self.line.get_ydata())
+        if y_limits is not None:
+            self.ax.set_ylim(*y_limits)
+        self.canvas.draw_idle()
+
+    def on_xlim_changed(self, ax):
+        """Re-query the pyramid for the new view while browsing a recording."""
+        if self.pyramid is not None:
+            x_min, x_max = ax.get_xlim()
+            self.line.set_data(*self.pyramid.query(x_min, x_max, 2 * self.canvas.width()))
+
+    def on_draw(self, event):
+        """Cache the freshly drawn background and put the line back on top of it."""
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.line)
+
+    def rescale_if_needed(self):
+        """Move the axis limits if the data no longer fits, returns True if they changed."""
+        import numpy as np
+
+        if len(self.x_values) == 0:
+            return False
+
+        # Derived channels are NaN for packets stored without them
+        finite = self.y_values[np.isfinite(self.y_values)]
+        if len(finite) == 0:
+            return False
+
+        x_min, x_max = self.x_values.min(), self.x_values.max()
+        y_min, y_max = finite.min(), finite.max()
+        view_x_min, view_x_max = self.ax.get_xlim()
+        view_y_min, view_y_max = self.ax.get_ylim()
+
+        if view_x_min <= x_min and x_max <= view_x_max and view_y_min <= y_min and y_max <= view_y_max:
+            return False
+
+        # Leave headroom to the right so new packets fit for a while before the next re-layout
+        x_span = max(x_max - x_min, 1)
+        y_pad = max((y_max - y_min) * 0.1, 1)
+        self.ax.set_xlim(x_min, x_max + x_span * 0.5)
+        self.ax.set_ylim(y_min - y_pad, y_max + y_pad)
+        return True
+
 
 
 
@@ -131,4 +351,151 @@ class LiveData(QWidget):
             seconds = total_seconds % 60
             return f"{hours:02}:{minutes:02}:{seconds:05.2f}"
         else:
-            return "00:00:00.00"
\ No newline at end of file
+            return "00:00:00.00"
+
+
+
+class MetricsPanel(QWidget):
+    def __init__(self):
+        super().__init__()
+
+        # Main layout
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        # Labels for each ingest metric
+        self.rate_label = QLabel("Packets/s: --")
+        self.bytes_label = QLabel("Bytes/s: --")
+        self.failures_label = QLabel("Parse Failures: --")
+        self.missing_label = QLabel("Missing Packets: --")
+        self.sequence_label = QLabel("Duplicates/Late/Resets: --")
+        self.queue_label = QLabel("Write Queue: --")
+        self.write_latency_label = QLabel("Arrival to CSV: --")
+        self.render_latency_label = QLabel("Arrival to Screen: --")
+
+        # Add labels to the layout
+        for label in (self.rate_label, self.bytes_label, self.failures_label, self.missing_label,
+                      self.sequence_label, self.queue_label, self.write_latency_label, self.render_latency_label):
+            layout.addWidget(label)
+
+    def update_metrics(self, metrics):
+        """Show a snapshot from SerialReader.metrics_snapshot()."""
+        self.rate_label.setText(f"Packets/s: {metrics['packets_per_s']:.1f}")
+        self.bytes_label.setText(f"Bytes/s: {metrics['bytes_per_s']:.0f}")
+        self.failures_label.setText(f"Parse Failures: {metrics['parse_failures']} (frame errors {metrics['frame_errors']})")
+        self.missing_label.setText(f"Missing Packets: {metrics['missing_packets']} in {metrics['gaps']} gaps ({metrics['loss_rate']:.2%} loss)")
+        self.sequence_label.setText(f"Duplicates/Late/Resets: {metrics['duplicates']}/{metrics['late_packets']}/{metrics['resets']}")
+        self.queue_label.setText(f"Write Queue: {metrics['queue_depth']} ({metrics['dropped_rows']} dropped)"
+                                 + (f" - {metrics['recording_error']}" if metrics.get('recording_error') else ""))
+        self.write_latency_label.setText(f"Arrival to CSV: {self.format_latency(metrics['write_latency_ms'])}")
+        self.render_latency_label.setText(f"Arrival to Screen: {self.format_latency(metrics['render_latency_ms'])}")
+
+    def format_latency(self, latency):
+        if latency is None:
+            return "--"
+        median, p95 = latency
+        return f"{median:.1f} ms (p95 {p95:.1f} ms)"
+
+
+
+class TimelineScrubber(QWidget):
+    """Picks a window of a recording to show, by typed mission times or by dragging it along the recording.
+
+    Times are typed as e.g. 'T+00:04:10', '250' (seconds), 'apogee + 30 s' or 'end - 1:00'.
+    The slider moves the window without changing its length.
+    """
+
+    window_changed = Signal(int, int)
+
+    # Slider positions across the whole recording
+    STEPS = 1000
+
+    def __init__(self):
+        super().__init__()
+
+        layout = QHBoxLayout()
+        self.setLayout(layout)
+
+        self.start_edit = QLineEdit()
+        self.start_edit.setPlaceholderText("From, e.g. T+00:04:10")
+        self.end_edit = QLineEdit()
+        self.end_edit.setPlaceholderText("To, e.g. apogee + 30 s")
+        show_button = QPushButton("Show")
+        full_button = QPushButton("Whole Flight")
+        self.slider = QSlider(Qt.Horizontal)
+        self.slider.setRange(0, self.STEPS)
+        self.message_label = QLabel("")
+
+        self.start_edit.returnPressed.connect(self.apply_times)
+        self.end_edit.returnPressed.connect(self.apply_times)
+        show_button.clicked.connect(self.apply_times)
+        full_button.clicked.connect(self.show_all)
+        self.slider.valueChanged.connect(self.slide)
+
+        layout.addWidget(QLabel("Window:"))
+        layout.addWidget(self.start_edit)
+        layout.addWidget(self.end_edit)
+        layout.addWidget(show_button)
+        layout.addWidget(full_button)
+        layout.addWidget(self.slider, 1)
+        layout.addWidget(self.message_label)
+
+        # (first, last) mission time of the recording, named times, and the window shown
+        self.time_range = None
+        self.anchors = {}
+        self.window = None
+
+    def set_recording(self, time_range, anchors):
+        """Browse a new recording, starting with all of it."""
+        self.time_range = time_range
+        self.anchors = anchors
+        self.message_label.setText("")
+        self.setEnabled(time_range is not None)
+        if time_range is not None:
+            self.show_all()
+
+    def clear(self):
+        self.time_range = None
+        self.window = None
+        self.setEnabled(False)
+
+    def show_all(self):
+        if self.time_range is not None:
+            self.start_edit.setText("start")
+            self.end_edit.setText("end")
+            self.set_window(*self.time_range)
+
+    def apply_times(self):
+        # Imported here, the rest of the window does not need NumPy until a recording is opened
+        from Data.Mission_Index import parse_mission_time
+        try:
+            start = parse_mission_time(self.start_edit.text() or "start", self.anchors)
+            end = parse_mission_time(self.end_edit.text() or "end", self.anchors)
+        except ValueError as e:
+            self.message_label.setText(str(e))
+            return
+        if end <= start:
+            self.message_label.setText("The window must end after it starts")
+            return
+        self.message_label.setText("")
+        self.set_window(start, end)
+
+    def set_window(self, start, end):
+        self.window = (start, end)
+
+        # Put the slider where the window is without it moving the window again
+        first, last = self.time_range
+        span = last - first - (end - start)
+        self.slider.blockSignals(True)
+        self.slider.setValue(round((start - first) / span * self.STEPS) if span > 0 else 0)
+        self.slider.blockSignals(False)
+        self.window_changed.emit(start, end)
+
+    def slide(self, value):
+        if self.time_range is None or self.window is None:
+            return
+        first, last = self.time_range
+        length = self.window[1] - self.window[0]
+        start = first + round(max(last - first - length, 0) * value / self.STEPS)
+        self.window = (start, start + length)
+        self.window_changed.emit(start, start + length)
@@ -0,0 +1,317 @@
+import math
+import struct
+from PySide6.QtWidgets import QWidget, QSizePolicy
+from PySide6.QtGui import QColor, QFont, QPainter, QPainterPath, QPen, QPixmap
+from PySide6.QtCore import QByteArray, QDataStream, QPointF, QRectF, Qt, Signal
+from LiveGraphing.Ground_livev2 import GraphWidget
+
+
+# Room around the plot for the title, tick labels and axis labels, in pixels
+MARGIN_LEFT = 64
+MARGIN_RIGHT = 16
+MARGIN_TOP = 28
+MARGIN_BOTTOM = 44
+
+# About this many ticks along each axis
+TICKS = 6
+
+# How much one wheel step zooms a recording being browsed
+ZOOM_STEP = 1.25
+
+# QPainterPath element types in its QDataStream format
+MOVE_TO = 0
+LINE_TO = 1
+
+
+def nice_ticks(low, high, count=TICKS):
+    """Tick positions covering [low, high] at 1, 2 or 5 times a power of ten apart."""
+    span = high - low
+    if not span > 0 or not math.isfinite(span):
+        return []
+    raw_step = span / count
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(m * magnitude for m in (1, 2, 5, 10) if m * magnitude >= raw_step)
+    first = math.ceil(low / step)
+    return [i * step for i in range(first, math.floor(high / step) + 1)]
+
+
+def array_path(x_pixels, y_pixels):
+    """QPainterPath through the points, filled in from NumPy through QDataStream instead of a Python call per point.
+
+    Points that are not finite are left out and the line starts again after them.
+    """
+    import numpy as np
+
+    finite = np.isfinite(x_pixels) & np.isfinite(y_pixels)
+    starts = finite.copy()
+    starts[1:] &= ~finite[:-1]
+    count = int(finite.sum())
+
+    # Element count, then (type, x, y) per element, then the path's cStart and fill rule, all big endian
+    raw = bytearray(4 + 20 * count + 8)
+    struct.pack_into(">i", raw, 0, count)
+    elements = np.frombuffer(raw, dtype=[("type", ">i4"), ("x", ">f8"), ("y", ">f8")], count=count, offset=4)
+    elements["type"] = np.where(starts[finite], MOVE_TO, LINE_TO)
+    elements["x"] = x_pixels[finite]
+    elements["y"] = y_pixels[finite]
+    del elements
+
+    path = QPainterPath()
+    QDataStream(QByteArray(raw)) >> path
+    return path
+
+
+##################################################################################################################################
+#   PlotCanvas Class
+##################################################################################################################################
+
+class PlotCanvas(QWidget):
+    """Axes, grid, labels and one line painted with QPainter, the line from NumPy arrays.
+
+    Wheel and drag are turned into view_changed(x_min, x_max) while `interactive`, the owner
+    answers with the line for that range.
+    """
+
+    view_changed = Signal(float, float)
+
+    def __init__(self):
+        super().__init__()
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setMinimumSize(MARGIN_LEFT + MARGIN_RIGHT + 40, MARGIN_TOP + MARGIN_BOTTOM + 40)
+
+        self.title = ""
+        self.x_label = ""
+        self.y_label = ""
+
+        # Data shown and the axis limits it is drawn against, None until there is something to show
+        self.x_values = None
+        self.y_values = None
+        self.x_limits = None
+        self.y_limits = None
+
+        # Wheel zoom and drag pan, only while browsing a recording
+        self.interactive = False
+        self.drag_start = None
+
+        # Cached pixels of everything except the line, and what they were drawn for
+        self.background = None
+        self.background_key = None
+
+        # One pixel wide pens are the raster engine's fast path
+        self.line_pen = QPen(QColor("blue"), 1)
+        self.grid_pen = QPen(QColor(220, 220, 220), 1)
+        self.frame_pen = QPen(QColor("black"), 1)
+        self.title_font = QFont()
+        self.title_font.setBold(True)
+
+    def plot_rect(self):
+        return QRectF(MARGIN_LEFT, MARGIN_TOP, max(self.width() - MARGIN_LEFT - MARGIN_RIGHT, 1), max(self.height() - MARGIN_TOP - MARGIN_BOTTOM, 1))
+
+    def plot_width(self):
+        return int(self.plot_rect().width())
+
+    def set_line(self, x_values, y_values, x_limits, y_limits):
+        self.x_values = x_values
+        self.y_values = y_values
+        self.x_limits = x_limits
+        self.y_limits = y_limits
+        self.update()
+
+    ######################### Painting #########################
+
+    def paintEvent(self, event):
+        # Axes, grid and labels only change with the limits, the labels or the size, the line is drawn over them
+        key = (self.size(), self.x_limits, self.y_limits, self.title, self.x_label, self.y_label, self.devicePixelRatioF())
+        if key != self.background_key:
+            self.background = QPixmap(self.size() * self.devicePixelRatioF())
+            self.background.setDevicePixelRatio(self.devicePixelRatioF())
+            self.paint_background(QPainter(self.background))
+            self.background_key = key
+
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.background)
+        if self.x_limits is not None and self.y_limits is not None:
+            self.paint_line(painter, self.plot_rect())
+        painter.end()
+
+    def paint_background(self, painter):
+        painter.fillRect(self.rect(), Qt.white)
+        plot = self.plot_rect()
+
+        painter.setFont(self.title_font)
+        painter.drawText(QRectF(0, 0, self.width(), MARGIN_TOP), Qt.AlignCenter, self.title)
+        painter.setFont(self.font())
+
+        if self.x_limits is not None and self.y_limits is not None:
+            self.paint_grid(painter, plot)
+
+        painter.setPen(self.frame_pen)
+        painter.drawRect(plot)
+        painter.drawText(QRectF(0, self.height() - 20, self.width(), 20), Qt.AlignCenter, self.x_label)
+        painter.save()
+        painter.translate(12, plot.center().y())
+        painter.rotate(-90)
+        painter.drawText(QRectF(-plot.height() / 2, -10, plot.height(), 20), Qt.AlignCenter, self.y_label)
+        painter.restore()
+        painter.end()
+
+    def paint_grid(self, painter, plot):
+        (x_min, x_max), (y_min, y_max) = self.x_limits, self.y_limits
+        for tick in nice_ticks(x_min, x_max):
+            x = plot.left() + (tick - x_min) / (x_max - x_min) * plot.width()
+            painter.setPen(self.grid_pen)
+            painter.drawLine(QPointF(x, plot.top()), QPointF(x, plot.bottom()))
+            painter.setPen(self.frame_pen)
+            painter.drawText(QRectF(x - 50, plot.bottom() + 2, 100, 16), Qt.AlignHCenter | Qt.AlignTop, f"{tick:g}")
+        for tick in nice_ticks(y_min, y_max):
+            y = plot.bottom() - (tick - y_min) / (y_max - y_min) * plot.height()
+            painter.setPen(self.grid_pen)
+            painter.drawLine(QPointF(plot.left(), y), QPointF(plot.right(), y))
+            painter.setPen(self.frame_pen)
+            painter.drawText(QRectF(0, y - 8, MARGIN_LEFT - 4, 16), Qt.AlignRight | Qt.AlignVCenter, f"{tick:g}")
+
+    def paint_line(self, painter, plot):
+        if self.x_values is None or len(self.x_values) == 0:
+            return
+        (x_min, x_max), (y_min, y_max) = self.x_limits, self.y_limits
+
+        # Data to pixels in two vectorised steps, the path is then built from the arrays in one go
+        x_pixels = plot.left() + (self.x_values - x_min) * (plot.width() / (x_max - x_min))
+        y_pixels = plot.bottom() - (self.y_values - y_min) * (plot.height() / (y_max - y_min))
+        painter.setClipRect(plot)
+        painter.setPen(self.line_pen)
+        painter.drawPath(array_path(x_pixels, y_pixels))
+        painter.setClipping(False)
+
+    ######################### Zoom and Pan #########################
+
+    def wheelEvent(self, event):
+        if not self.interactive or self.x_limits is None:
+            return
+        x_min, x_max = self.x_limits
+        plot = self.plot_rect()
+        anchor = x_min + (event.position().x() - plot.left()) / plot.width() * (x_max - x_min)
+        scale = 1 / ZOOM_STEP if event.angleDelta().y() > 0 else ZOOM_STEP
+        self.view_changed.emit(anchor - (anchor - x_min) * scale, anchor + (x_max - anchor) * scale)
+
+    def mousePressEvent(self, event):
+        if self.interactive and self.x_limits is not None:
+            self.drag_start = (event.position().x(), self.x_limits)
+
+    def mouseMoveEvent(self, event):
+        if self.drag_start is None:
+            return
+        start_x, (x_min, x_max) = self.drag_start
+        shift = (start_x - event.position().x()) / self.plot_rect().width() * (x_max - x_min)
+        self.view_changed.emit(x_min + shift, x_max + shift)
+
+    def mouseReleaseEvent(self, event):
+        self.drag_start = None
+
+
+##################################################################################################################################
+#   PainterGraph Class
+##################################################################################################################################
+
+class PainterGraph(GraphWidget):
+    """Graph of one telemetry column drawn with QPainter, a lighter alternative to the matplotlib LiveGraph.
+
+    Each refresh is a min/max decimation to two points per pixel column and one QPainterPath built
+    straight from the arrays, so thousands of points per channel stay smooth on a slow laptop.
+    Recordings are browsed through a DecimationPyramid, zoomed with the wheel and panned by dragging.
+    """
+
+    def __init__(self, graph_title, x_label, y_label, window=None, channel=None):
+        super().__init__(graph_title, x_label, y_label, window, channel)
+        self.canvas = PlotCanvas()
+        self.canvas.view_changed.connect(self.show_range)
+        self.layout().addWidget(self.canvas, 1)
+        self.labels_changed()
+
+        # Live data shown, and the min/max pyramid of a recording being browsed (None while live)
+        self.x_values = []
+        self.y_values = []
+        self.pyramid = None
+
+    def labels_changed(self):
+        self.canvas.title = self.graph_title
+        self.canvas.x_label = self.x_label
+        self.canvas.y_label = self.y_label
+
+        # Fit the axes to the new channel on the next update
+        self.canvas.y_limits = None
+        self.canvas.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Decimate again for the new width
+        if self.pyramid is not None and self.canvas.x_limits is not None:
+            self.show_range(*self.canvas.x_limits)
+        elif len(self.x_values) > 0:
+            self.update_graph(self.x_values, self.y_values)
+
+    def update_graph(self, x_values, y_values):
+        """Update the plot with the provided data."""
+        import numpy as np
+        from LiveGraphing.Decimation import minmax_decimate
+
+        # Live data replaces any recording being browsed
+        self.pyramid = None
+        self.canvas.interactive = False
+
+        # Telemetry store columns are memoryviews, wrap them as arrays without copying
+        self.x_values = np.asarray(x_values)
+        self.y_values = np.asarray(y_values)
+        if self.window is not None:
+            self.x_values = self.x_values[-self.window:]
+            self.y_values = self.y_values[-self.window:]
+
+        x_values, y_values = minmax_decimate(self.x_values, self.y_values, self.canvas.plot_width())
+        x_limits, y_limits = self.live_limits()
+        self.canvas.set_line(x_values, y_values, x_limits, y_limits)
+
+    def live_limits(self):
+        """Axis limits for live data, only moved once the data no longer fits, with room to the right for new packets."""
+        import numpy as np
+
+        x_limits, y_limits = self.canvas.x_limits, self.canvas.y_limits
+        finite = self.y_values[np.isfinite(self.y_values)]
+        if len(self.x_values) == 0 or len(finite) == 0:
+            return x_limits, y_limits
+
+        x_min, x_max = self.x_values.min(), self.x_values.max()
+        y_min, y_max = finite.min(), finite.max()
+        if (x_limits is not None and y_limits is not None and x_limits[0] <= x_min and x_max <= x_limits[1]
+                and y_limits[0] <= y_min and y_max <= y_limits[1]):
+            return x_limits, y_limits
+
+        x_span = max(x_max - x_min, 1)
+        y_pad = max((y_max - y_min) * 0.1, 1)
+        return (x_min, x_max + x_span * 0.5), (y_min - y_pad, y_max + y_pad)
+
+    def show_history(self, x_values, y_values):
+        """Show a whole recording, zooming and panning pick the matching level of a min/max pyramid."""
+        from LiveGraphing.Decimation import DecimationPyramid
+
+        self.pyramid = DecimationPyramid(x_values, y_values)
+        self.canvas.interactive = True
+        x_range = self.pyramid.x_range()
+        if x_range is None:
+            self.canvas.set_line(None, None, None, None)
+        else:
+            self.show_range(*x_range)
+
+    def show_window(self, x_min, x_max):
+        """Zoom a recording being browsed to [x_min, x_max]."""
+        if self.pyramid is not None:
+            self.show_range(x_min, x_max)
+
+    def show_range(self, x_min, x_max):
+        """Query the pyramid for [x_min, x_max] and fit the y axis to what is in it."""
+        from LiveGraphing.Decimation import padded_limits
+
+        if self.pyramid is None:
+            return
+        x_max = max(x_max, x_min + 1)
+        x_values, y_values = self.pyramid.query(x_min, x_max, 2 * self.canvas.plot_width())
+        self.canvas.set_line(x_values, y_values, (x_min, x_max), padded_limits(y_values) or self.canvas.y_limits)
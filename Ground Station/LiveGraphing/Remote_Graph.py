@@ -0,0 +1,186 @@
+import logging
+import multiprocessing
+import sys
+from multiprocessing import shared_memory
+from PySide6.QtWidgets import QLabel, QSizePolicy
+from PySide6.QtGui import QImage, QPixmap
+from PySide6.QtCore import QObject, QSocketNotifier, QTimer, Qt
+from LiveGraphing.Ground_livev2 import GraphWidget
+from LiveGraphing.Render_Worker import FRAME_BYTES, render_worker
+
+log = logging.getLogger(__name__)
+
+
+##################################################################################################################################
+#   RenderProcess Class
+##################################################################################################################################
+
+class RenderProcess(QObject):
+    """Worker process that draws the graphs, so matplotlib never holds the GIL the serial thread and Qt need.
+
+    The worker reads live telemetry straight out of a SharedTelemetryStore and writes each finished
+    frame into this graph's slot of a shared frames block, the pipe only carries small requests and
+    replies. Replies wake the GUI through a QSocketNotifier on the pipe (a poll timer on Windows,
+    where the pipe is not a socket). The worker is started with spawn so it never inherits Qt.
+    """
+
+    def __init__(self, store, max_graphs=3, parent=None, poll_ms=5):
+        super().__init__(parent)
+        self.frames = shared_memory.SharedMemory(create=True, size=FRAME_BYTES * max_graphs)
+        self.max_graphs = max_graphs
+        self.graphs = []
+
+        context = multiprocessing.get_context("spawn")
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=render_worker, args=(child_connection, store.name, self.frames.name),
+                                       name="LiveGraph renderer", daemon=True)
+        self.process.start()
+        child_connection.close()
+
+        if sys.platform == "win32":
+            self.notifier = None
+            self.poll_timer = QTimer(self)
+            self.poll_timer.timeout.connect(self.receive)
+            self.poll_timer.start(poll_ms)
+        else:
+            self.poll_timer = None
+            self.notifier = QSocketNotifier(self.connection.fileno(), QSocketNotifier.Read, self)
+            self.notifier.activated.connect(self.receive)
+
+    def add_graph(self, graph):
+        """Number of the graph's frame slot."""
+        if len(self.graphs) == self.max_graphs:
+            raise ValueError(f"The render process draws at most {self.max_graphs} graphs")
+        self.graphs.append(graph)
+        return len(self.graphs) - 1
+
+    def send(self, message):
+        try:
+            self.connection.send(message)
+            return True
+        except (OSError, ValueError) as e:
+            log.error("Render process is not running: %s", e)
+            return False
+
+    def receive(self, *args):
+        try:
+            while self.connection.poll():
+                kind, graph_id, *details = self.connection.recv()
+                graph = self.graphs[graph_id]
+                if kind == "frame":
+                    width, height = details
+                    start = graph_id * FRAME_BYTES
+                    # Copied out before the graph asks for another frame, which is the only time the slot is written
+                    image = QImage(self.frames.buf[start:start + width * height * 4], width, height, width * 4, QImage.Format_RGBA8888).copy()
+                    graph.show_frame(image)
+                else:
+                    log.error("Rendering %s failed: %s", graph.graph_title, details[0])
+                    if kind == "failed":
+                        graph.show_frame(None)
+        except (EOFError, OSError):
+            log.error("Render process exited, graphs are no longer updated")
+            self.stop_receiving()
+
+    def stop_receiving(self):
+        if self.notifier is not None:
+            self.notifier.setEnabled(False)
+        if self.poll_timer is not None:
+            self.poll_timer.stop()
+
+    def close(self):
+        """Stop the worker and remove the frames block."""
+        self.stop_receiving()
+        self.send(None)
+        self.process.join(2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.connection.close()
+        self.frames.close()
+        self.frames.unlink()
+
+
+##################################################################################################################################
+#   RemoteGraph Class
+##################################################################################################################################
+
+class RemoteGraph(GraphWidget):
+    """Graph drawn by a RenderProcess, shown as the finished frames it sends back.
+
+    Live data is read by the worker from the shared store, update_graph only says how many of the
+    newest packets to show. A recording is handed over once in a shared block and browsed in the
+    worker. One frame is asked for at a time, requests made while one is being drawn are folded
+    into the newest, so a slow render drops frames instead of queueing them.
+    """
+
+    def __init__(self, graph_title, x_label, y_label, window=None, channel=None, renderer=None):
+        super().__init__(graph_title, x_label, y_label, window, channel)
+        self.renderer = renderer
+        self.graph_id = renderer.add_graph(self)
+
+        # Frames are scaled to whatever size the layout gives the label, not the other way round
+        self.frame_label = QLabel()
+        self.frame_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+        self.frame_label.setAlignment(Qt.AlignCenter)
+        self.layout().addWidget(self.frame_label, 1)
+
+        # Whether a frame is being drawn, the newest request made meanwhile, and the last one sent
+        self.in_flight = False
+        self.pending = None
+        self.last_request = None
+
+        # True once a recording has been handed to the worker, until live data replaces it
+        self.browsing = False
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.last_request is not None:
+            self.request(self.last_request)
+
+    def update_graph(self, x_values, y_values):
+        """Show the newest len(x_values) packets of the graph's channel, as the worker reads them from the shared store."""
+        self.browsing = False
+        samples = len(x_values) if self.window is None else min(len(x_values), self.window)
+        self.request(("live", self.channel, samples))
+
+    def show_history(self, x_values, y_values):
+        """Hand a whole recording to the worker in a shared block, the worker removes the block once it has read it."""
+        import numpy as np
+
+        x_values = np.asarray(x_values, dtype=np.float64)
+        y_values = np.asarray(y_values, dtype=np.float64)
+        block = shared_memory.SharedMemory(create=True, size=max(16 * len(x_values), 1))
+        data = np.ndarray((2, len(x_values)), dtype=np.float64, buffer=block.buf)
+        data[0] = x_values
+        data[1] = y_values
+        del data
+        block.close()
+
+        if self.renderer.send(("load", self.graph_id, block.name, len(x_values))):
+            self.browsing = True
+            self.request(("recording", None, None))
+
+    def show_window(self, x_min, x_max):
+        if self.browsing:
+            self.request(("recording", x_min, x_max))
+
+    def request(self, request):
+        self.last_request = request
+        if self.in_flight:
+            self.pending = request
+        else:
+            self.send_request(request)
+
+    def send_request(self, request):
+        kind, *details = request
+        size = (self.frame_label.width(), self.frame_label.height())
+        labels = (self.graph_title, self.x_label, self.y_label)
+        self.in_flight = self.renderer.send((kind, self.graph_id, labels, size, *details))
+
+    def show_frame(self, image):
+        """A frame from the render process, None if drawing it failed, then send the request that waited on it."""
+        self.in_flight = False
+        if image is not None:
+            self.frame_label.setPixmap(QPixmap.fromImage(image))
+        if self.pending is not None:
+            request, self.pending = self.pending, None
+            self.send_request(request)
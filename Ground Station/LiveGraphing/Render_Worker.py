@@ -0,0 +1,143 @@
+import signal
+import numpy as np
+from multiprocessing import shared_memory
+from Data.Shared_Telemetry import SharedTelemetryView
+from LiveGraphing.Decimation import DecimationPyramid, minmax_decimate, padded_limits
+
+
+# Largest frame rendered for one graph, a bigger graph gets a frame this size
+MAX_FRAME_WIDTH = 2560
+MAX_FRAME_HEIGHT = 1600
+FRAME_BYTES = MAX_FRAME_WIDTH * MAX_FRAME_HEIGHT * 4
+
+# Frames are rendered at one pixel per point
+DPI = 100
+
+
+##################################################################################################################################
+#   GraphRenderer Class
+##################################################################################################################################
+
+class GraphRenderer:
+    """One graph drawn off screen with matplotlib's Agg backend, in the render process."""
+
+    def __init__(self):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.figure = Figure(dpi=DPI)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot(111)
+        self.ax.grid(True)
+        (self.line,) = self.ax.plot([], [], color="blue")
+
+        # Min/max pyramid of the recording loaded for browsing
+        self.pyramid = None
+
+    def load(self, block_name, length):
+        """Take a recording's (x, y) out of the shared block the GUI handed over, and remove the block."""
+        block = shared_memory.SharedMemory(name=block_name)
+        try:
+            data = np.ndarray((2, length), dtype=np.float64, buffer=block.buf)
+            x_values, y_values = data[0].copy(), data[1].copy()
+            del data
+        finally:
+            block.close()
+            block.unlink()
+        self.pyramid = DecimationPyramid(x_values, y_values)
+
+    def draw_live(self, x_values, y_values, width):
+        """Fit the axes to the newest packets and plot about two points per pixel column."""
+        self.line.set_data(*minmax_decimate(x_values, y_values, width))
+        if len(x_values) > 0:
+            self.ax.set_xlim(x_values[0], max(x_values[-1], x_values[0] + 1))
+        y_limits = padded_limits(y_values)
+        if y_limits is not None:
+            self.ax.set_ylim(*y_limits)
+
+    def draw_recording(self, x_min, x_max, width):
+        """Show [x_min, x_max] of the loaded recording, all of it if x_min is None."""
+        if self.pyramid is None:
+            return
+        if x_min is None:
+            x_range = self.pyramid.x_range()
+            if x_range is None:
+                self.line.set_data([], [])
+                return
+            x_min, x_max = x_range
+        x_max = max(x_max, x_min + 1)
+        self.line.set_data(*self.pyramid.query(x_min, x_max, 2 * width))
+        self.ax.set_xlim(x_min, x_max)
+        y_limits = padded_limits(self.line.get_ydata())
+        if y_limits is not None:
+            self.ax.set_ylim(*y_limits)
+
+    def render(self, labels, width, height):
+        """Draw the figure at width x height pixels, returns its RGBA pixels."""
+        title, x_label, y_label = labels
+        self.ax.set_title(title)
+        self.ax.set_xlabel(x_label)
+        self.ax.set_ylabel(y_label)
+        self.figure.set_size_inches(width / DPI, height / DPI)
+        self.canvas.draw()
+        return self.canvas.buffer_rgba()
+
+
+######################### Render Process #########################
+
+def render_worker(connection, store_name, frames_name):
+    """Main function of the render process, started by Remote_Graph.RenderProcess.
+
+    Messages, each a tuple starting with the kind and the graph's number:
+        ("load", graph, block name, length)                     a recording to browse, see GraphRenderer.load
+        ("live", graph, labels, (width, height), channel, n)    the newest n packets of a store channel
+        ("recording", graph, labels, (width, height), x_min, x_max)
+    Each render is answered with ("frame", graph, width, height) once the pixels are in the graph's
+    slot of the frames block, or ("failed", graph, error text). A load that fails is answered with
+    ("load failed", graph, error text). None ends the process.
+    """
+    # Ctrl+C in the terminal is for the GUI, which stops the worker and removes the shared blocks
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    store = SharedTelemetryView(store_name)
+    frames = shared_memory.SharedMemory(name=frames_name)
+    graphs = {}
+
+    try:
+        while True:
+            try:
+                message = connection.recv()
+            except EOFError:
+                break  # The GUI is gone
+            if message is None:
+                break
+
+            kind, graph_id, *args = message
+            graph = graphs.get(graph_id)
+            if graph is None:
+                graph = graphs[graph_id] = GraphRenderer()
+
+            try:
+                if kind == "load":
+                    graph.load(*args)
+                    continue
+
+                labels, (width, height), *request = args
+                width = max(1, min(width, MAX_FRAME_WIDTH))
+                height = max(1, min(height, MAX_FRAME_HEIGHT))
+                if kind == "live":
+                    channel, samples = request
+                    telemetry = store.snapshot(samples)
+                    graph.draw_live(telemetry["mission_time"], telemetry[channel], width)
+                else:
+                    graph.draw_recording(*request, width)
+
+                pixels = memoryview(graph.render(labels, width, height))
+                start = graph_id * FRAME_BYTES
+                frames.buf[start:start + pixels.nbytes] = pixels.cast("B")
+                connection.send(("frame", graph_id, pixels.shape[1], pixels.shape[0]))
+            except Exception as e:
+                connection.send(("load failed" if kind == "load" else "failed", graph_id, f"{type(e).__name__}: {e}"))
+    finally:
+        store.close()
+        frames.close()
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import serial
+import Serial.Ground_serial as sr
+from Serial.Ingest_Metrics import RateLimitFilter
+
+log = logging.getLogger(__name__)
+log.addFilter(RateLimitFilter())
+
+
+##################################################################################################################################
+#   AsyncSerialReader Class
+##################################################################################################################################
+
+class AsyncSerialReader(sr.SerialReader):
+    """SerialReader that reads on an asyncio event loop instead of its own thread (POSIX ports and ptys).
+
+    The port's file descriptor is watched with loop.add_reader, whatever is waiting is read whenever
+    it becomes readable and handled exactly like the threaded reader does. Any number of ports, and
+    the GUI through GUI/Async_Bridge.py, can share the one loop thread. stop() never waits on a
+    thread: it takes the descriptor off the loop, closes the port and drains the recording.
+
+    batches() turns the reader into an async stream of parsed batches instead of filling the store
+    and recording. Once `max_pending` batches are waiting on the consumer the descriptor is taken
+    off the loop until the consumer is halfway through them, so a slow consumer holds data back in
+    the OS serial buffer instead of growing a queue without limit.
+    """
+
+    def __init__(self, telemetry_depth=4096, loop=None, max_pending=64):
+        super().__init__(telemetry_depth)
+
+        # Reads never block, the loop only calls on_readable once something is waiting
+        self.read_timeout = 0
+
+        # Loop the port is read on, the current event loop when start() is called if not given
+        self.loop = loop
+        self.max_pending = max_pending
+
+        # Descriptor of the open port and whether it is on the loop right now
+        self.fd = None
+        self.reading = False
+
+        # Stream of (columns, arrival) for batches(), and whether reading is held back for its consumer
+        self.batch_queue = None
+        self.backpressure = False
+
+        # Set by stop(), run() waits on it
+        self.stopped = asyncio.Event()
+        self.reconnecting = None
+
+    ######################### Loop Callbacks #########################
+
+    def on_readable(self):
+        try:
+            chunk = self.serial_port.read(self.serial_port.in_waiting or 1)
+        except serial.SerialException as e:
+            log.error("Serial error: %s", e)
+            self.pause()
+            self.reconnecting = self.loop.create_task(self.reconnect_later())
+            return
+        if chunk:
+            self.handle_chunk(chunk)
+
+    # Same backoff as the threaded reconnect, but sleeping on the loop instead of blocking it
+    async def reconnect_later(self):
+        delay = 0.0
+        while self.running:
+            try:
+                self.serial_port.close()
+                self.serial_port.open()
+                self.fd = self.serial_port.fileno()
+                log.info("Reconnected to %s", self.opened_port)
+                if not self.backpressure:
+                    self.resume()
+                return
+            except serial.SerialException as e:
+                log.error("Reconnecting to %s failed: %s", self.opened_port, e)
+            delay = min(max(delay * 2, 0.05), 1.0)
+            await asyncio.sleep(delay)
+
+    def pause(self):
+        if self.reading:
+            self.loop.remove_reader(self.fd)
+            self.reading = False
+
+    def resume(self):
+        if self.running and not self.reading and self.fd is not None:
+            self.loop.add_reader(self.fd, self.on_readable)
+            self.reading = True
+
+    ######################### Start and Stop #########################
+
+    def start(self):
+        if self.loop is None:
+            self.loop = asyncio.get_event_loop()
+        self.stopped.clear()
+        if self.open():
+            self.fd = self.serial_port.fileno()
+            self.resume()
+            log.info("Reading %s at %s baud on the event loop, recording to %s", self.opened_port, self.baud_rate, self.csv_file or "sessions")
+
+    def stop(self):
+        self.running = False
+        self.pause()
+        if self.reconnecting is not None:
+            self.reconnecting.cancel()
+            self.reconnecting = None
+        self.close()
+        self.fd = None
+        self.stopped.set()
+
+        # Wake a consumer waiting in batches() so the stream ends
+        if self.batch_queue is not None:
+            self.batch_queue.put_nowait(None)
+
+    async def run(self):
+        """Read into the store and recording until stop() is called or the task is cancelled, the port and recording are closed either way."""
+        self.start()
+        try:
+            await self.stopped.wait()
+        finally:
+            self.stop()
+
+    ######################### Stream #########################
+
+    async def batches(self):
+        """Opens the port and yields (columns, arrival) for every parsed batch until stop() is called.
+
+        The port is closed however the stream ends: stop(), the consuming task being cancelled or the
+        consumer leaving its async for loop, right away if it iterates inside contextlib.aclosing().
+        """
+        self.batch_queue = asyncio.Queue()
+        self.backpressure = False
+        self.sink = self.enqueue
+        self.start()
+        try:
+            # Batches read before stop() are still delivered, the None it queues ends the stream
+            while self.running or not self.batch_queue.empty():
+                batch = await self.batch_queue.get()
+                if batch is None:
+                    break
+                if self.backpressure and self.batch_queue.qsize() <= self.max_pending // 2:
+                    self.backpressure = False
+                    self.resume()
+                yield batch
+        finally:
+            self.stop()
+            self.sink = None
+            self.batch_queue = None
+
+    # Sink while batches() runs
+    def enqueue(self, reader, columns, arrival):
+        self.batch_queue.put_nowait((columns, arrival))
+        if not self.backpressure and self.batch_queue.qsize() >= self.max_pending:
+            log.debug("%s batches waiting on the consumer, pausing %s", self.max_pending, self.opened_port)
+            self.backpressure = True
+            self.pause()
@@ -0,0 +1,112 @@
+"""Framed telemetry protocol: COBS frames with a CRC-16, an optional replacement for '\\r\\n' lines.
+
+Frame spec (ValhallaEmbedded.ino sends this when FRAMED_TELEMETRY is 1):
+    payload   the same text a line would carry, identifier first ('0' data, '1' status, '2' error),
+              without the line ending, at most FRAME_MAX_PAYLOAD bytes
+    crc       CRC-16/CCITT-FALSE of the payload (poly 0x1021, init 0xFFFF, no reflection, no final xor),
+              appended big endian
+    frame     COBS(payload + crc) followed by a single 0x00 delimiter
+
+COBS guarantees 0x00 only ever appears as the delimiter, so after any corruption the decoder is
+back in sync at the next 0x00, and the CRC rejects a frame damaged in between instead of it being
+misparsed into the recording.
+"""
+from binascii import crc_hqx
+
+
+# Longest payload the firmware will send, keeps the pico's frame buffer fixed size
+FRAME_MAX_PAYLOAD = 250
+DELIMITER = b"\x00"
+
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE, binascii.crc_hqx is the same polynomial with the initial value passed in."""
+    return crc_hqx(data, 0xFFFF)
+
+
+def cobs_encode(data):
+    """Consistent overhead byte stuffing: the result has no zero bytes."""
+    encoded = bytearray()
+    for block in bytes(data).split(b"\x00"):
+        # Blocks longer than 254 bytes are split into 0xFF code blocks that carry no implied zero
+        while len(block) >= 254:
+            encoded.append(0xFF)
+            encoded += block[:254]
+            block = block[254:]
+        encoded.append(len(block) + 1)
+        encoded += block
+    return bytes(encoded)
+
+
+def cobs_decode(encoded):
+    """Inverse of cobs_encode, raises ValueError on a malformed frame."""
+    decoded = bytearray()
+    index = 0
+    length = len(encoded)
+    while index < length:
+        code = encoded[index]
+        end = index + code
+        if code == 0 or end > length:
+            raise ValueError("Malformed COBS frame")
+        decoded += encoded[index + 1:end]
+        index = end
+        if code < 0xFF and index < length:
+            decoded.append(0)
+    return bytes(decoded)
+
+
+def encode_frame(payload):
+    """One complete frame, delimiter included, for a payload such as b'01004,00:00:01.000,...'."""
+    return cobs_encode(payload + crc16(payload).to_bytes(2, "big")) + DELIMITER
+
+
+##################################################################################################################################
+#   FrameDecoder Class
+##################################################################################################################################
+
+class FrameDecoder:
+    """Streaming decoder: feed it whatever the port returned, get back the payloads of every good frame.
+
+    Never blocks and never raises on bad input. A corrupted or oversized frame is counted and skipped
+    and decoding carries on from the next delimiter.
+    """
+
+    def __init__(self, max_frame=2 * FRAME_MAX_PAYLOAD):
+        self.max_frame = max_frame
+        self.pending = bytearray()
+
+        # Running totals since the decoder was created or reset
+        self.frames = 0
+        self.bad_frames = 0
+
+    def reset(self):
+        self.pending.clear()
+        self.frames = 0
+        self.bad_frames = 0
+
+    def feed(self, chunk):
+        self.pending += chunk
+        parts = self.pending.split(DELIMITER)
+        self.pending = bytearray(parts.pop())
+
+        # No delimiter for far too long, the stream is garbage, drop it and wait for the next frame
+        if len(self.pending) > self.max_frame:
+            self.pending.clear()
+            self.bad_frames += 1
+
+        payloads = []
+        for part in parts:
+            if not part:
+                continue  # Back to back delimiters, e.g. after a resync
+            try:
+                raw = cobs_decode(part)
+            except ValueError:
+                self.bad_frames += 1
+                continue
+            if len(raw) < 3 or crc16(raw[:-2]) != int.from_bytes(raw[-2:], "big"):
+                self.bad_frames += 1
+                continue
+            payloads.append(raw[:-2])
+
+        self.frames += len(payloads)
+        return payloads
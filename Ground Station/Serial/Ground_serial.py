@@ -1,10 +1,19 @@
 # Required libraries
+import logging
 import serial
 import time
 from threading import Thread, Event
-import csv
-import serial.tools
-import serial.tools.list_ports
+from Data.Telemetry_Store import TelemetryStore
+from Data.Telemetry_Writer import TelemetryWriter
+from Data.Binary_Log import binary_log_path
+from Serial.Packet_Parser import DataFrameParser
+from Serial.Ingest_Metrics import IngestMetrics, RateLimitFilter
+from Serial.Sequence_Tracker import SequenceTracker, RESET
+from Data.Derived_Telemetry import DerivedTelemetry, APOGEE, LANDING
+from Serial.Framing import FrameDecoder
+
+log = logging.getLogger(__name__)
+log.addFilter(RateLimitFilter())
 
 
 ##################################################################################################################################
@@ -12,22 +21,10 @@ import serial.tools.list_ports
 ##################################################################################################################################
 
 class SerialReader:
-    def __init__(self):
+    def __init__(self, telemetry_depth=4096):
             
-        # Initializes data dictionary
-        self.telementary = {
-            "team_id" : [],
-            "mission_time" : [],
-            "packet_count" : [],
-            "sw_state" : [],
-            "pl_state" : [],
-            "altitude" : [],
-            "pressure" : [],
-            "temp" : [],
-            "voltage" : [],
-            "gps_latitude" : [],
-            "gps_longitude" : []
-        }
+        # Initializes telemetry store, a preallocated ring buffer holding the newest packets
+        self.telementary = TelemetryStore(capacity=telemetry_depth)
 
         # Line Identifier, determines what data is being sent by pico
         self.current_error = ""
@@ -39,13 +36,45 @@ class SerialReader:
         self.stop_event = Event()
         self.csv_file = ''
 
+        # Writer thread that records packets to csv_file while running
+        self.recorder = None
+
+        # Also keep a compact binary recording next to the CSV
+        self.record_binary = True
+
         # Port and Baud
         self.opened_port = ''
         self.baud_rate = ''
 
+        # Longest a blocking read waits for data, also bounds how long stop() waits on the thread
+        self.read_timeout = 0.1
+
+        # Framed mode: the pico sends COBS frames with a CRC (Serial/Framing.py) instead of '\r\n' lines
+        self.framed = False
+        self.decoder = FrameDecoder()
+
+        # Partial line left over from the previous read
+        self.pending = bytearray()
+
+        # Fast path parser for '0' data frames, keeps the count of invalid frames
+        self.parser = DataFrameParser()
+
+        # Throughput, failures and latencies since start()
+        self.metrics = IngestMetrics()
+
+        # Gaps, duplicates, reorders and resets in the firmware packet_count since start()
+        self.sequence = SequenceTracker()
+
+        # Vertical speed, smoothed and rolling altitude, pressure altitude, and apogee/landing detection
+        self.derived = DerivedTelemetry()
+
         # Callbacks list for notifying other objects
         self.callbacks = []
 
+        # When set, parsed batches are handed to sink(reader, columns, arrival) instead of this reader's
+        # own store and recording, used by SessionManager to sort packets by team_id across ports
+        self.sink = None
+
         self.serial_port = None
 
 
@@ -65,52 +94,119 @@ class SerialReader:
     
     # Main loop, constantly reads data from COM port until a serial exception occurs or untile the stop funciton is called
     def read_data(self):
-    # Open the file in append mode for the duration of the loop
         #print("read_data called")
-        file = open(self.csv_file, mode='a+', newline='')
-        writer = csv.writer(file)
+        while self.running:
+            try:
+                if self.serial_port:
+                    # Block until at least one byte arrives (or the read timeout passes), then take everything else already waiting
+                    chunk = self.serial_port.read(self.serial_port.in_waiting or 1)
+                    if chunk:
+                        self.handle_chunk(chunk)
+            except serial.SerialException as e:
+                log.error("Serial error: %s", e)
+                self.reconnect()
+
+    # Splits whatever was read into lines or frames and hands them on, shared by the threaded and asyncio readers
+    def handle_chunk(self, chunk):
+        arrival = time.monotonic()
+        self.metrics.record_bytes(len(chunk))
 
+        if self.framed:
+            # Payloads of the complete frames that passed their CRC, the decoder keeps any partial frame
+            lines = self.decoder.feed(chunk)
+        else:
+            # Split the chunk into complete lines, keeping any trailing partial line for the next read
+            self.pending.extend(chunk)
+            lines = self.pending.split(b'\n')
+            self.pending = bytearray(lines.pop())
+
+        # Data frames go through the batch parser, anything else is handled line by line. Classified on the
+        # identifier after any leading noise, and a status line ends the batch before it so arrival order is kept
+        frames = []
+        for raw_line in lines:
+            line = raw_line.lstrip()
+            if line[:1] == b'0':
+                frames.append(line)
+            else:
+                if frames:
+                    self.process_frames(frames, arrival)
+                    frames = []
+                self.process_line(raw_line)
+        if frames:
+            self.process_frames(frames, arrival)
+
+    # Reopens the port after a serial error, retrying right away and backing off to once a second
+    def reconnect(self):
+        delay = 0.0
         while self.running:
-            #print(f"{self.serial_port.in_waiting}")
             try:
-                if self.serial_port and self.serial_port.in_waiting > 0:
-                    # Read line from the serial port
-                    line = self.serial_port.readline().decode('utf-8').strip()
-                    print(f"Line Read: {line}")
-
-                    # Ensure the line has at least 1 character (for identifier)
-                    if len(line) > 0:
-                        identifier = line[0]  # First character is the identifier
-                        content = line[1:].strip()  # Rest of the line is the actual message or data
-                            
-                        # Process the line based on the identifier
-                        self.parse_data(identifier, content)
-
-                        # If the identifier is '0' (data), write the last parsed row of telemetry data to the CSV
-                        if identifier == '0':
-                            if self.telementary["packet_count"] is not None:
-                                latest_row = [
-                                    str(self.telementary.get("team_id", ["0"])[-1]),
-                                    self.format_time(self.telementary.get("mission_time", [0])[-1]),
-                                    str(self.telementary.get("packet_count", ["0"])[-1]),
-                                    str(self.telementary.get("sw_state", ["0"])[-1]),
-                                    str(self.telementary.get("pl_state", ["0"])[-1]),
-                                    str(self.telementary.get("altitude", ["0"])[-1]),
-                                    str(self.telementary.get("pressure", ["0"])[-1]),
-                                    str(self.telementary.get("temp", ["0"])[-1]),
-                                    str(self.telementary.get("voltage", ["0"])[-1]),
-                                    str(self.telementary.get("gps_latitude", ["0"])[-1]),
-                                    str(self.telementary.get("gps_longitude", ["0"])[-1])
-                                ]
-                                writer.writerow(latest_row)  # Write the list of values as CSV row
-                                print(f"telemetry: {self.telementary}")  # Debugging Line
-                
-                time.sleep(0.1)
+                self.serial_port.close()
+                self.serial_port.open()
+                log.info("Reconnected to %s", self.opened_port)
+                return
             except serial.SerialException as e:
-                print(f"Serial error: {e}")
-                time.sleep(1)
+                log.error("Reconnecting to %s failed: %s", self.opened_port, e)
+            delay = min(max(delay * 2, 0.05), 1.0)
+            time.sleep(delay)
 
-    # Organized data received from the read_data function
+    # Handles a single complete status or error line from the serial port, data frames go through process_frames
+    def process_line(self, raw_line):
+        # A corrupted byte must not take the reader thread down, it only garbles this line
+        line = raw_line.decode('utf-8', errors='replace').strip()
+        log.debug("Line Read: %s", line)
+
+        # Ensure the line has at least 1 character (for identifier)
+        if len(line) > 0:
+            identifier = line[0]  # First character is the identifier
+            content = line[1:].strip()  # Rest of the line is the actual message or data
+                
+            # Process the line based on the identifier
+            self.parse_data(identifier, content)
+
+    # Parses a batch of data frames, stores them, queues them for recording and notifies once for the whole batch
+    def process_frames(self, frames, arrival=None):
+        columns = self.parser.parse_batch(frames)
+        packet_counts = columns["packet_count"]
+        if not packet_counts:
+            self.metrics.record_batch(len(frames), 0, arrival)
+            return
+        if self.sink is not None:
+            self.metrics.record_batch(len(frames), len(packet_counts), arrival or time.monotonic())
+            self.sink(self, columns, arrival or time.monotonic())
+            return
+
+        events = self.sequence.track(packet_counts, columns["mission_time"])
+        derived, flight_events = self.derived.process(columns, {index for index, kind, _ in events if kind == RESET})
+        if flight_events:
+            events = sorted(events + flight_events, key=lambda event: event[0])
+        self.telementary.extend_columns(columns, derived)
+        queued_rows = None
+        if self.recorder is not None:
+            if not events:
+                for row in zip(*columns.values()):
+                    self.recorder.put(row)
+            else:
+                self.record_with_markers(columns, events)
+            queued_rows = self.recorder.queued_rows
+        self.metrics.record_batch(len(frames), len(packet_counts), arrival or time.monotonic(), queued_rows)
+        self.notify_callbacks()
+
+    # Queues a batch for recording with a marker line ahead of each packet that broke the packet_count sequence or marks apogee/landing
+    def record_with_markers(self, columns, events):
+        events = iter(events)
+        event = next(events)
+        for index, row in enumerate(zip(*columns.values())):
+            while event is not None and event[0] == index:
+                _, kind, details = event
+                if kind in (APOGEE, LANDING):
+                    log.info("%s detected: %s", kind, details)
+                else:
+                    log.warning("Packet sequence %s: %s", kind, details)
+                self.recorder.put_marker([f"#{kind}", self.format_time(row[1]), *details])
+                event = next(events, None)
+            self.recorder.put(row)
+
+    # Organized data received from the read_data function, returns the parsed row for data packets without storing it
     def parse_data(self, identifier, content):
         if identifier == '0':
             try:
@@ -123,36 +219,22 @@ class SerialReader:
                 # Assume the line format is: "team_id,mission_time,packet_count,sw_state,pl_state,altitude,pressure,temperature,voltage,gps_latitude,gps_longitude"
                 team_id, mission_time, packet_count, sw_state, pl_state, altitude, pressure, temperature, voltage, gps_latitude, gps_longitude = data
 
-                # Append parsed data to respective lists
-                self.telementary["team_id"].append(int(team_id))
-                self.telementary["mission_time"].append(self.convert_to_milliseconds(mission_time))
-                self.telementary["packet_count"].append(int(packet_count))
-                self.telementary["sw_state"].append(sw_state)
-                self.telementary["pl_state"].append(pl_state)
-                self.telementary["altitude"].append(float(altitude))
-                self.telementary["pressure"].append(float(pressure))
-                self.telementary["temp"].append(float(temperature))
-                self.telementary["voltage"].append(float(voltage))
-                self.telementary["gps_latitude"].append(float(gps_latitude))
-                self.telementary["gps_longitude"].append(float(gps_longitude))
-
-                if len(self.telementary["team_id"]) > 15:
-                    self.telementary["team_id"] = self.telementary["team_id"][-15:]
-                    self.telementary["mission_time"] = self.telementary["mission_time"][-15:]
-                    self.telementary["packet_count"] = self.telementary["packet_count"][-15:]
-                    self.telementary["sw_state"] = self.telementary["sw_state"][-15:]
-                    self.telementary["pl_state"] = self.telementary["pl_state"][-15:]
-                    self.telementary["altitude"] = self.telementary["altitude"][-15:]
-                    self.telementary["pressure"] = self.telementary["pressure"][-15:]
-                    self.telementary["temp"] = self.telementary["temp"][-15:]
-                    self.telementary["voltage"] = self.telementary["voltage"][-15:]
-                    self.telementary["gps_latitude"] = self.telementary["gps_latitude"][-15:]
-                    self.telementary["gps_longitude"] = self.telementary["gps_longitude"][-15:]
-
-                self.notify_callbacks()
+                row = (int(team_id),
+                       self.convert_to_milliseconds(mission_time),
+                       int(packet_count),
+                       sw_state,
+                       pl_state,
+                       float(altitude),
+                       float(pressure),
+                       float(temperature),
+                       float(voltage),
+                       float(gps_latitude),
+                       float(gps_longitude))
+                return row
 
             except ValueError:
-                print(f"Invalid data format: {content}")
+                self.metrics.record_failure()
+                log.warning("Invalid data format: %s", content)
 
         elif identifier == '1':
             self.current_status = content
@@ -162,28 +244,73 @@ class SerialReader:
 
     # Starts main loop
     def start(self):
+        if self.open():
+            self.thread = Thread(target=self.read_data, name=f"SerialReader {self.opened_port}")
+            self.thread.start()
+            log.info("Reading %s at %s baud, recording to %s", self.opened_port, self.baud_rate, self.csv_file or "sessions")
+
+    # Opens the port and the recording and resets the counters, returns whether the port is open
+    def open(self):
         self.running = True
+        self.serial_port = None
         try:
-            self.serial_port = serial.Serial(self.opened_port, self.baud_rate, timeout=1)
+            # serial_for_url opens plain port names as well as URLs such as loop:// used for testing
+            self.serial_port = serial.serial_for_url(self.opened_port, self.baud_rate, timeout=self.read_timeout)
         except serial.SerialException as e:
-            print(f"Error opening serial port: {e}") # Change this later to return faulty port/connection
-            self.running = False
-        if self.serial_port:
-            self.thread = Thread(target=self.read_data)
-            self.thread.start()
-            print("thread started")
-        else:
-            print("Serial port not available")
+            log.error("Error opening serial port: %s", e) # Change this later to return faulty port/connection
+        if not self.serial_port:
+            log.error("Serial port not available")
             self.running = False
+            return False
+
+        self.metrics.reset()
+        self.sequence.reset()
+        self.derived.reset()
+        self.decoder.reset()
+        self.pending = bytearray()
+        if self.sink is None:
+            binary_file = binary_log_path(self.csv_file) if self.record_binary else None
+            self.recorder = TelemetryWriter(self.csv_file, self.format_row, binary_file, on_write=self.metrics.record_write)
+            try:
+                self.recorder.start()
+            except (OSError, ValueError) as e:
+                log.error("Error opening recording: %s", e)
+                self.recorder = None
+                self.serial_port.close()
+                self.running = False
+                return False
+        return True
 
     # Stops main loop
     def stop(self):
         self.running = False 
         if self.thread != None:
             self.thread.join()
+            self.thread = None
+        self.close()
+
+    # Closes the port and drains whatever the writer thread still has queued before the recording is considered closed
+    def close(self):
+        if self.serial_port is not None:
             self.serial_port.close()
+        if self.recorder is not None:
+            self.recorder.stop()
+            self.recorder = None
+
+    def metrics_snapshot(self):
+        """Ingest metrics since the last call, plus the recorder's queue depth, dropped rows and error and the loss statistics."""
+        recorder = self.recorder
+        snapshot = self.metrics.snapshot(recorder.queue.qsize() if recorder is not None else 0)
+        snapshot["dropped_rows"] = recorder.dropped_rows if recorder is not None else 0
+        snapshot["recording_error"] = recorder.error if recorder is not None else None
+        snapshot["frame_errors"] = self.decoder.bad_frames
+        snapshot.update(self.sequence.stats())
+        return snapshot
 
     def return_com_ports(self):
+        # Only needed by the setup window, so the port scanning modules are imported on first use
+        import serial.tools.list_ports
+
         # Get a list of all COM ports
         ports = serial.tools.list_ports.comports()
         
@@ -195,6 +322,12 @@ class SerialReader:
     def set_csv(self, csv):
         self.csv_file = csv
 
+    # Turns a parsed row into the strings written to the CSV
+    def format_row(self, row):
+        csv_row = [str(value) for value in row]
+        csv_row[1] = self.format_time(row[1])
+        return csv_row
+
     def format_time(self, mission_time):
             if mission_time:
                 # Convert mission_time from milliseconds to total seconds
@@ -0,0 +1,142 @@
+import logging
+import time
+from collections import deque
+
+
+##################################################################################################################################
+#   IngestMetrics Class
+##################################################################################################################################
+
+class IngestMetrics:
+    """Counters and latencies of the serial ingest path, cheap enough to stay on for every flight.
+
+    The serial thread only bumps counters and appends one arrival mark per batch, never per packet.
+    Rates are worked out when snapshot() is called, over the time since the previous snapshot.
+    Latencies are measured per batch: the arrival time of the newest packet in a batch against the
+    moment the writer thread has flushed it to the CSV, or the GUI has drawn it.
+    """
+
+    def __init__(self, marks=1024, samples=256):
+        self.mark_depth = marks
+        self.sample_depth = samples
+        self.reset()
+
+    def reset(self):
+        # Totals since the reader was started
+        self.bytes_read = 0
+        self.packets = 0
+        self.parse_failures = 0
+
+        # (packets or rows up to the end of a batch, arrival time) for each consumer of the batches
+        self.write_marks = deque(maxlen=self.mark_depth)
+        self.render_marks = deque(maxlen=self.mark_depth)
+
+        # Latest latencies in seconds
+        self.write_latencies = deque(maxlen=self.sample_depth)
+        self.render_latencies = deque(maxlen=self.sample_depth)
+
+        # Where the previous snapshot left off, for rates
+        self.snapshot_time = time.monotonic()
+        self.snapshot_bytes = 0
+        self.snapshot_packets = 0
+
+    ######################### Serial Thread #########################
+
+    def record_bytes(self, count):
+        self.bytes_read += count
+
+    def record_batch(self, frames, parsed, arrival, queued_rows=None):
+        """Account for a batch of `frames` data frames, `parsed` of them valid, that arrived at `arrival` (time.monotonic())."""
+        self.parse_failures += frames - parsed
+        if parsed == 0:
+            return
+
+        self.packets += parsed
+        self.render_marks.append((self.packets, arrival))
+        if queued_rows is not None:
+            self.write_marks.append((queued_rows, arrival))
+
+    def record_failure(self):
+        self.parse_failures += 1
+
+    ######################### Consumers #########################
+
+    def record_write(self, written_rows):
+        """Called by the writer thread once the first `written_rows` queued rows are flushed to the CSV."""
+        self.record_latency(self.write_marks, written_rows, self.write_latencies)
+
+    def record_render(self, packets):
+        """Called by the GUI after drawing a snapshot that holds the first `packets` packets (read from self.packets beforehand)."""
+        self.record_latency(self.render_marks, packets, self.render_latencies)
+
+    def record_latency(self, marks, done, latencies):
+        # Each mark list has a single consumer, so it can be popped up to the newest batch that is done
+        arrival = None
+        while marks and marks[0][0] <= done:
+            arrival = marks.popleft()[1]
+        if arrival is not None:
+            latencies.append(time.monotonic() - arrival)
+
+    ######################### Reporting #########################
+
+    def snapshot(self, queue_depth=0):
+        """Rates since the previous snapshot, totals, and latency percentiles in milliseconds."""
+        now = time.monotonic()
+        elapsed = max(now - self.snapshot_time, 1e-9)
+        snapshot = {
+            "packets_per_s": (self.packets - self.snapshot_packets) / elapsed,
+            "bytes_per_s": (self.bytes_read - self.snapshot_bytes) / elapsed,
+            "packets": self.packets,
+            "parse_failures": self.parse_failures,
+            "queue_depth": queue_depth,
+            "write_latency_ms": percentiles(self.write_latencies),
+            "render_latency_ms": percentiles(self.render_latencies),
+        }
+        self.snapshot_time = now
+        self.snapshot_bytes = self.bytes_read
+        self.snapshot_packets = self.packets
+        return snapshot
+
+
+def percentiles(samples):
+    """(median, 95th percentile) of latencies in seconds as milliseconds, None if there are none."""
+    values = sorted(samples)
+    if not values:
+        return None
+    return values[len(values) // 2] * 1000, values[int(len(values) * 0.95)] * 1000
+
+
+##################################################################################################################################
+#   RateLimitFilter Class
+##################################################################################################################################
+
+class RateLimitFilter(logging.Filter):
+    """Lets each log call site through at most once per `interval` seconds.
+
+    Messages from the same line of code within the interval are dropped and counted, the next one
+    that gets through says how many were suppressed. Errors from a failing port or a noisy link
+    therefore cannot flood the console or slow down the serial thread.
+    """
+
+    def __init__(self, interval=1.0):
+        super().__init__()
+        self.interval = interval
+
+        # (file, line) -> [time last let through, records suppressed since]
+        self.sites = {}
+
+    def filter(self, record):
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        state = self.sites.get(site)
+        if state is None:
+            self.sites[site] = [now, 0]
+            return True
+        if now - state[0] < self.interval:
+            state[1] += 1
+            return False
+
+        if state[1]:
+            record.msg = f"{record.msg} ({state[1]} similar messages suppressed)"
+        self.sites[site] = [now, 0]
+        return True
@@ -0,0 +1,88 @@
+from Data.Telemetry_Store import FIELD_NAMES
+
+
+# Fields in a data frame sent by ValhallaEmbedded.ino:
+# 0<team_id>,<HH:MM:SS.sss>,<packet_count>,<sw_state>,<pl_state>,<altitude>,<pressure>,<temp>,<voltage>,<gps_latitude>,<gps_longitude>
+FRAME_FIELDS = len(FIELD_NAMES)
+
+
+##################################################################################################################################
+#   DataFrameParser Class
+##################################################################################################################################
+
+class DataFrameParser:
+    """Parses batches of raw '0' data frames straight from the serial bytes.
+
+    Lines are never decoded as a whole: every well formed frame in a batch is split at once and
+    each column is converted with one map() over its fields. Frames with the wrong field count are
+    counted and skipped up front; a batch that still has a bad value is reparsed frame by frame so
+    only the bad frames are dropped. Output is columnar, one list per telemetry field.
+    """
+
+    def __init__(self):
+        # Running totals since the parser was created
+        self.parsed_frames = 0
+        self.invalid_frames = 0
+
+        # State strings repeat constantly, decode each distinct one once (bounded so line noise cannot grow it forever)
+        self.state_text = {}
+        self.max_states = 256
+
+    def parse_batch(self, lines):
+        """Parse raw frame lines (bytes, with or without line endings) into a dict of columns."""
+        frames = [line for line in lines if line.count(b',') == FRAME_FIELDS - 1]
+        self.invalid_frames += len(lines) - len(frames)
+
+        try:
+            columns = self.convert(b','.join(frames).split(b',') if frames else [])
+        except ValueError:
+            # Rare slow path: the batch holds a frame with a bad value, find it frame by frame
+            columns = {name: [] for name in FIELD_NAMES}
+            for frame in frames:
+                try:
+                    # bytes() as read_data hands over bytearray lines, whose fields cannot key the state cache
+                    parsed = self.convert(bytes(frame).split(b','))
+                except ValueError:
+                    self.invalid_frames += 1
+                    continue
+                for name in FIELD_NAMES:
+                    columns[name].extend(parsed[name])
+
+        self.parsed_frames += len(columns["team_id"])
+        return columns
+
+    def convert(self, fields):
+        """Convert the flat field list of whole frames into typed columns, raises ValueError on a bad value."""
+        (team_id, mission_time, packet_count, sw_state, pl_state,
+         altitude, pressure, temp, voltage, gps_latitude, gps_longitude) = (fields[index::FRAME_FIELDS] for index in range(FRAME_FIELDS))
+
+        # The '0' identifier is still stuck to the team id, int() of the digits ignores the leading zero
+        if any(field[:1] != b'0' for field in team_id):
+            raise ValueError("Not a data frame")
+
+        # Split every mission time at once, each must have exactly hours, minutes and seconds
+        parts = b':'.join(mission_time).split(b':') if mission_time else []
+        if len(parts) != 3 * len(mission_time):
+            raise ValueError("Invalid time format")
+
+        return {
+            "team_id": list(map(int, team_id)),
+            "mission_time": [int((float(h) * 3600 + float(m) * 60 + float(s)) * 1000) for h, m, s in zip(parts[0::3], parts[1::3], parts[2::3])],
+            "packet_count": list(map(int, packet_count)),
+            "sw_state": list(map(self.decode_state, sw_state)),
+            "pl_state": list(map(self.decode_state, pl_state)),
+            "altitude": list(map(float, altitude)),
+            "pressure": list(map(float, pressure)),
+            "temp": list(map(float, temp)),
+            "voltage": list(map(float, voltage)),
+            "gps_latitude": list(map(float, gps_latitude)),
+            "gps_longitude": list(map(float, gps_longitude)),
+        }
+
+    def decode_state(self, raw):
+        text = self.state_text.get(raw)
+        if text is None:
+            text = raw.decode("utf-8", errors="replace")
+            if len(self.state_text) < self.max_states:
+                self.state_text[raw] = text
+        return text
@@ -0,0 +1,155 @@
+# Kinds of sequence events, also the marker written into the recording for each
+GAP = "GAP"
+DUPLICATE = "DUPLICATE"
+LATE = "LATE"
+RESET = "RESET"
+
+
+##################################################################################################################################
+#   SequenceTracker Class
+##################################################################################################################################
+
+class SequenceTracker:
+    """Streaming continuity check of the firmware packet_count, O(1) state and work per packet.
+
+    The tracker remembers the highest count seen and a bitmap of which of the `window` counts below
+    it have arrived. A count above the highest opens a gap for everything skipped, one inside the
+    window is either a duplicate or a late (reordered) packet that closes part of an earlier gap.
+    The firmware counts from 1 after a restart, so a count that falls back to `reset_below` or less
+    from well above it (or anything further back than the window) starts a new sequence. When the
+    mission times are passed along, a count already seen with a different mission time is a restart
+    whose first packets were missed rather than a duplicate. Only late packets inside a gap the tracker
+    opened count against `missing`, one from before the first count seen moves the start of the
+    sequence back and the counts it skipped become missing.
+    """
+
+    def __init__(self, window=256, reset_below=4):
+        self.window = window
+        self.reset_below = reset_below
+        self.mask = (1 << window) - 1
+        self.reset()
+
+    def reset(self):
+        # Highest packet_count of the current sequence and the bitmap of recent arrivals (bit i = highest - i)
+        self.highest = None
+        self.seen = 0
+
+        # Lowest count of the current sequence, and the mission time of each recent count (slot count % window)
+        self.lowest = None
+        self.times = [None] * self.window
+
+        # Running totals, missing goes back down when late packets fill a gap
+        self.received = 0
+        self.missing = 0
+        self.gaps = 0
+        self.duplicates = 0
+        self.late = 0
+        self.resets = 0
+
+    def track(self, packet_counts, mission_times=None):
+        """Check a batch of packet counts in arrival order, with their mission times if known.
+
+        Returns a list of (index in the batch, kind, details) events, empty for a clean batch.
+        details is (first missing, last missing) for GAP, (previous highest, new count) for
+        RESET and (count,) for DUPLICATE and LATE.
+        """
+        events = []
+        highest = self.highest
+        seen = self.seen
+        lowest = self.lowest
+        times = self.times
+        window = self.window
+
+        # Fast path for the usual batch that simply continues the sequence, compared in C
+        count = len(packet_counts)
+        if highest is not None and count and list(range(highest + 1, highest + count + 1)) == list(packet_counts):
+            self.highest = highest + count
+            self.seen = ((seen << count) | ((1 << count) - 1)) & self.mask
+            self.received += count
+            if mission_times is not None:
+                self.store_times(highest + 1, mission_times)
+            return events
+
+        for index, count in enumerate(packet_counts):
+            mission_time = mission_times[index] if mission_times is not None else None
+            if highest is None:
+                highest, seen, lowest = count, 1, count
+            elif count == highest + 1:
+                highest, seen = count, ((seen << 1) | 1) & self.mask
+            elif count > highest:
+                skipped = count - highest - 1
+                self.missing += skipped
+                self.gaps += 1
+                events.append((index, GAP, (highest + 1, count - 1)))
+                seen = ((seen << (count - highest)) | 1) & self.mask if count - highest < self.window else 1
+                highest = count
+            elif highest - count < self.window and not count <= self.reset_below < highest - count:
+                bit = 1 << (highest - count)
+                if seen & bit:
+                    previous_time = times[count % window]
+                    if mission_time is None or previous_time is None or previous_time == mission_time:
+                        self.duplicates += 1
+                        events.append((index, DUPLICATE, (count,)))
+                        continue
+                    # Same count, another mission time: the firmware restarted and its first packets were missed
+                    self.resets += 1
+                    events.append((index, RESET, (highest, count)))
+                    highest, seen, lowest = count, 1, count
+                else:
+                    seen |= bit
+                    self.late += 1
+                    if count > lowest:
+                        self.missing -= 1
+                    else:
+                        # Earlier than anything seen: the sequence starts here, the counts up to the old start are missing
+                        if lowest - count > 1:
+                            self.missing += lowest - count - 1
+                            self.gaps += 1
+                        lowest = count
+                    events.append((index, LATE, (count,)))
+            else:
+                self.resets += 1
+                events.append((index, RESET, (highest, count)))
+                highest, seen, lowest = count, 1, count
+            if mission_time is not None:
+                times[count % window] = mission_time
+            self.received += 1
+
+        self.highest = highest
+        self.seen = seen
+        self.lowest = lowest
+        return events
+
+    def state(self):
+        """Everything track() carries from one batch to the next as plain values, for restore()."""
+        return [self.highest, self.seen, self.lowest, self.times, self.received, self.missing,
+                self.gaps, self.duplicates, self.late, self.resets]
+
+    def restore(self, state):
+        """Continue the count from a state() of an earlier tracker with the same window."""
+        (self.highest, self.seen, self.lowest, times, self.received, self.missing,
+         self.gaps, self.duplicates, self.late, self.resets) = state
+        self.times = list(times)
+
+    def store_times(self, first, mission_times):
+        """Remember the mission times of consecutive counts from `first`, a slice copy per ring wrap."""
+        window = self.window
+        if len(mission_times) > window:
+            first += len(mission_times) - window
+            mission_times = mission_times[-window:]
+        start = first % window
+        split = min(len(mission_times), window - start)
+        self.times[start:start + split] = mission_times[:split]
+        self.times[:len(mission_times) - split] = mission_times[split:]
+
+    def stats(self):
+        """Running loss statistics since the last reset."""
+        expected = self.received + self.missing
+        return {
+            "missing_packets": self.missing,
+            "loss_rate": self.missing / expected if expected else 0.0,
+            "gaps": self.gaps,
+            "duplicates": self.duplicates,
+            "late_packets": self.late,
+            "resets": self.resets,
+        }
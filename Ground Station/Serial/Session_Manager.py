@@ -0,0 +1,223 @@
+import csv
+import logging
+import os
+from threading import Lock
+import Serial.Ground_serial as sr
+from Data.Telemetry_Store import TelemetryStore, CSV_HEADER, FIELD_NAMES
+from Data.Telemetry_Writer import TelemetryWriter
+from Data.Binary_Log import binary_log_path
+from Serial.Sequence_Tracker import SequenceTracker, DUPLICATE, RESET
+from Data.Derived_Telemetry import DerivedTelemetry
+from Data.Recording_Catalog import RecordingCatalog
+
+log = logging.getLogger(__name__)
+
+
+##################################################################################################################################
+#   VehicleSession Class
+##################################################################################################################################
+
+class VehicleSession:
+    """Telemetry store, recording and packet_count tracking of one team_id, fed by any number of ports.
+
+    The same packet heard on a redundant link shows up as a DUPLICATE in the sequence tracker and is
+    dropped, so the store and recording hold each packet once, from whichever port delivered it first.
+    Only a packet_count seen before with the same mission time is a copy, a restarted firmware that
+    repeats earlier counts is recorded behind a RESET marker.
+    Each vehicle has its own lock and callbacks, so vehicles never wait on one another.
+    """
+
+    def __init__(self, team_id, csv_file, format_row, format_time, telemetry_depth=4096, record_binary=True):
+        self.team_id = team_id
+        self.csv_file = csv_file
+        self.format_time = format_time
+
+        self.telementary = TelemetryStore(capacity=telemetry_depth)
+        self.sequence = SequenceTracker()
+        self.derived = DerivedTelemetry()
+
+        binary_file = binary_log_path(csv_file) if record_binary else None
+        self.recorder = TelemetryWriter(csv_file, format_row, binary_file)
+
+        # Held while a batch is checked, stored and queued, two ports can deliver the same vehicle at once
+        self.lock = Lock()
+        self.callbacks = []
+
+        # Packets kept from each port and redundant copies dropped
+        self.port_packets = {}
+        self.duplicates_dropped = 0
+
+    def register_callback(self, callback):
+        self.callbacks.append(callback)
+
+    def ingest(self, port, columns):
+        """Store and record a batch of this vehicle's packets from one port, minus the ones already received."""
+        with self.lock:
+            events = self.sequence.track(columns["packet_count"], columns["mission_time"])
+            if events:
+                columns = self.drop_duplicates(columns, events)
+            kept = len(columns["packet_count"])
+            if kept == 0:
+                return
+
+            derived, flight_events = self.derived.process(columns, {index for index, kind, _ in events if kind == RESET})
+            self.telementary.extend_columns(columns, derived)
+            rows = zip(*(columns[name] for name in FIELD_NAMES))
+            # Every marker of a row ahead of it, a packet can both close a gap and be the apogee
+            markers = iter(sorted((event for event in events + flight_events if event[1] != DUPLICATE), key=lambda event: event[0]))
+            marker = next(markers, None)
+            for index, row in enumerate(rows):
+                while marker is not None and marker[0] == index:
+                    _, kind, details = marker
+                    self.recorder.put_marker([f"#{kind}", self.format_time(row[1]), *details])
+                    marker = next(markers, None)
+                self.recorder.put(row)
+            self.port_packets[port] = self.port_packets.get(port, 0) + kept
+
+        for callback in self.callbacks:
+            callback()
+
+    def drop_duplicates(self, columns, events):
+        """Remove duplicate packets from a batch, the indexes of the remaining events are moved to match."""
+        duplicates = {index for index, kind, _ in events if kind == DUPLICATE}
+        if not duplicates:
+            return columns
+        self.duplicates_dropped += len(duplicates)
+        keep = [index for index in range(len(columns["packet_count"])) if index not in duplicates]
+
+        # Renumber the other events to their position in the kept rows
+        position = {index: new for new, index in enumerate(keep)}
+        events[:] = [(position[index], kind, details) for index, kind, details in events if index in position]
+        return {name: [values[index] for index in keep] for name, values in columns.items()}
+
+    def status(self):
+        latest = self.telementary.latest()
+        status = {
+            "team_id": self.team_id,
+            "csv_file": self.csv_file,
+            "packets": sum(self.port_packets.values()),
+            "packet_count": latest[2] if latest else None,
+            "mission_time": self.format_time(latest[1]) if latest else None,
+            "altitude": latest[5] if latest else None,
+            "sw_state": latest[3] if latest else None,
+            "pl_state": latest[4] if latest else None,
+            "port_packets": dict(self.port_packets),
+            "duplicates_dropped": self.duplicates_dropped,
+            "queue_depth": self.recorder.queue.qsize(),
+            "dropped_rows": self.recorder.dropped_rows,
+            "recording_error": self.recorder.error,
+        }
+        status.update(self.sequence.stats())
+        return status
+
+
+##################################################################################################################################
+#   SessionManager Class
+##################################################################################################################################
+
+class SessionManager:
+    """Runs one SerialReader per port and sorts their packets into a VehicleSession per team_id.
+
+    Every port reads and parses on its own thread and hands parsed batches straight to the vehicle
+    they belong to, there is no shared queue or global lock between ports or between vehicles.
+    Vehicles are created the first time their team_id is heard, recording to
+    '<recording_base>_<team_id>.csv' (plus the binary recording alongside).
+    """
+
+    def __init__(self, recording_base, telemetry_depth=4096, record_binary=True):
+        self.recording_base = recording_base
+        self.telemetry_depth = telemetry_depth
+        self.record_binary = record_binary
+
+        # Port name -> SerialReader, team_id -> VehicleSession
+        self.readers = {}
+        self.vehicles = {}
+        self.vehicles_lock = Lock()
+
+        # Called with the new VehicleSession when a team_id is first heard, e.g. to attach a display to it
+        self.vehicle_callbacks = []
+
+    def add_port(self, port, baud_rate, framed=False):
+        reader = sr.SerialReader(telemetry_depth=16)
+        reader.opened_port = port
+        reader.baud_rate = baud_rate
+        reader.framed = framed
+        reader.sink = self.ingest
+        self.readers[port] = reader
+        return reader
+
+    def start(self):
+        """Open every port, returns how many are running."""
+        for reader in self.readers.values():
+            reader.start()
+        return sum(reader.running for reader in self.readers.values())
+
+    def stop(self):
+        """Stop every port first, then drain each vehicle's recording."""
+        for reader in self.readers.values():
+            reader.stop()
+        for vehicle in self.vehicles.values():
+            vehicle.recorder.stop()
+
+    @property
+    def running(self):
+        return any(reader.running for reader in self.readers.values())
+
+    def ingest(self, reader, columns, arrival):
+        """SerialReader sink: split a parsed batch by team_id and pass each part to its vehicle."""
+        team_ids = columns["team_id"]
+        first = team_ids[0]
+        if team_ids.count(first) == len(team_ids):
+            self.vehicle(first, reader).ingest(reader.opened_port, columns)
+            return
+
+        # Several vehicles on one radio, keep each one's packets in arrival order
+        indexes = {}
+        for index, team_id in enumerate(team_ids):
+            indexes.setdefault(team_id, []).append(index)
+        for team_id, rows in indexes.items():
+            part = {name: [values[index] for index in rows] for name, values in columns.items()}
+            self.vehicle(team_id, reader).ingest(reader.opened_port, part)
+
+    def vehicle(self, team_id, reader):
+        """The session of a team_id, created with its recording the first time it is heard."""
+        vehicle = self.vehicles.get(team_id)
+        if vehicle is not None:
+            return vehicle
+
+        with self.vehicles_lock:
+            vehicle = self.vehicles.get(team_id)
+            if vehicle is None:
+                csv_file = f"{self.recording_base}_{team_id}.csv"
+                if not os.path.exists(csv_file):
+                    with open(csv_file, mode='w', newline='') as file:
+                        csv.writer(file).writerow(CSV_HEADER)
+                vehicle = VehicleSession(team_id, csv_file, reader.format_row, reader.format_time,
+                                         self.telemetry_depth, self.record_binary)
+                try:
+                    vehicle.recorder.start()
+                except (OSError, ValueError) as e:
+                    # The vehicle is still tracked and displayed, its rows are counted as dropped
+                    vehicle.recorder.error = f"Could not open recording: {e}"
+                    log.error("Error opening recording %s: %s", csv_file, e)
+                self.vehicles[team_id] = vehicle
+                log.info("Team %s heard on %s, recording to %s", team_id, reader.opened_port, csv_file)
+                for callback in self.vehicle_callbacks:
+                    callback(vehicle)
+        return vehicle
+
+    def status(self):
+        """Per port ingest metrics and status/error lines, and per vehicle telemetry and loss statistics."""
+        ports = {}
+        for port, reader in self.readers.items():
+            ports[port] = reader.metrics_snapshot()
+            ports[port].update(running=reader.running, current_status=reader.current_status, current_error=reader.current_error)
+        return {
+            "ports": ports,
+            "vehicles": {team_id: vehicle.status() for team_id, vehicle in list(self.vehicles.items())},
+        }
+
+
+def allocate_recording_base(directory, name):
+    """Next free '<directory>/<name><i>' from the directory's recordings catalog, the vehicles' recordings add '_<team_id>.csv'."""
+    return RecordingCatalog(directory).allocate(name)
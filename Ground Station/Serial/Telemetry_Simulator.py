@@ -0,0 +1,263 @@
+"""Synthetic telemetry source and replay harness for testing the ground station without the pico.
+
+Run from the Ground Station directory, for example:
+    python -m Serial.Telemetry_Simulator loopback --rate 2000 --duration 10
+    python -m Serial.Telemetry_Simulator pty --rate 20
+    python -m Serial.Telemetry_Simulator replay "CSV Files/Test1.csv" --speed 10
+    python -m Serial.Telemetry_Simulator loopback --framed --noise 0.0001
+--framed sends COBS/CRC frames (Serial/Framing.py) instead of lines, the reader needs framed mode too.
+--noise flips bits at random with that probability per byte, to see how each mode copes with a bad link.
+"""
+import argparse
+import math
+import os
+import random
+import tempfile
+import time
+import Serial.Ground_serial as sr
+from Data.Data_Handler import CSV_Handler
+from Data.Telemetry_Store import FIELD_NAMES
+from Serial.Framing import encode_frame
+
+
+# Flight phases as (sw_state, pl_state), matching the strings ValhallaEmbedded.ino sends
+ASCENT = ("reading ascent data", "n")
+RELEASED = ("detached from canister", "r")
+DEPLOYED = ("parachute deployed", "r")
+LANDED = ("done", "landed")
+
+
+def format_mission_time(mission_time_ms):
+    """HH:MM:SS.sss, the same as format_time in ValhallaEmbedded.ino."""
+    seconds, milliseconds = divmod(int(mission_time_ms), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02}:{minutes:02}:{seconds:02}.{milliseconds:03}"
+
+
+def format_frame(team_id, mission_time_ms, packet_count, sw_state, pl_state, altitude, pressure, temp, voltage, gps_latitude, gps_longitude):
+    """One '0' data frame, as printed by Serial1.println on the pico."""
+    return (f"0{team_id},{format_mission_time(mission_time_ms)},{packet_count},{sw_state},{pl_state},"
+            f"{altitude:.2f},{pressure:.2f},{temp:.2f},{voltage:.2f},{gps_latitude:.2f},{gps_longitude:.2f}\r\n").encode()
+
+
+##################################################################################################################################
+#   TelemetrySimulator Class
+##################################################################################################################################
+
+class TelemetrySimulator:
+    """Generates firmware format telemetry for a simple flight and writes it at a fixed rate.
+
+    Mission time is the time since run() started, so a receiver in the same process can work out
+    the latency of every packet from the clock. Set rate_hz to 0 to send as fast as possible.
+    """
+
+    def __init__(self, team_id=1004, flight_seconds=120.0, apogee=700.0, status_every=100):
+        self.team_id = team_id
+        self.flight_seconds = flight_seconds
+        self.apogee = apogee
+
+        # A '1' status line is mixed in after this many data frames
+        self.status_every = status_every
+
+        self.sent_frames = 0
+        self.start_time = None
+
+    def frame(self, packet_count, mission_time_ms):
+        """Data frame for one point of the flight, which repeats every flight_seconds."""
+        phase = (mission_time_ms / 1000.0 % self.flight_seconds) / self.flight_seconds
+        if phase < 0.3:
+            altitude = self.apogee * math.sin(phase / 0.3 * math.pi / 2)
+            state = ASCENT if altitude < 500 else RELEASED
+        elif phase < 0.95:
+            altitude = self.apogee * (1 - (phase - 0.3) / 0.65)
+            state = DEPLOYED if altitude < 300 else RELEASED
+        else:
+            altitude = 0.0
+            state = LANDED
+
+        pressure = 1013.25 * (1 - altitude / 44330.0) ** 5.255
+        temp = 21.0 - altitude * 0.0065
+        voltage = 4.2 - 0.3 * phase
+        return format_frame(self.team_id, mission_time_ms, packet_count, state[0], state[1],
+                            altitude, pressure, temp, voltage, 38.8951, -77.0364)
+
+    def run(self, write, rate_hz, duration=None, count=None):
+        """Write frames through `write(bytes)` at rate_hz until duration seconds or count frames."""
+        self.start_time = time.monotonic()
+        chunk = bytearray()
+
+        while True:
+            now = time.monotonic()
+            elapsed = now - self.start_time
+            if duration is not None and elapsed >= duration:
+                break
+            if count is not None and self.sent_frames >= count:
+                break
+
+            # Send every frame that is due in one write, so high rates are not limited by per-write overhead
+            if rate_hz > 0:
+                due = int(elapsed * rate_hz) + 1
+            else:
+                due = self.sent_frames + 256
+            if count is not None:
+                due = min(due, count)
+
+            mission_time_ms = elapsed * 1000
+            while self.sent_frames < due:
+                self.sent_frames += 1
+                chunk += self.frame(self.sent_frames, mission_time_ms)
+                if self.status_every and self.sent_frames % self.status_every == 0:
+                    chunk += f"1Simulated status at packet {self.sent_frames}\r\n".encode()
+
+            if chunk:
+                write(bytes(chunk))
+                chunk.clear()
+            elif rate_hz > 0:
+                time.sleep(min(1.0 / rate_hz, 0.01))
+
+        return self.sent_frames
+
+
+##################################################################################################################################
+#   Replay and Transports
+##################################################################################################################################
+
+def replay_csv(csv_file, write, speed=1.0):
+    """Send a recorded CSV as firmware frames, speed 1 is real time, 0 is as fast as possible."""
+    columns, labels, errors = CSV_Handler().load_csv_columns(csv_file)
+    rows = zip(*(columns[name].tolist() for name in FIELD_NAMES))
+    start = time.monotonic()
+    first_time = None
+    sent = 0
+
+    for row in rows:
+        row = list(row)
+        row[3] = labels[row[3]]
+        row[4] = labels[row[4]]
+
+        # Wait until this packet is due relative to the first one
+        if speed > 0:
+            first_time = row[1] if first_time is None else first_time
+            delay = (row[1] - first_time) / 1000.0 / speed - (time.monotonic() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+        write(format_frame(*row))
+        sent += 1
+    return sent
+
+
+def framed(write):
+    """Wrap a write function so every '\\r\\n' line goes out as a COBS/CRC frame instead."""
+    def write_frames(data):
+        write(b"".join(encode_frame(line) for line in data.split(b"\r\n") if line))
+    return write_frames
+
+
+def noisy(write, bit_error_rate, seed=None):
+    """Wrap a write function so bytes get a random bit flipped with probability bit_error_rate each."""
+    generator = random.Random(seed)
+    def write_noisy(data):
+        data = bytearray(data)
+        # Jump straight from one corrupted byte to the next instead of rolling for every byte
+        index = int(generator.expovariate(bit_error_rate)) if bit_error_rate > 0 else len(data)
+        while index < len(data):
+            data[index] ^= 1 << generator.randrange(8)
+            index += 1 + int(generator.expovariate(bit_error_rate))
+        write(bytes(data))
+    return write_noisy
+
+
+def open_pty():
+    """Open a pseudo terminal pair, returns (write function, port name for SerialReader)."""
+    import tty
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    return (lambda data: os.write(master, data)), os.ttyname(slave)
+
+
+def measure_loopback(rate_hz, duration, framed_mode=False, noise=0.0):
+    """Drive a SerialReader through pyserial's loop:// port and report throughput, latency and drops."""
+    reader = sr.SerialReader()
+    reader.opened_port = "loop://"
+    reader.baud_rate = 115200
+    reader.framed = framed_mode
+    reader.set_csv(os.path.join(tempfile.mkdtemp(), "loopback.csv"))
+    simulator = TelemetrySimulator()
+
+    # Latency of the newest packet each time the reader hands a batch to its callbacks
+    latencies = []
+    def on_packets():
+        latest = reader.telementary.latest()
+        if latest is not None and simulator.start_time is not None:
+            latencies.append((time.monotonic() - simulator.start_time) * 1000 - latest[1])
+    reader.register_callback(on_packets)
+
+    reader.start()
+    write = reader.serial_port.write
+    if noise:
+        write = noisy(write, noise)
+    if framed_mode:
+        write = framed(write)
+    sent = simulator.run(write, rate_hz, duration=duration)
+
+    # Give the reader a moment to drain what is still in flight
+    time.sleep(0.5)
+    reader.stop()
+
+    received = reader.parser.parsed_frames
+    latencies.sort()
+    return {
+        "sent": sent,
+        "received": received,
+        "dropped": sent - received,
+        "frame_errors": reader.decoder.bad_frames,
+        "parse_failures": reader.metrics.parse_failures,
+        "drop_rate": (sent - received) / sent if sent else 0.0,
+        "packets_per_second": received / duration,
+        "latency_ms_median": latencies[len(latencies) // 2] if latencies else None,
+        "latency_ms_p99": latencies[int(len(latencies) * 0.99)] if latencies else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic telemetry source for the ground station.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    loopback = commands.add_parser("loopback", help="measure SerialReader throughput over loop://")
+    loopback.add_argument("--rate", type=float, default=1000, help="frames per second, 0 for as fast as possible")
+    loopback.add_argument("--duration", type=float, default=10)
+
+    pty = commands.add_parser("pty", help="send synthetic telemetry into a pseudo terminal")
+    pty.add_argument("--rate", type=float, default=1)
+    pty.add_argument("--duration", type=float, default=None)
+
+    replay = commands.add_parser("replay", help="send a recorded CSV into a pseudo terminal")
+    replay.add_argument("csv_file")
+    replay.add_argument("--speed", type=float, default=1.0, help="1 for real time, 10 for 10x, 0 for max")
+
+    for command in (loopback, pty, replay):
+        command.add_argument("--framed", action="store_true", help="send COBS/CRC frames instead of lines")
+        command.add_argument("--noise", type=float, default=0.0, help="probability of a bit error per byte")
+
+    args = parser.parse_args()
+
+    if args.command == "loopback":
+        for key, value in measure_loopback(args.rate, args.duration, args.framed, args.noise).items():
+            print(f"{key}: {value}")
+    else:
+        write, port = open_pty()
+        if args.noise:
+            write = noisy(write, args.noise)
+        if args.framed:
+            write = framed(write)
+        print(f"Select this port in Setup: {port}")
+        try:
+            input("Press Enter once the ground station is reading the port...")
+            if args.command == "pty":
+                TelemetrySimulator().run(write, args.rate, duration=args.duration)
+            else:
+                print(f"Sent {replay_csv(args.csv_file, write, args.speed)} frames")
+        except KeyboardInterrupt:
+            pass